@@ -0,0 +1 @@
+# Intentionally empty: marks benchmarks as a package (run with `python -m benchmarks.run`).
@@ -0,0 +1,305 @@
+"""Benchmarks for the checklist pipeline and the HTTP routes.
+
+    python -m benchmarks.run [--sizes 10,100,1000,10000] [--min-time 0.5] [--out results.json]
+    python -m benchmarks.run --compare baseline.json --out current.json
+
+Each case runs against a synthetic repo with N checklist tasks and a large
+README and reports iterations, throughput, p50/p99/mean latency, peak Python
+allocation (one extra traced iteration, so timings stay untraced) and the
+number of files the case created or modified. HTTP routes are called through
+the ASGI app in-process, without a server or HTTP client library.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from server import main as srv
+from server.checklist_cache import load_yaml
+
+
+def make_repo(root: Path, tasks: int, readme_kb: int = 256) -> Path:
+    """Synthetic repo: .mcp/checklist.yaml with `tasks` tasks and a README of about readme_kb KiB."""
+    (root / ".mcp").mkdir(parents=True, exist_ok=True)
+    checklist = {
+        "version": 1,
+        "metadata": {"name": f"bench-{tasks}", "description": "synthetic benchmark checklist"},
+        "permissions": {"allow_shell": True, "shell_whitelist": ["pytest", "python"]},
+        "tasks": [
+            {
+                "id": f"task-{i:05d}",
+                "title": f"Synthetic task {i}",
+                "description": "Do the thing described here " * 3,
+                "depends_on": [f"task-{i - 1:05d}"] if i % 10 else [],
+                "steps": [
+                    {"when": 'file_exists("pyproject.toml")', "run": "pytest -q"},
+                    {"read": "README.md"},
+                ],
+            }
+            for i in range(tasks)
+        ],
+    }
+    (root / ".mcp" / "checklist.yaml").write_text(yaml.safe_dump(checklist, sort_keys=False), encoding="utf-8")
+    filler = "Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n"
+    body = filler * max(1, readme_kb * 1024 // len(filler) // 2)
+    (root / "README.md").write_text(
+        f"# bench\n\n{body}\n## MCP Job\n\nRun every task in order.\n\n## Other\n\n{body}", encoding="utf-8"
+    )
+    return root
+
+
+def tree_state(root: Path) -> Dict[str, int]:
+    state: Dict[str, int] = {}
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            try:
+                state[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+    return state
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(
+    name: str,
+    size: int,
+    repo: Path,
+    fn: Callable[[], Any],
+    min_time: float,
+    max_iterations: int = 10_000,
+    setup: Optional[Callable[[], Any]] = None,
+) -> Dict[str, Any]:
+    """Time fn() until min_time has elapsed (at least 3 runs); setup() runs untimed before each call."""
+    before = tree_state(repo)
+    samples: List[float] = []
+    spent = 0.0
+    while len(samples) < 3 or (spent < min_time and len(samples) < max_iterations):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        samples.append(elapsed)
+        spent += elapsed
+    after = tree_state(repo)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ordered = sorted(samples)
+    return {
+        "name": name,
+        "size": size,
+        "iterations": len(samples),
+        "throughputPerSec": round(len(samples) / spent, 2) if spent else None,
+        "p50Ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p99Ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "meanMs": round(statistics.fmean(samples) * 1000, 3),
+        "peakAllocKb": round(peak / 1024, 1),
+        "filesWritten": sum(1 for path, mtime in after.items() if before.get(path) != mtime),
+    }
+
+
+class AsgiClient:
+    """Calls the ASGI app directly: one http scope per request, body collected from send()."""
+
+    def __init__(self, app):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+
+    async def _call(self, method: str, path: str, payload: Optional[Dict[str, Any]]) -> Tuple[int, bytes]:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            "client": ("127.0.0.1", 0),
+            "server": ("127.0.0.1", 63777),
+        }
+        sent = False
+        status = 0
+        chunks: List[bytes] = []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, b"".join(chunks)
+
+    def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+        status, body = self.loop.run_until_complete(self._call(method, path, payload))
+        if status != 200:
+            raise RuntimeError(f"{method} {path} -> {status}: {body[:200]!r}")
+        return status, body
+
+    def close(self) -> None:
+        self.loop.close()
+
+
+def bench_size(size: int, min_time: float, workdir: Path) -> List[Dict[str, Any]]:
+    repo = make_repo(workdir / f"repo-{size}", size)
+    checklist_path = repo / ".mcp" / "checklist.yaml"
+    readme = (repo / "README.md").read_text(encoding="utf-8")
+    results: List[Dict[str, Any]] = []
+
+    def reset_cache() -> None:
+        srv.file_cache.invalidate(("checklist", str(checklist_path)))
+
+    results.append(measure("load_checklist.cold", size, repo, lambda: srv.load_checklist(repo), min_time, setup=reset_cache))
+    results.append(measure("load_checklist.warm", size, repo, lambda: srv.load_checklist(repo), min_time))
+    results.append(measure("load_yaml", size, repo, lambda: load_yaml(checklist_path), min_time))
+    results.append(measure("extract_mcp_job_section", size, repo, lambda: srv.extract_mcp_job_section(readme), min_time))
+    results.append(measure("readme_job_section.warm", size, repo, lambda: srv.readme_job_section(repo), min_time))
+    checklist = srv.load_checklist(repo)
+    results.append(measure("render_checklist_md", size, repo, lambda: srv.render_checklist_md(checklist), min_time))
+    results.append(measure("write_checklist_md", size, repo, lambda: srv.write_checklist_md(repo, checklist), min_time))
+
+    def clean_scaffold() -> None:
+        for path in (repo / "src" / "tasks").glob("*.py") if (repo / "src" / "tasks").is_dir() else []:
+            path.unlink()
+
+    results.append(
+        measure("scaffold.cold", size, repo, lambda: srv.scaffold_from_checklist(repo), min_time, max_iterations=20, setup=clean_scaffold)
+    )
+    srv.scaffold_from_checklist(repo)
+    results.append(measure("scaffold.noop", size, repo, lambda: srv.scaffold_from_checklist(repo), min_time))
+    results.append(measure("list_task_status", size, repo, lambda: srv.list_task_status(repo), min_time))
+    flip = [False]
+
+    def mark() -> None:
+        flip[0] = not flip[0]
+        srv.mark_checklist_item(repo, f"task-{size // 2:05d}", flip[0])
+
+    results.append(measure("mark_checklist_item", size, repo, mark, min_time))
+
+    client = AsgiClient(srv.app)
+    try:
+        body = {"repoPath": str(repo)}
+        routes = [
+            ("GET", "/health", None),
+            ("POST", "/checklist", body),
+            ("POST", "/tasks/status", body),
+            ("POST", "/scaffold", body),
+            ("POST", "/checklist/mark", {**body, "taskId": "task-00000", "checked": True}),
+        ]
+        for method, path, payload in routes:
+            results.append(
+                measure(f"http {method} {path}", size, repo, lambda m=method, p=path, b=payload: client.request(m, p, b), min_time)
+            )
+    finally:
+        client.close()
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: List[int], min_time: float) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="tdd-mcp-bench-") as tmp:
+        for size in sizes:
+            results.extend(bench_size(size, min_time, Path(tmp)))
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sizes": sizes,
+            "minTime": min_time,
+            "maxRssKb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """p50 / p99 ratios current/baseline per (name, size); > 1 means slower."""
+    old = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    rows = []
+    for r in current["results"]:
+        b = old.get((r["name"], r["size"]))
+        if b is None:
+            continue
+        rows.append({
+            "name": r["name"],
+            "size": r["size"],
+            "p50Ratio": round(r["p50Ms"] / b["p50Ms"], 3) if b["p50Ms"] else None,
+            "p99Ratio": round(r["p99Ms"] / b["p99Ms"], 3) if b["p99Ms"] else None,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="comma-separated checklist task counts")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend per case (at least 3 runs)")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline report to compare against (adds `comparison`)")
+    args = parser.parse_args(argv)
+    report = run([int(s) for s in args.sizes.split(",") if s.strip()], args.min_time)
+    if args.compare:
+        report["comparison"] = compare(json.loads(Path(args.compare).read_text(encoding="utf-8")), report)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    for r in report["results"]:
+        print(
+            f"{r['name']:<32} n={r['size']:<6} p50={r['p50Ms']:>10.3f}ms p99={r['p99Ms']:>10.3f}ms "
+            f"{r['throughputPerSec'] or 0:>10.1f}/s peak={r['peakAllocKb']:>9.1f}KiB files={r['filesWritten']}",
+            file=sys.stderr,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Intentionally empty: marks server as a package.
@@ -0,0 +1,50 @@
+"""Fan one request out over many repositories and report each result as soon as it is ready."""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from server.output import format_event
+from server.settings import env_int
+
+BATCH_CONCURRENCY = env_int("MCP_BATCH_CONCURRENCY", 16)
+
+
+async def fan_out(
+    repos: List[str],
+    fn: Callable[[str], Awaitable[Dict[str, Any]]],
+    limit: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield {"repoPath", ...fn(repo)} in completion order, at most `limit` fn calls in flight.
+
+    Repos are admitted in request order (asyncio.Semaphore wakes waiters FIFO),
+    so a slow repo only ever holds its own slot.
+    """
+    slots = asyncio.Semaphore(limit or BATCH_CONCURRENCY)
+
+    async def one(repo: str) -> Dict[str, Any]:
+        async with slots:
+            try:
+                return {"repoPath": repo, **await fn(repo)}
+            except Exception as e:
+                return {"repoPath": repo, "ok": False, "error": str(e)}
+
+    tasks = [asyncio.ensure_future(one(repo)) for repo in dict.fromkeys(repos)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def stream_results(results: AsyncIterator[Dict[str, Any]], fmt: str) -> AsyncIterator[str]:
+    count = failed = 0
+    async for result in results:
+        count += 1
+        failed += result.get("ok") is False or result.get("status") in ("failed", "cancelled")
+        yield format_event({"type": "result", **result}, fmt)
+    yield format_event({"type": "done", "count": count, "failed": failed}, fmt)
+
+
+async def collect_results(results: AsyncIterator[Dict[str, Any]], order: List[str]) -> Dict[str, Any]:
+    by_repo = {r["repoPath"]: r async for r in results}
+    return {"results": [by_repo[repo] for repo in dict.fromkeys(order)]}
@@ -0,0 +1,122 @@
+"""Skip dependency installs whose inputs have not changed since the last successful run."""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from server.settings import state_dir
+
+
+# Files whose content decides what an install step produces, per language.
+DEPENDENCY_FILES: Dict[str, List[str]] = {
+    "python": [
+        "pyproject.toml",
+        "setup.py",
+        "setup.cfg",
+        "requirements.txt",
+        "requirements-dev.txt",
+        "Pipfile.lock",
+        "poetry.lock",
+    ],
+    "node": ["package.json", "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml"],
+    "go": ["go.mod", "go.sum"],
+}
+
+# Install outputs that live inside the repo. Those present after a recorded
+# install must still exist for its entry to match; they are not part of the
+# fingerprint, which is taken before the install creates them.
+INSTALL_OUTPUTS: Dict[str, List[str]] = {
+    "node": ["node_modules"],
+    "go": [".mcp/cache/go-mod"],
+}
+
+# The parts of package.json that `npm ci` acts on; editing anything else (test
+# scripts, metadata) must not throw away node_modules.
+NPM_INSTALL_FIELDS = (
+    "dependencies",
+    "devDependencies",
+    "optionalDependencies",
+    "peerDependencies",
+    "bundleDependencies",
+    "bundledDependencies",
+    "overrides",
+    "workspaces",
+)
+NPM_INSTALL_SCRIPTS = ("preinstall", "install", "postinstall", "prepare")
+
+
+def dependency_digest(repo_root: Path, name: str) -> Optional[bytes]:
+    """sha256 of a dependency file (None when missing); package.json counts only its install fields."""
+    try:
+        data = (repo_root / name).read_bytes()
+    except OSError:
+        return None
+    if name == "package.json":
+        try:
+            pkg = json.loads(data)
+            scripts = pkg.get("scripts") or {}
+            relevant = {k: pkg[k] for k in NPM_INSTALL_FIELDS if k in pkg}
+            relevant["scripts"] = {k: scripts[k] for k in NPM_INSTALL_SCRIPTS if k in scripts}
+            data = json.dumps(relevant, sort_keys=True).encode()
+        except (ValueError, AttributeError, TypeError):
+            pass  # not a JSON object: hash it as is
+    return hashlib.sha256(data).digest()
+
+
+def dependency_fingerprint(repo_root: Path, language: str, cmds: List[List[str]]) -> str:
+    h = hashlib.sha256()
+    h.update(language.encode())
+    h.update(json.dumps(cmds).encode())
+    for name in DEPENDENCY_FILES.get(language, []):
+        digest = dependency_digest(repo_root, name)
+        if digest is None:
+            continue
+        h.update(b"\0" + name.encode() + b"\0")
+        h.update(digest)
+    return h.hexdigest()
+
+
+class BootstrapCache:
+    """Last successful install fingerprint per (repo, language).
+
+    Lives in the server's state directory, not the repo: a fresh container has
+    a fresh environment, so a fingerprint recorded elsewhere would be a false hit.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or state_dir("bootstrap") / "fingerprints.json"
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    @staticmethod
+    def _key(repo_root: Path, language: str) -> str:
+        return f"{repo_root}::{language}"
+
+    def matches(self, repo_root: Path, language: str, fingerprint: str) -> bool:
+        entry = self._load().get(self._key(repo_root, language))
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return False
+        return all((repo_root / name).exists() for name in entry.get("outputs", []))
+
+    def record(self, repo_root: Path, language: str, fingerprint: str) -> None:
+        outputs = [name for name in INSTALL_OUTPUTS.get(language, []) if (repo_root / name).exists()]
+        self._load()[self._key(repo_root, language)] = {"fingerprint": fingerprint, "outputs": outputs, "at": time.time()}
+        self._save()
+
+    def forget(self, repo_root: Path, language: str) -> None:
+        if self._load().pop(self._key(repo_root, language), None) is not None:
+            self._save()
+
+    def _save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._load()), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -0,0 +1,145 @@
+"""In-memory cache of values derived from repo files (parsed checklist, task listing, master.py).
+
+An entry stays valid while the (mtime, size, inode) signature of every file or
+directory it was derived from is unchanged. Entries are evicted LRU across
+repos. With MCP_CHECKLIST_INOTIFY=1 entries are invalidated by inotify events
+instead, so a hit does not even stat the files.
+"""
+import functools
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from server.fswatch import IN_Q_OVERFLOW, Inotify
+from server.settings import env_int
+
+Signature = Optional[Tuple[int, int, int]]
+
+
+def signature(path: Path) -> Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+@functools.lru_cache(maxsize=None)
+def yaml_loader() -> Any:
+    """libyaml-backed loader when PyYAML was built with it; several times faster.
+
+    yaml is imported on first use rather than at server start.
+    """
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(path: Path) -> Any:
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=yaml_loader())
+
+
+class FileCache:
+    def __init__(self, max_entries: Optional[int] = None, use_inotify: Optional[bool] = None):
+        self.max_entries = max_entries or env_int("MCP_CHECKLIST_CACHE_SIZE", 1024)
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[Signature, ...], Any, bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if use_inotify is None:
+            use_inotify = os.environ.get("MCP_CHECKLIST_INOTIFY", "") not in ("", "0")
+        self._inotify = Inotify.create() if use_inotify else None
+        self._wd_keys: Dict[int, Set[Hashable]] = {}
+        self._key_wds: Dict[Hashable, Set[int]] = {}
+        self._generation: Dict[Hashable, int] = {}
+        if self._inotify is not None:
+            threading.Thread(target=self._watch_loop, name="checklist-cache-inotify", daemon=True).start()
+
+    def _watch(self, key: Hashable, paths: List[Path]) -> bool:
+        """Register inotify watches covering `paths`; False if any of them can't be covered."""
+        if self._inotify is None:
+            return False
+        # under the lock, so a watch being added cannot be removed by _forget() for another key
+        with self._lock:
+            for p in paths:
+                target = p if p.is_dir() else p.parent
+                wd = self._inotify.add_watch(str(target)) if target.is_dir() else None
+                if wd is None:
+                    return False
+                self._wd_keys.setdefault(wd, set()).add(key)
+                self._key_wds.setdefault(key, set()).add(wd)
+        return True
+
+    def _forget(self, key: Hashable) -> None:
+        """Drop key's entry and its watches, removing those no other key needs. Lock held."""
+        self._entries.pop(key, None)
+        for wd in self._key_wds.pop(key, ()):
+            keys = self._wd_keys.get(wd)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._wd_keys[wd]
+                assert self._inotify is not None
+                self._inotify.rm_watch(wd)
+
+    def _watch_loop(self) -> None:
+        assert self._inotify is not None
+        while True:
+            try:
+                events = self._inotify.read()
+            except OSError:
+                return
+            with self._lock:
+                for wd, mask, _name in events:
+                    keys = list(self._entries) if mask & IN_Q_OVERFLOW else list(self._wd_keys.get(wd, ()))
+                    for key in keys:
+                        self._forget(key)
+                        self._generation[key] = self._generation.get(key, 0) + 1
+
+    def get(self, key: Hashable, paths: List[Path], compute: Callable[[], Any]) -> Any:
+        """Cached compute(); callers must treat the returned value as read-only."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        sigs = tuple(signature(p) for p in paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == sigs:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation.get(key, 0)
+        # Watch before computing; an event that lands mid-compute demotes the entry to stat checks.
+        watched = self._watch(key, paths)
+        value = compute()
+        with self._lock:
+            watched = watched and self._generation.get(key, 0) == generation
+            self._entries[key] = (sigs, value, watched)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._forget(next(iter(self._entries)))
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._forget(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "inotify": self._inotify is not None,
+            "watches": len(self._wd_keys),
+            "yamlLoader": yaml_loader().__name__,
+        }
@@ -0,0 +1,171 @@
+"""Indexed, batched and atomic checkbox updates for CHECKLIST.md.
+
+A task-id -> checkbox byte offset index is kept next to the file (in memory and
+under .mcp/cache/) so a mark touches only the checkbox bytes instead of scanning
+every line. Concurrent marks for one repo are group-committed: whoever holds the
+repo lock applies every pending request in a single write-via-rename.
+"""
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from server.checklist_cache import signature
+
+INDEX_PATH = Path(".mcp") / "cache" / "checklist-md.json"
+_ID_RE = re.compile(rb"\(([^()\n]*)\)")
+CHECKED = b"- [x]"
+UNCHECKED = b"- [ ]"
+
+
+def build_index(content: bytes) -> Dict[str, List[int]]:
+    """Offsets of the '- [' checkbox of every checkbox line, keyed by each '(id)' on the line."""
+    index: Dict[str, List[int]] = {}
+    pos = 0
+    for line in content.split(b"\n"):
+        stripped = line.lstrip()
+        if stripped.startswith(b"- ["):
+            box = pos + (len(line) - len(stripped))
+            for raw in _ID_RE.findall(line):
+                index.setdefault(raw.decode("utf-8", errors="replace"), []).append(box)
+        pos += len(line) + 1
+    return index
+
+
+def checked_ids(content: bytes) -> FrozenSet[str]:
+    """Ids whose checkbox is ticked."""
+    return frozenset(tid for tid, offsets in build_index(content).items() if any(content[o:o + 5] == CHECKED for o in offsets))
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Replace path's content via a temp file and rename, keeping its permissions."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_bytes(data)
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class _Request:
+    def __init__(self, marks: Dict[str, bool]):
+        self.marks = marks
+        self.result: Optional[Dict[str, Any]] = None
+        self.done = False
+
+
+class ChecklistMarker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._repo_locks: Dict[str, threading.Lock] = {}
+        self._pending: Dict[str, List[_Request]] = {}
+        self._indexes: Dict[str, Tuple[Any, Dict[str, List[int]]]] = {}
+        self.writes = 0
+
+    def _repo_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(key, threading.Lock())
+
+    def _load_index(self, repo_root: Path, md_path: Path, content: bytes) -> Dict[str, List[int]]:
+        sig = signature(md_path)
+        cached = self._indexes.get(str(md_path))
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        sidecar = repo_root / INDEX_PATH
+        try:
+            data = json.loads(sidecar.read_text(encoding="utf-8"))
+            if tuple(data.get("signature") or ()) == sig:
+                self._indexes[str(md_path)] = (sig, data["index"])
+                return data["index"]
+        except (OSError, ValueError, KeyError):
+            pass
+        index = build_index(content)
+        self._store_index(repo_root, md_path, index)
+        return index
+
+    def _store_index(self, repo_root: Path, md_path: Path, index: Dict[str, List[int]]) -> None:
+        sig = signature(md_path)
+        self._indexes[str(md_path)] = (sig, index)
+        sidecar = repo_root / INDEX_PATH
+        try:
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            tmp = sidecar.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"signature": list(sig or ()), "index": index}), encoding="utf-8")
+            os.replace(tmp, sidecar)
+        except OSError:
+            pass
+
+    @contextmanager
+    def locked(self, repo_root: Path) -> Iterator[None]:
+        """Hold the repo's CHECKLIST.md lock, e.g. to rewrite the file without losing a concurrent mark."""
+        with self._repo_lock(str(repo_root / "CHECKLIST.md")):
+            yield
+
+    def mark(self, repo_root: Path, marks: Dict[str, bool]) -> Dict[str, Any]:
+        md_path = repo_root / "CHECKLIST.md"
+        key = str(md_path)
+        req = _Request(marks)
+        with self._lock:
+            self._pending.setdefault(key, []).append(req)
+        with self._repo_lock(key):
+            if not req.done:
+                with self._lock:
+                    batch = self._pending.pop(key, [])
+                self._apply(repo_root, md_path, batch)
+        assert req.result is not None
+        return req.result
+
+    def _apply(self, repo_root: Path, md_path: Path, batch: List[_Request]) -> None:
+        try:
+            content = bytearray(md_path.read_bytes())
+        except OSError:
+            for req in batch:
+                req.result = {"ok": False, "error": "CHECKLIST.md not found"}
+                req.done = True
+            return
+        index = self._load_index(repo_root, md_path, bytes(content))
+        touched = [o for req in batch for task_id in req.marks for o in index.get(task_id, ())]
+        if any(content[o:o + 3] != b"- [" for o in touched):
+            # index out of sync with the file: rebuild from the content we hold
+            index = build_index(bytes(content))
+        dirty = False
+        for req in batch:
+            updated: List[str] = []
+            unchanged: List[str] = []
+            missing: List[str] = []
+            for task_id, checked in req.marks.items():
+                offsets = index.get(task_id)
+                if not offsets:
+                    missing.append(task_id)
+                    continue
+                want, other = (CHECKED, UNCHECKED) if checked else (UNCHECKED, CHECKED)
+                flipped = False
+                for off in offsets:
+                    if bytes(content[off:off + 5]) == other:
+                        content[off:off + 5] = want
+                        flipped = True
+                (updated if flipped else unchanged).append(task_id)
+            dirty = dirty or bool(updated)
+            req.result = {
+                "ok": True,
+                "changed": bool(updated),
+                "path": str(md_path),
+                "updated": updated,
+                "unchanged": unchanged,
+                "missing": missing,
+            }
+        if dirty:
+            atomic_write(md_path, bytes(content))
+            self.writes += 1
+        # Flipping ' ' <-> 'x' keeps every offset valid; only the signature moves.
+        self._store_index(repo_root, md_path, index)
+        for req in batch:
+            req.done = True
@@ -0,0 +1,117 @@
+"""Run checklist tasks as a dependency graph (`depends_on`), independent tasks concurrently."""
+import asyncio
+import heapq
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+Graph = Dict[str, List[str]]
+
+
+def task_graph(tasks: List[Dict[str, Any]]) -> Graph:
+    """task id -> ids it depends on, in checklist order; raises ValueError on unknown ids or cycles."""
+    graph: Graph = {}
+    for t in tasks:
+        deps = t.get("depends_on") or []
+        graph[str(t.get("id", "task"))] = [deps] if isinstance(deps, str) else [str(d) for d in deps]
+    for tid, deps in graph.items():
+        unknown = [d for d in deps if d not in graph]
+        if unknown:
+            raise ValueError(f"Task '{tid}' depends on unknown task(s): {', '.join(unknown)}")
+    topo_order(graph)
+    return graph
+
+
+def topo_order(graph: Graph) -> List[str]:
+    """Kahn's algorithm, always taking the earliest-declared ready task (declaration order when there are no deps)."""
+    position = {tid: i for i, tid in enumerate(graph)}
+    indegree = {tid: len(set(deps)) for tid, deps in graph.items()}
+    dependents: Graph = {tid: [] for tid in graph}
+    for tid, deps in graph.items():
+        for d in set(deps):
+            dependents[d].append(tid)
+    ready = [position[tid] for tid in graph if indegree[tid] == 0]
+    heapq.heapify(ready)
+    names = list(graph)
+    order: List[str] = []
+    while ready:
+        tid = names[heapq.heappop(ready)]
+        order.append(tid)
+        for nxt in dependents[tid]:
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                heapq.heappush(ready, position[nxt])
+    if len(order) != len(graph):
+        cyclic = sorted(tid for tid in graph if indegree[tid] > 0)
+        raise ValueError(f"Dependency cycle among tasks: {', '.join(cyclic)}")
+    return order
+
+
+def critical_path(graph: Graph, durations: Dict[str, float]) -> List[str]:
+    """Longest chain of dependent tasks by duration."""
+    best: Dict[str, float] = {}
+    prev: Dict[str, Optional[str]] = {}
+    for tid in topo_order(graph):
+        via = max(graph[tid], key=lambda d: best[d], default=None)
+        best[tid] = durations.get(tid, 0.0) + (best[via] if via else 0.0)
+        prev[tid] = via
+    if not best:
+        return []
+    node: Optional[str] = max(best, key=lambda t: best[t])
+    path: List[str] = []
+    while node is not None:
+        path.append(node)
+        node = prev[node]
+    return path[::-1]
+
+
+async def run_graph(graph: Graph, run: Callable[[str], Awaitable[Dict[str, Any]]], width: int) -> Dict[str, Any]:
+    """Start every task as soon as its dependencies passed, at most `width` at a time.
+
+    run(task_id) returns a dict with an exit `code`; tasks whose dependencies
+    failed are reported as skipped without running.
+    """
+    started = time.monotonic()
+    slots = asyncio.Semaphore(max(1, width))
+    done: Dict[str, asyncio.Future] = {tid: asyncio.get_running_loop().create_future() for tid in graph}
+    results: Dict[str, Dict[str, Any]] = {}
+
+    async def one(tid: str) -> None:
+        outcomes = [await done[d] for d in graph[tid]]
+        if not all(outcomes):
+            failed = [d for d, ok in zip(graph[tid], outcomes) if not ok]
+            results[tid] = {"id": tid, "status": "skipped", "dependsOn": graph[tid], "reason": f"dependency failed: {', '.join(failed)}"}
+            done[tid].set_result(False)
+            return
+        async with slots:
+            t0 = time.monotonic()
+            try:
+                res = await run(tid)
+            except Exception as e:
+                res = {"code": -1, "output": f"Error: {str(e)}"}
+            t1 = time.monotonic()
+        ok = res.get("code") == 0
+        results[tid] = {
+            "id": tid,
+            "status": "passed" if ok else "failed",
+            "dependsOn": graph[tid],
+            "startMs": round((t0 - started) * 1000, 1),
+            "durationMs": round((t1 - t0) * 1000, 1),
+            **res,
+        }
+        done[tid].set_result(ok)
+
+    await asyncio.gather(*(one(tid) for tid in graph))
+    durations = {tid: r.get("durationMs", 0.0) for tid, r in results.items()}
+    path = critical_path(graph, durations)
+    ordered = [results[tid] for tid in graph]
+    ok = all(r["status"] == "passed" for r in ordered)
+    return {
+        "ok": ok,
+        "code": 0 if ok else 1,
+        "width": max(1, width),
+        "wallMs": round((time.monotonic() - started) * 1000, 1),
+        "totalTaskMs": round(sum(durations.values()), 1),
+        "criticalPath": path,
+        "criticalPathMs": round(sum(durations[t] for t in path), 1),
+        "tasks": ordered,
+    }
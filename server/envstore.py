@@ -0,0 +1,178 @@
+"""Shared store of dependency environments, one per dependency fingerprint.
+
+Python gets a virtualenv per fingerprint, Node a node_modules tree that is
+symlinked into each repo using it. Repos with identical dependency files share
+an entry; a Python project installed editable (`pip install -e .`) also keys on
+its path, since the install points back at that checkout. Entries are evicted
+least-recently-used once the store exceeds MCP_ENV_STORE_BUDGET_MB. Go needs
+none of this: it keeps its build and module caches with the repo (see golang.py).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from server.bootstrap_cache import DEPENDENCY_FILES, dependency_digest
+from server.settings import env_int, state_dir
+
+STORE_LANGUAGES = ("python", "node")
+READY_MARKER = ".mcp-env-ready"
+
+
+def enabled() -> bool:
+    return os.environ.get("MCP_ENV_STORE", "1") not in ("", "0")
+
+
+def env_fingerprint(repo_root: Path, language: str, cmds: List[List[str]]) -> str:
+    h = hashlib.sha256()
+    h.update(f"{language}\0{sys.version_info[:2]}\0{json.dumps(cmds)}".encode())
+    for name in DEPENDENCY_FILES.get(language, []):
+        digest = dependency_digest(repo_root, name)
+        if digest is None:
+            continue
+        h.update(b"\0" + name.encode() + b"\0" + digest)
+    if language == "python" and any("-e" in cmd for cmd in cmds):
+        h.update(b"\0editable:" + str(repo_root).encode())
+    return h.hexdigest()[:24]
+
+
+def dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class EnvStore:
+    def __init__(self, root: Optional[Path] = None, budget_mb: Optional[int] = None):
+        self.root = root or state_dir("envs")
+        self.budget = (budget_mb or env_int("MCP_ENV_STORE_BUDGET_MB", 10240)) * 1024 * 1024
+        self.index_path = self.root / "index.json"
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._in_use: Dict[str, int] = {}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._index is None:
+            try:
+                self._index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save(self) -> None:
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._load()), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    @staticmethod
+    def key(language: str, fingerprint: str) -> str:
+        return f"{language}-{fingerprint}"
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def lock(self, key: str) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    def ready(self, key: str) -> bool:
+        return (self.path(key) / READY_MARKER).exists()
+
+    def begin(self, key: str) -> Path:
+        """Empty directory for (re)building an entry; it stays invisible until commit()."""
+        path = self.path(key)
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+        return path
+
+    def commit(self, key: str, language: str) -> None:
+        path = self.path(key)
+        (path / READY_MARKER).write_text(str(time.time()), encoding="utf-8")
+        self._load()[key] = {"language": language, "size": dir_size(path), "lastUsed": time.time()}
+        self.evict(keep=key)
+        self._save()
+
+    def discard(self, key: str) -> None:
+        shutil.rmtree(self.path(key), ignore_errors=True)
+        if self._load().pop(key, None) is not None:
+            self._save()
+
+    @contextmanager
+    def use(self, key: str) -> Iterator[None]:
+        """Mark an entry as in use (never evicted meanwhile) and bump its LRU position."""
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        entry = self._load().get(key)
+        if entry is not None:
+            entry["lastUsed"] = time.time()
+            self._save()
+        try:
+            yield
+        finally:
+            self._in_use[key] -= 1
+            if not self._in_use[key]:
+                del self._in_use[key]
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        index = self._load()
+        total = sum(e.get("size", 0) for e in index.values())
+        evicted: List[str] = []
+        for key, entry in sorted(index.items(), key=lambda kv: kv[1].get("lastUsed", 0)):
+            if total <= self.budget:
+                break
+            if key in self._in_use or key == keep:
+                continue
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            total -= entry.get("size", 0)
+            evicted.append(key)
+        for key in evicted:
+            del index[key]
+        return evicted
+
+    def activation(self, language: str, key: str) -> Dict[str, str]:
+        """Environment variables for running commands inside an entry."""
+        env = dict(os.environ)
+        if language == "python":
+            venv = self.path(key)
+            env.pop("PYTHONHOME", None)
+            env["VIRTUAL_ENV"] = str(venv)
+            env["PATH"] = f"{venv / 'bin'}{os.pathsep}{env.get('PATH', '')}"
+        return env
+
+    def link_node_modules(self, repo_root: Path, key: str) -> None:
+        """Point repo/node_modules at the stored tree (replacing whatever was there)."""
+        target = self.path(key) / "node_modules"
+        link = repo_root / "node_modules"
+        if link.is_symlink():
+            if os.readlink(link) == str(target):
+                return
+            link.unlink()
+        elif link.exists():
+            shutil.rmtree(link)
+        link.symlink_to(target, target_is_directory=True)
+
+    def adopt_node_modules(self, repo_root: Path, key: str) -> None:
+        """Move a freshly installed repo/node_modules into the entry and link it back."""
+        src = repo_root / "node_modules"
+        if src.is_symlink() or not src.is_dir():
+            raise RuntimeError("npm did not produce node_modules")
+        shutil.move(str(src), str(self.path(key) / "node_modules"))
+        self.link_node_modules(repo_root, key)
+
+    def stats(self) -> Dict[str, Any]:
+        index = self._load()
+        return {
+            "entries": len(index),
+            "bytes": sum(e.get("size", 0) for e in index.values()),
+            "budgetBytes": self.budget,
+            "inUse": len(self._in_use),
+        }
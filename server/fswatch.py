@@ -0,0 +1,93 @@
+"""Minimal Linux inotify binding (ctypes, no extra dependency).
+
+Inotify.create() returns None where inotify is unavailable (non-Linux, seccomp,
+exhausted watch limits); callers then fall back to polling with os.stat.
+"""
+import errno
+import os
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+CHANGE_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    def __init__(self, fd: int, libc: Any):
+        self.fd = fd
+        self._libc = libc
+        self.paths: Dict[int, str] = {}
+
+    @classmethod
+    def create(cls, nonblocking: bool = False) -> Optional["Inotify"]:
+        if not sys.platform.startswith("linux") or os.environ.get("MCP_DISABLE_INOTIFY"):
+            return None
+        import ctypes
+        import ctypes.util
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_CLOEXEC | (IN_NONBLOCK if nonblocking else 0))
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        return cls(fd, libc)
+
+    def add_watch(self, path: str, mask: int = CHANGE_MASK) -> Optional[int]:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            return None
+        self.paths[wd] = path
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+        self.paths.pop(wd, None)
+
+    def read(self) -> List[Tuple[int, int, str]]:
+        """Pending events as (wd, mask, name); blocks unless created nonblocking."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            raw = data[offset + _EVENT.size: offset + _EVENT.size + length]
+            events.append((wd, mask, os.fsdecode(raw.rstrip(b"\0"))))
+            offset += _EVENT.size + length
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+        return events
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
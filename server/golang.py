@@ -0,0 +1,115 @@
+"""Go fast path: build and module caches kept with the repo, and per-package test selection.
+
+GOCACHE and GOMODCACHE point into the repo's .mcp/cache, so compiled packages,
+cached test results and downloaded modules survive container restarts along
+with the mounted repo (MCP_GO_CACHE=0 keeps Go's own defaults). Given a set of
+changed files, affected_packages() narrows `go test` to the packages containing
+them plus every module package importing those, directly or from its tests.
+"""
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Set
+
+from server.impact import DOC_SUFFIXES
+from server.process import capture, command_env, current_env
+
+BUILD_CACHE = Path(".mcp") / "cache" / "go-build"
+MODULE_CACHE = Path(".mcp") / "cache" / "go-mod"
+# Changing any of these can affect every package, so they force a full run.
+CONFIG_FILES = {"go.mod", "go.sum", "go.work", "go.work.sum"}
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("MCP_GO_CACHE", "1") not in ("", "0")
+
+
+def cache_env(repo_root: Path) -> Dict[str, str]:
+    env = dict(current_env.get() or os.environ)
+    env["GOCACHE"] = str(repo_root / BUILD_CACHE)
+    env["GOMODCACHE"] = str(repo_root / MODULE_CACHE)
+    flags = env.get("GOFLAGS", "").split()
+    if "-modcacherw" not in flags:
+        # Go makes the module cache read-only by default, which would make .mcp/cache hard to delete
+        flags.append("-modcacherw")
+    env["GOFLAGS"] = " ".join(flags)
+    return env
+
+
+@contextmanager
+def caches(repo_root: Path) -> Iterator[None]:
+    """Run the enclosed go commands against the repo's caches (no-op when disabled)."""
+    if not cache_enabled():
+        yield
+        return
+    with command_env(cache_env(repo_root)):
+        yield
+
+
+async def list_packages(repo_root: Path) -> List[Dict[str, Any]]:
+    """`go list -json ./...` for the module's packages; RuntimeError when go list fails."""
+    code, out, err = await capture(["go", "list", "-e", "-json", "./..."], repo_root)
+    if code != 0:
+        raise RuntimeError(f"go list failed: {err.decode(errors='replace').strip()}")
+    text = out.decode("utf-8", errors="replace")
+    decoder = json.JSONDecoder()
+    packages: List[Dict[str, Any]] = []
+    pos = 0
+    while True:
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+        if pos >= len(text):
+            return packages
+        package, pos = decoder.raw_decode(text, pos)
+        packages.append(package)
+
+
+def select_packages(repo_root: Path, packages: List[Dict[str, Any]], changed: List[str]) -> Dict[str, Any]:
+    """Pick the packages affected by `changed` (repo-relative paths) from `go list -json` output.
+
+    Returns {"mode": "selected", "packages": [...]} or {"mode": "full", "reason": ...}.
+    """
+    by_dir = {os.path.relpath(p["Dir"], repo_root): p["ImportPath"] for p in packages if p.get("Dir")}
+    touched: Set[str] = set()
+    for rel in changed:
+        if os.path.basename(rel) in CONFIG_FILES:
+            return {"mode": "full", "reason": f"{rel} affects every package"}
+        directory = os.path.dirname(rel) or "."
+        parts = directory.split(os.sep)
+        if any(part.startswith((".", "_")) for part in parts if part != "."):
+            continue  # ./... never matches these directories
+        if "testdata" in parts:
+            # testdata belongs to the package directory above it
+            directory = os.sep.join(parts[: parts.index("testdata")]) or "."
+        elif Path(rel).suffix in DOC_SUFFIXES:
+            continue
+        if directory in by_dir:
+            touched.add(by_dir[directory])
+        elif rel.endswith(".go"):
+            return {"mode": "full", "reason": f"{rel} is not in a known package (new or removed?)"}
+    local = {p["ImportPath"] for p in packages}
+    importers: Dict[str, Set[str]] = {}
+    for p in packages:
+        for dep in set(p.get("Imports", [])) | set(p.get("TestImports", [])) | set(p.get("XTestImports", [])):
+            if dep in local:
+                importers.setdefault(dep, set()).add(p["ImportPath"])
+    affected: Set[str] = set()
+    frontier = list(touched)
+    while frontier:
+        name = frontier.pop()
+        if name in affected:
+            continue
+        affected.add(name)
+        frontier.extend(importers.get(name, ()))
+    return {"mode": "selected", "packages": [p["ImportPath"] for p in packages if p["ImportPath"] in affected]}
+
+
+async def affected_packages(repo_root: Path, changed: List[str]) -> Dict[str, Any]:
+    try:
+        with caches(repo_root):
+            packages = await list_packages(repo_root)
+    except (OSError, RuntimeError, ValueError) as e:
+        return {"mode": "full", "reason": str(e)}
+    return select_packages(repo_root, packages, changed)
+
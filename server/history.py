@@ -0,0 +1,314 @@
+"""Run history: per-test outcomes and durations of every test run, kept in .mcp/history.db.
+
+One SQLite file per repo, in WAL mode. Test ids are interned and results live in
+a WITHOUT ROWID table clustered by run, so a result costs under 20 bytes. Each
+run records its kind, wall time, source-tree hash and the wall time of each
+phase (install / test, per language). Results that came from the test-result
+cache are not recorded again. Only the newest MCP_HISTORY_RUNS runs are kept.
+Queries cover the slowest tests, duration regressions, flaky tests, time trends
+and per-test stats for test ordering.
+"""
+import os
+import sqlite3
+import statistics
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from server.settings import env_int
+
+HISTORY_PATH = Path(".mcp") / "history.db"
+OUTCOMES = ("passed", "failed", "error", "skipped")
+FAILED = (1, 2)
+SKIPPED = 3
+ORDERINGS = ("failed-first", "shortest-first")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY, kind TEXT NOT NULL, started REAL NOT NULL, duration_ms REAL NOT NULL,
+    ok INTEGER NOT NULL, tree TEXT
+);
+CREATE TABLE IF NOT EXISTS tests (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS results (
+    run INTEGER NOT NULL, test INTEGER NOT NULL, outcome INTEGER NOT NULL, duration_us INTEGER NOT NULL,
+    PRIMARY KEY (run, test)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS phases (
+    run INTEGER NOT NULL, phase TEXT NOT NULL, language TEXT NOT NULL, duration_ms REAL NOT NULL,
+    PRIMARY KEY (run, phase, language)
+) WITHOUT ROWID;
+"""
+
+
+def enabled() -> bool:
+    return os.environ.get("MCP_HISTORY", "1") not in ("", "0")
+
+
+def connect(repo_root: Path) -> sqlite3.Connection:
+    path = repo_root / HISTORY_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    # auto_vacuum only takes effect before the first table is created
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def test_results(result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Per-test results of the steps a bootstrap_and_test / run_tests result actually ran."""
+    steps = list(result.get("results", []))
+    if isinstance(result.get("focused"), dict):
+        steps.append(result["focused"])
+    for step in steps:
+        if step.get("cached"):
+            continue
+        yield from (step.get("tests") or {}).get("results", [])
+
+
+def run_ok(result: Dict[str, Any]) -> bool:
+    steps = list(result.get("results", [])) + ([result["focused"]] if isinstance(result.get("focused"), dict) else [])
+    return bool(result.get("ok", True)) and all(s.get("code", 1) == 0 for s in steps)
+
+
+def record(
+    repo_root: Path,
+    kind: str,
+    started: float,
+    seconds: float,
+    result: Dict[str, Any],
+    phases: Dict[Tuple[str, str], float],
+    keep: Optional[int] = None,
+) -> int:
+    """Append one run; returns its id."""
+    keep = keep or env_int("MCP_HISTORY_RUNS", 1000)
+    with closing(connect(repo_root)) as conn, conn:
+        run = conn.execute(
+            "INSERT INTO runs (kind, started, duration_ms, ok, tree) VALUES (?, ?, ?, ?, ?)",
+            (kind, started, round(seconds * 1000, 1), int(run_ok(result)), result.get("treeHash")),
+        ).lastrowid
+        rows = [
+            (t["id"], OUTCOMES.index(t["outcome"]) if t["outcome"] in OUTCOMES else 2, round(t.get("durationMs", 0) * 1000))
+            for t in test_results(result)
+        ]
+        conn.executemany("INSERT OR IGNORE INTO tests (name) VALUES (?)", ((name,) for name, _o, _d in rows))
+        conn.executemany(
+            "INSERT OR REPLACE INTO results (run, test, outcome, duration_us)"
+            " SELECT ?, id, ?, ? FROM tests WHERE name = ?",
+            ((run, outcome, us, name) for name, outcome, us in rows),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO phases (run, phase, language, duration_ms) VALUES (?, ?, ?, ?)",
+            ((run, phase, language, round(s * 1000, 1)) for (phase, language), s in phases.items()),
+        )
+        # prune in batches of a tenth so the orphan sweep and vacuum stay rare
+        (count,) = conn.execute("SELECT COUNT(*) FROM runs").fetchone()
+        if count > keep + max(1, keep // 10):
+            (cutoff,) = conn.execute("SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET ?", (keep - 1,)).fetchone()
+            for table, column in (("results", "run"), ("phases", "run"), ("runs", "id")):
+                conn.execute(f"DELETE FROM {table} WHERE {column} < ?", (cutoff,))
+            conn.execute("DELETE FROM tests WHERE id NOT IN (SELECT test FROM results)")
+    if count > keep + max(1, keep // 10):
+        with closing(connect(repo_root)) as conn:
+            conn.execute("PRAGMA incremental_vacuum")
+    return run
+
+
+def _window(kind: Optional[str]) -> str:
+    where = "WHERE kind = ?" if kind else ""
+    return f"SELECT id FROM runs {where} ORDER BY id DESC LIMIT ?"
+
+
+def _args(kind: Optional[str], window: int) -> Tuple[Any, ...]:
+    return (kind, window) if kind else (window,)
+
+
+def _median_ms(values_us: List[int]) -> float:
+    return round(statistics.median(values_us) / 1000, 1)
+
+
+def slowest(repo_root: Path, limit: int = 20, window: int = 50, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Tests by mean duration over the last `window` runs (skips excluded)."""
+    with closing(connect(repo_root)) as conn:
+        rows = conn.execute(
+            "SELECT t.name, COUNT(*), AVG(r.duration_us), MAX(r.duration_us) FROM results r JOIN tests t ON t.id = r.test"
+            f" WHERE r.run IN ({_window(kind)}) AND r.outcome != ? GROUP BY r.test ORDER BY AVG(r.duration_us) DESC LIMIT ?",
+            _args(kind, window) + (SKIPPED, limit),
+        ).fetchall()
+    return [{"id": name, "runs": n, "meanMs": round(mean / 1000, 1), "maxMs": round(top / 1000, 1)} for name, n, mean, top in rows]
+
+
+def _durations(conn: sqlite3.Connection, kind: Optional[str], window: int, offset: int) -> Dict[str, List[int]]:
+    where = "WHERE kind = ?" if kind else ""
+    runs = f"SELECT id FROM runs {where} ORDER BY id DESC LIMIT ? OFFSET ?"
+    out: Dict[str, List[int]] = {}
+    for name, us in conn.execute(
+        f"SELECT t.name, r.duration_us FROM results r JOIN tests t ON t.id = r.test WHERE r.run IN ({runs}) AND r.outcome != ?",
+        _args(kind, window) + (offset, SKIPPED),
+    ):
+        out.setdefault(name, []).append(us)
+    return out
+
+
+def regressions(
+    repo_root: Path,
+    window: int = 10,
+    baseline: int = 50,
+    min_ratio: float = 1.5,
+    min_delta_ms: float = 20.0,
+    limit: int = 20,
+    kind: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Tests whose median duration over the last `window` runs grew against the `baseline` runs before them."""
+    with closing(connect(repo_root)) as conn:
+        recent = _durations(conn, kind, window, 0)
+        before = _durations(conn, kind, baseline, window)
+    found = []
+    for name, values in recent.items():
+        if name not in before:
+            continue
+        now, then = _median_ms(values), _median_ms(before[name])
+        if now - then >= min_delta_ms and now >= then * min_ratio:
+            found.append({"id": name, "recentMs": now, "baselineMs": then, "ratio": round(now / then, 2) if then else None})
+    found.sort(key=lambda r: r["recentMs"] - r["baselineMs"], reverse=True)
+    return found[:limit]
+
+
+def flaky(repo_root: Path, window: int = 50, limit: int = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Tests that both passed and failed in the last `window` runs.
+
+    flakeRate is the share of consecutive runs whose outcome flipped; sameTreeFlips counts source
+    trees on which the test both passed and failed, which code changes cannot explain.
+    """
+    with closing(connect(repo_root)) as conn:
+        rows = conn.execute(
+            "SELECT t.name, r.outcome, u.tree FROM results r JOIN tests t ON t.id = r.test JOIN runs u ON u.id = r.run"
+            f" WHERE r.run IN ({_window(kind)}) AND r.outcome != ? ORDER BY r.test, r.run",
+            _args(kind, window) + (SKIPPED,),
+        ).fetchall()
+    per_test: Dict[str, List[Tuple[bool, Optional[str]]]] = {}
+    for name, outcome, tree in rows:
+        per_test.setdefault(name, []).append((outcome in FAILED, tree))
+    found = []
+    for name, runs in per_test.items():
+        failures = sum(1 for failed, _t in runs if failed)
+        if not 0 < failures < len(runs):
+            continue
+        flips = sum(1 for a, b in zip(runs, runs[1:]) if a[0] != b[0])
+        trees: Dict[Optional[str], set] = {}
+        for failed, tree in runs:
+            trees.setdefault(tree, set()).add(failed)
+        found.append({
+            "id": name,
+            "runs": len(runs),
+            "failures": failures,
+            "flakeRate": round(flips / (len(runs) - 1), 3),
+            "sameTreeFlips": sum(1 for tree, seen in trees.items() if tree is not None and len(seen) == 2),
+        })
+    found.sort(key=lambda r: (r["sameTreeFlips"], r["flakeRate"]), reverse=True)
+    return found[:limit]
+
+
+def _summary(values: List[float]) -> Dict[str, Any]:
+    return {"runs": len(values), "p50Ms": round(statistics.median(values), 1), "meanMs": round(statistics.fmean(values), 1)}
+
+
+def trends(repo_root: Path, window: int = 50, kind: Optional[str] = None) -> Dict[str, Any]:
+    """Wall time of the last `window` runs (oldest first) and of their phases, plus p50/mean per kind and phase."""
+    with closing(connect(repo_root)) as conn:
+        runs = conn.execute(
+            f"SELECT id, kind, started, duration_ms, ok FROM runs WHERE id IN ({_window(kind)}) ORDER BY id", _args(kind, window)
+        ).fetchall()
+        phases = conn.execute(
+            f"SELECT run, phase, language, duration_ms FROM phases WHERE run IN ({_window(kind)})", _args(kind, window)
+        ).fetchall()
+    by_run: Dict[int, Dict[str, float]] = {}
+    for run, phase, language, ms in phases:
+        by_run.setdefault(run, {})[f"{phase}:{language}" if language else phase] = ms
+    series = [
+        {"runId": run, "kind": k, "startedAt": started, "durationMs": ms, "ok": bool(ok), "phases": by_run.get(run, {})}
+        for run, k, started, ms, ok in runs
+    ]
+    kinds: Dict[str, List[float]] = {}
+    phase_values: Dict[str, List[float]] = {}
+    for entry in series:
+        kinds.setdefault(entry["kind"], []).append(entry["durationMs"])
+        for name, ms in entry["phases"].items():
+            phase_values.setdefault(name, []).append(ms)
+    return {
+        "runs": series,
+        "kinds": {k: _summary(v) for k, v in kinds.items()},
+        "phases": {k: _summary(v) for k, v in phase_values.items()},
+    }
+
+
+def test_stats(repo_root: Path, names: Optional[Iterable[str]] = None, window: int = 50) -> Dict[str, Dict[str, Any]]:
+    """Per test over the last `window` runs: runs, failRate, lastOutcome and median duration."""
+    wanted = set(names) if names is not None else None
+    with closing(connect(repo_root)) as conn:
+        rows = conn.execute(
+            "SELECT t.name, r.outcome, r.duration_us FROM results r JOIN tests t ON t.id = r.test"
+            f" WHERE r.run IN ({_window(None)}) ORDER BY r.run",
+            (window,),
+        ).fetchall()
+    seen: Dict[str, Dict[str, Any]] = {}
+    for name, outcome, us in rows:
+        if wanted is not None and name not in wanted:
+            continue
+        entry = seen.setdefault(name, {"runs": 0, "failures": 0, "durations": []})
+        entry["lastOutcome"] = OUTCOMES[outcome]
+        if outcome == SKIPPED:
+            continue
+        entry["runs"] += 1
+        entry["failures"] += outcome in FAILED
+        entry["durations"].append(us)
+    stats = {}
+    for name, entry in seen.items():
+        durations = entry.pop("durations")
+        failures = entry.pop("failures")
+        stats[name] = {
+            **entry,
+            "failRate": round(failures / entry["runs"], 3) if entry["runs"] else 0.0,
+            "medianMs": _median_ms(durations) if durations else None,
+        }
+    return stats
+
+
+def last_started(repo_root: Path, kind: Optional[str] = None) -> Optional[float]:
+    """Start time (epoch seconds) of the most recent recorded run, if any."""
+    with closing(connect(repo_root)) as conn:
+        if kind is None:
+            row = conn.execute("SELECT MAX(started) FROM runs").fetchone()
+        else:
+            row = conn.execute("SELECT MAX(started) FROM runs WHERE kind = ?", (kind,)).fetchone()
+    return row[0]
+
+
+def order(
+    names: List[str], stats: Dict[str, Dict[str, Any]], strategy: str = "failed-first", modified: Optional[Set[str]] = None
+) -> List[str]:
+    """`names` reordered for a quicker first failure.
+
+    failed-first: tests that failed last time, then tests whose file (the id up to "::") is in
+    `modified`, then the rest; each group fastest first. shortest-first: fastest first. Tests
+    without history count as taking the median duration.
+    """
+    if strategy not in ORDERINGS:
+        raise ValueError(f"unknown ordering {strategy!r} (expected one of: {', '.join(ORDERINGS)})")
+    known = [e["medianMs"] for e in stats.values() if e.get("medianMs") is not None]
+    default = statistics.median(known) if known else 0.0
+
+    def duration(name: str) -> float:
+        ms = stats.get(name, {}).get("medianMs")
+        return default if ms is None else ms
+
+    if strategy == "shortest-first":
+        return sorted(names, key=duration)
+
+    def group(name: str) -> int:
+        if stats.get(name, {}).get("lastOutcome") in ("failed", "error"):
+            return 0
+        return 1 if modified and name.split("::", 1)[0] in modified else 2
+
+    return sorted(names, key=lambda n: (group(n), duration(n)))
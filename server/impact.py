@@ -0,0 +1,223 @@
+"""Test-impact index: which Python test files depend on which repo source files.
+
+Dependencies come from a static import graph (ast), persisted under
+.mcp/cache/impact.json and refreshed after each full suite run. Selection
+falls back to the full suite whenever the index cannot be trusted.
+"""
+import ast
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from server.process import capture
+
+INDEX_VERSION = 1
+INDEX_PATH = Path(".mcp") / "cache" / "impact.json"
+SKIP_DIRS = {".git", ".mcp", ".venv", "venv", "node_modules", "__pycache__", ".tox", ".nox", "build", "dist", "site-packages"}
+# Changing any of these can affect every test, so they force a full run.
+CONFIG_FILES = {"conftest.py", "pytest.ini", "pyproject.toml", "setup.cfg", "setup.py", "tox.ini", "requirements.txt"}
+DOC_SUFFIXES = {".md", ".rst", ".txt"}
+
+
+def is_test_file(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def python_files(repo_root: Path) -> List[str]:
+    out: List[str] = []
+    for dirpath, dirnames, filenames in os.walk(repo_root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.endswith(".egg-info")]
+        for name in filenames:
+            if name.endswith(".py"):
+                out.append(os.path.relpath(os.path.join(dirpath, name), repo_root))
+    return sorted(out)
+
+
+def _import_basedir(repo_root: Path, rel: str) -> str:
+    """First directory above a file that is not a package (what pytest's prepend mode puts on sys.path)."""
+    d = os.path.dirname(rel)
+    while d and (repo_root / d / "__init__.py").exists():
+        d = os.path.dirname(d)
+    return d
+
+
+def module_table(repo_root: Path, files: Iterable[str]) -> Dict[str, str]:
+    files = list(files)
+    roots = [""]
+    if (repo_root / "src").is_dir():
+        roots.append("src")
+    for rel in files:
+        if is_test_file(rel) or os.path.basename(rel) == "conftest.py":
+            base = _import_basedir(repo_root, rel)
+            if base not in roots:
+                roots.append(base)
+    table: Dict[str, str] = {}
+    for root in roots:
+        prefix = root + os.sep if root else ""
+        for rel in files:
+            if not rel.startswith(prefix):
+                continue
+            parts = rel[len(prefix):][:-3].split(os.sep)
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            if parts:
+                table.setdefault(".".join(parts), rel)
+    return table
+
+
+def file_imports(repo_root: Path, rel: str, table: Dict[str, str]) -> List[str]:
+    """Repo files imported by one Python file (direct imports only)."""
+    try:
+        tree = ast.parse((repo_root / rel).read_bytes(), filename=rel)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    deps: Set[str] = set()
+
+    def add_module(name: str) -> None:
+        parts = name.split(".")
+        # importing a.b.c also executes a/__init__ and a/b/__init__
+        for i in range(len(parts), 0, -1):
+            hit = table.get(".".join(parts[:i]))
+            if hit:
+                deps.add(hit)
+
+    def add_relative(level: int, module: Optional[str], names: List[str]) -> None:
+        base = Path(rel).parent
+        for _ in range(level - 1):
+            base = base.parent
+        target = base.joinpath(*module.split(".")) if module else base
+        candidates = [target.with_suffix(".py"), target / "__init__.py"]
+        candidates += [target / f"{n}.py" for n in names] + [target / n / "__init__.py" for n in names]
+        for cand in candidates:
+            if (repo_root / cand).is_file():
+                deps.add(str(cand))
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                add_module(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            names = [a.name for a in node.names if a.name != "*"]
+            if node.level:
+                add_relative(node.level, node.module, names)
+            elif node.module:
+                add_module(node.module)
+                for n in names:
+                    add_module(f"{node.module}.{n}")
+    deps.discard(rel)
+    return sorted(deps)
+
+
+def _stat(repo_root: Path, rel: str) -> List[int]:
+    try:
+        st = (repo_root / rel).stat()
+        return [st.st_mtime_ns, st.st_size]
+    except OSError:
+        return [0, 0]
+
+
+def build_index(repo_root: Path) -> Dict[str, Any]:
+    files = python_files(repo_root)
+    table = module_table(repo_root, files)
+    return {
+        "version": INDEX_VERSION,
+        "builtAt": time.time(),
+        "files": {rel: _stat(repo_root, rel) for rel in files},
+        "imports": {rel: file_imports(repo_root, rel, table) for rel in files},
+    }
+
+
+def save_index(repo_root: Path, index: Dict[str, Any]) -> None:
+    path = repo_root / INDEX_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(index), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_index(repo_root: Path) -> Optional[Dict[str, Any]]:
+    try:
+        index = json.loads((repo_root / INDEX_PATH).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return index if index.get("version") == INDEX_VERSION else None
+
+
+def refresh_index(repo_root: Path) -> Dict[str, Any]:
+    index = build_index(repo_root)
+    save_index(repo_root, index)
+    return index
+
+
+def _dependents(imports: Dict[str, List[str]]) -> Dict[str, Set[str]]:
+    reverse: Dict[str, Set[str]] = {}
+    for src, deps in imports.items():
+        for dep in deps:
+            reverse.setdefault(dep, set()).add(src)
+    return reverse
+
+
+def select_tests(repo_root: Path, changed: List[str]) -> Dict[str, Any]:
+    """Pick the test files affected by `changed` (repo-relative paths).
+
+    Returns {"mode": "selected", "tests": [...]} or {"mode": "full", "reason": ...}.
+    """
+    index = load_index(repo_root)
+    if index is None:
+        return {"mode": "full", "reason": "no impact index yet"}
+    changed_py: List[str] = []
+    for rel in changed:
+        name = os.path.basename(rel)
+        if name in CONFIG_FILES:
+            return {"mode": "full", "reason": f"{rel} affects every test"}
+        if rel.endswith(".py"):
+            changed_py.append(rel)
+        elif Path(rel).suffix not in DOC_SUFFIXES and any(
+            is_test_file(t) and os.path.dirname(t) == os.path.dirname(rel) for t in index["files"]
+        ):
+            return {"mode": "full", "reason": f"{rel} may be test data"}
+    if any(rel not in index["files"] for rel in changed_py):
+        # New modules can resolve imports that were dangling before: rebuild the graph.
+        index = refresh_index(repo_root)
+    elif changed_py:
+        # Edits may add or drop imports: re-read just the changed files.
+        table = module_table(repo_root, index["files"])
+        for rel in changed_py:
+            if (repo_root / rel).exists():
+                index["imports"][rel] = file_imports(repo_root, rel, table)
+                index["files"][rel] = _stat(repo_root, rel)
+            else:
+                index["imports"].pop(rel, None)
+                index["files"].pop(rel, None)
+        save_index(repo_root, index)
+    imports: Dict[str, List[str]] = index["imports"]
+    reverse = _dependents(imports)
+    affected: Set[str] = set()
+    frontier = list(changed_py)
+    while frontier:
+        rel = frontier.pop()
+        if rel in affected:
+            continue
+        affected.add(rel)
+        frontier.extend(reverse.get(rel, ()))
+    tests = sorted(t for t in affected if is_test_file(t) and (repo_root / t).exists())
+    return {"mode": "selected", "tests": tests}
+
+
+async def changed_files(repo_root: Path, since: Optional[str], files: Optional[List[str]]) -> List[str]:
+    """Repo-relative changed paths from an explicit list and/or `git diff <since>` plus untracked files."""
+    changed: List[str] = []
+    for f in files or []:
+        p = Path(f)
+        changed.append(os.path.relpath(p, repo_root) if p.is_absolute() else os.path.normpath(f))
+    if since:
+        for args in (["diff", "--name-only", "--relative", since, "--"], ["ls-files", "--others", "--exclude-standard"]):
+            code, out, err = await capture(["git", *args], repo_root)
+            if code != 0:
+                first = (err.decode(errors="replace").strip().splitlines() or ["unknown error"])[0]
+                raise RuntimeError(f"git {' '.join(args)} failed: {first}")
+            changed += [line for line in out.decode().splitlines() if line]
+    return sorted(set(changed))
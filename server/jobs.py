@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from server.metrics import COALESCED_REQUESTS
+from server.output import OutputLog, current_log, format_event
+from server.settings import env_int, state_dir
+
+
+class Job:
+    def __init__(self, kind: str, repo: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.repo = repo
+        self.status = "queued"  # queued | running | completed | failed | cancelled
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self.key: Optional[Hashable] = None
+        self.attached = 0  # identical requests that joined this job instead of starting their own
+        self.log = OutputLog(state_dir("logs") / f"{self.id}.ndjson")
+
+    @property
+    def done(self) -> bool:
+        return self.status in {"completed", "failed", "cancelled"}
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "jobId": self.id,
+            "kind": self.kind,
+            "repo": self.repo,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "logPath": str(self.log.path),
+        }
+        if self.error:
+            data["error"] = self.error
+        if self.attached:
+            data["attached"] = self.attached
+        if include_result and self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Runs coroutines as background jobs with a global and a per-repo concurrency cap.
+
+    Finished jobs are kept (oldest evicted first) so clients can poll for results. A job submitted
+    with a key is single-flight: while it is queued or running, submitting the same key returns it.
+    Exclusive jobs on one repo run one at a time, in submission order.
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None, max_per_repo: Optional[int] = None, history: Optional[int] = None):
+        self.max_concurrent = max_concurrent or env_int("MCP_MAX_CONCURRENT_JOBS", os.cpu_count() or 4)
+        self.max_per_repo = max_per_repo or env_int("MCP_MAX_JOBS_PER_REPO", 2)
+        self.history = history or env_int("MCP_JOB_HISTORY", 256)
+        self._global: Optional[asyncio.Semaphore] = None
+        self._repo_slots: Dict[str, asyncio.Semaphore] = {}
+        self._repo_locks: Dict[str, asyncio.Lock] = {}
+        self._inflight: Dict[Hashable, Job] = {}
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def _global_slot(self) -> asyncio.Semaphore:
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrent)
+        return self._global
+
+    def _repo_slot(self, repo: str) -> asyncio.Semaphore:
+        slot = self._repo_slots.get(repo)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_per_repo)
+            self._repo_slots[repo] = slot
+        return slot
+
+    @asynccontextmanager
+    async def exclusive(self, repo: str, enabled: bool = True) -> AsyncIterator[None]:
+        """Hold the repo's run lock (shared with exclusive jobs) for the duration of the block."""
+        if not enabled:
+            yield
+            return
+        # asyncio.Lock wakes waiters first come, first served
+        async with self._repo_locks.setdefault(repo, asyncio.Lock()):
+            yield
+
+    def submit(
+        self,
+        kind: str,
+        repo: str,
+        factory: Callable[[], Awaitable[Dict[str, Any]]],
+        key: Optional[Hashable] = None,
+        exclusive: bool = False,
+    ) -> Job:
+        if key is not None:
+            running = self._inflight.get(key)
+            if running is not None and not running.done:
+                running.attached += 1
+                COALESCED_REQUESTS.inc(kind=kind)
+                return running
+        job = Job(kind, repo)
+        job.key = key
+        if key is not None:
+            self._inflight[key] = job
+        self._jobs[job.id] = job
+        self._evict()
+        job.task = asyncio.get_running_loop().create_task(self._run(job, factory, exclusive))
+        return job
+
+    async def _run(self, job: Job, factory: Callable[[], Awaitable[Dict[str, Any]]], exclusive: bool = False) -> None:
+        current_log.set(job.log)
+        try:
+            # Per-repo lock and slot first so a busy repo queues without holding a global slot.
+            async with self.exclusive(job.repo, exclusive), self._repo_slot(job.repo):
+                async with self._global_slot():
+                    job.status = "running"
+                    job.started_at = time.time()
+                    job.result = await factory()
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"Error: {str(e)}"
+        finally:
+            if job.key is not None and self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            job.finished_at = time.time()
+            job.log.write({"type": "status", "status": job.status})
+            job.log.close()
+
+    def _evict(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.done]
+        excess = len(self._jobs) - self.history
+        for job_id in finished[:max(0, excess)]:
+            self._jobs.pop(job_id).log.discard()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and not job.done and job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def wait(self, job: Job) -> Job:
+        if job.task is not None:
+            # shield: a dropped client connection must not cancel the job itself
+            try:
+                await asyncio.shield(job.task)
+            except asyncio.CancelledError:
+                if not job.task.done():
+                    raise
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    async def stream(self, job: Job, fmt: str) -> AsyncIterator[str]:
+        """Replay and follow a job's output, ending with its final status and result."""
+        async for event in job.log.follow():
+            yield format_event(event, fmt)
+        await self.wait(job)
+        yield format_event({"type": "done", **job.to_dict()}, fmt)
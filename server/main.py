@@ -1,13 +1,55 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Callable, FrozenSet, Iterator, Tuple
+import asyncio
+import functools
+import hashlib
+import json
 import os
-import subprocess
-import yaml
+import re
+import time
 import shutil
+import sqlite3
+import sys
+import threading
 
+from contextlib import asynccontextmanager, contextmanager, nullcontext
 from pathlib import Path
 
+from server.batch import collect_results, fan_out, stream_results
+from server.bootstrap_cache import BootstrapCache, dependency_fingerprint
+from server.checklist_cache import FileCache, load_yaml, signature
+from server.checklist_md import ChecklistMarker, atomic_write, checked_ids
+from server.dag import run_graph, task_graph, topo_order
+from server import envstore, golang, history, markdown_index, node_runner, ordering
+from server.envstore import EnvStore
+from server.impact import changed_files, refresh_index, select_tests
+from server.jobs import Job, JobManager
+from server.metrics import REGISTRY, REQUEST_SECONDS, STARTUP, Gauge, mark_startup, phase_labels, phase_times
+from server.output import STREAM_MEDIA_TYPES, current_log, format_event
+from server.process import command_env, current_env, run_cmd
+from server.reports import MESSAGE_LIMIT, compact, run_with_report
+from server.result_cache import ResultCache, tree_hash
+from server.sandbox import command_limits, resolve_limits
+from server.settings import env_int, state_dir
+from server.sharding import run_sharded
+from server.steps import StepCache, run_checklist
+from server.warm_pool import WarmPool
+from server.watch import WatchSession
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stopping.clear()
+    mark_startup("ready")
+    yield
+    stopping.set()
+    for session in list(watches.values()):
+        session.stop()
+    await warm_pool.shutdown()
+    await node_pool.shutdown()
+
 
 app = FastAPI(
     title="TDD MCP Server",
@@ -46,31 +88,106 @@ curl -X POST http://localhost:63777/introduce -H "Content-Type: application/json
 ### 🛠️ Getting Started
 1. Use `/introduce` to explore repository structure
 2. Use `/ensure-checklist` to create/find checklists  
-3. Use `/tdd/start` to begin TDD workflow
+3. Use `/tdd/start` to begin TDD workflow (returns a job id; poll `/jobs/{id}`)
 4. Use `/scaffold` to generate task files from checklist
     """,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+jobs = JobManager()
+bootstrap_cache = BootstrapCache()
+warm_pool = WarmPool()
+node_pool = WarmPool(launch=node_runner.node_worker, command=["npm", "test", "--"])
+file_cache = FileCache()
+checklist_marker = ChecklistMarker()
+step_cache = StepCache()
+result_cache = ResultCache()
+env_store = EnvStore()
+stopping = threading.Event()  # set once shutdown begins; /ready then reports 503
+JOBS = REGISTRY.register(Gauge("tdd_jobs", "Retained jobs by status (queued = waiting for a concurrency slot)."))
+ORCHESTRATE_WIDTH = env_int("MCP_ORCHESTRATE_WIDTH", os.cpu_count() or 1)
+
 
 class RepoRequest(BaseModel):
     repoPath: str
     dryRun: Optional[bool] = False
     language: Optional[str] = None  # e.g., python, node, go, rust, java, cpp
+    wait: Optional[bool] = False  # block until the job finishes instead of returning its id
+    stream: Optional[str] = None  # "sse" or "ndjson": stream output lines as they arrive
+    bootstrap: Optional[str] = "auto"  # auto | always | skip dependency installs
+    parallel: Optional[bool] = False  # shard the pytest run across CPU cores
+    shards: Optional[int] = None
+    includeOutput: Optional[bool] = False  # keep the raw log next to structured test results
+    messageLimit: Optional[int] = None
+    cache: Optional[bool] = True  # answer from the test-result cache when the tree is unchanged
+    limits: Optional[Dict[str, float]] = None  # cpuSeconds / memoryMb / wallSeconds per command
+    width: Optional[int] = None  # orchestrate: max checklist tasks running at once
+    pipeline: Optional[str] = "builtin"  # tdd/start: builtin per-language commands | checklist steps
+    order: Optional[str] = None  # failed-first | shortest-first, ranked from the run history
+    failFast: Optional[bool] = False  # stop each test command at its first failing test
+    maxFail: Optional[int] = None  # or: stop after this many failing tests
 
 
 class MarkRequest(BaseModel):
     repoPath: str
-    taskId: str
+    taskId: Optional[str] = None
+    taskIds: Optional[List[str]] = None  # mark many tasks in one write
     checked: bool
 
 
+class BatchRequest(RepoRequest):
+    repoPath: Optional[str] = None
+    repoPaths: List[str]
+    concurrency: Optional[int] = None  # repos in flight at once (default: MCP_BATCH_CONCURRENCY)
+
+
+class SectionsRequest(BaseModel):
+    repoPath: str
+    names: Optional[List[str]] = None  # section titles; omit for the README's heading outline
+
+
+class HistoryRequest(BaseModel):
+    repoPath: str
+    window: Optional[int] = None  # runs to look back over (default: 50; regressions: 10)
+    baseline: Optional[int] = 50  # regressions: runs before the window to compare against
+    kind: Optional[str] = None  # only runs of this kind: tdd/start | tests/run | watch
+    limit: Optional[int] = 20
+    testIds: Optional[List[str]] = None  # order: tests to order (default: every test in the window)
+    strategy: Optional[str] = "failed-first"  # order: failed-first | shortest-first
+
+
+class ChecklistRunRequest(BaseModel):
+    repoPath: str
+    taskIds: Optional[List[str]] = None  # default: every task
+    force: Optional[bool] = False  # run steps even when their inputs are unchanged
+    width: Optional[int] = None  # independent tasks run at once (default: 1)
+    wait: Optional[bool] = False
+    stream: Optional[str] = None
+    limits: Optional[Dict[str, float]] = None
+
+
 class TestRequest(BaseModel):
     repoPath: str
     language: Optional[str] = None
     path: Optional[str] = None  # pytest path/nodeid
     k: Optional[str] = None     # pytest -k expression
+    wait: Optional[bool] = False
+    stream: Optional[str] = None
+    bootstrap: Optional[str] = "auto"  # "skip" runs tests without any install step
+    warm: Optional[bool] = False  # run the focused pytest selection / Jest or Vitest on a pre-warmed worker
+    changedSince: Optional[str] = None  # git ref: run only tests affected by changes since it
+    changedFiles: Optional[List[str]] = None  # or: run only tests affected by these paths
+    parallel: Optional[bool] = False  # split the pytest run into duration-balanced shards
+    shards: Optional[int] = None  # shard count for parallel runs (default: CPU count)
+    includeOutput: Optional[bool] = False  # keep the raw log next to structured test results
+    messageLimit: Optional[int] = None  # max chars per failure message
+    cache: Optional[bool] = True  # answer from the test-result cache when the tree is unchanged
+    limits: Optional[Dict[str, float]] = None  # cpuSeconds / memoryMb / wallSeconds per command
+    order: Optional[str] = None  # failed-first | shortest-first, ranked from the run history
+    failFast: Optional[bool] = False  # stop each test command at its first failing test
+    maxFail: Optional[int] = None  # or: stop after this many failing tests
 
 
 def file_exists(path_str: str) -> bool:
@@ -79,9 +196,14 @@ def file_exists(path_str: str) -> bool:
 
 def find_checklists(repo_root: Path) -> List[Path]:
     mcp_dir = repo_root / ".mcp"
-    if not mcp_dir.exists() or not mcp_dir.is_dir():
-        return []
-    return [p for p in mcp_dir.glob("*.y*ml") if p.is_file()]
+
+    def scan() -> List[Path]:
+        if not mcp_dir.exists() or not mcp_dir.is_dir():
+            return []
+        return [p for p in mcp_dir.glob("*.y*ml") if p.is_file()]
+
+    # the directory's mtime changes whenever a checklist is added, removed or renamed
+    return list(file_cache.get(("checklists", str(mcp_dir)), [mcp_dir], scan))
 
 
 def read_file_text(path: Path) -> str:
@@ -94,28 +216,49 @@ def read_file_text(path: Path) -> str:
 def extract_mcp_job_section(readme_text: str) -> str:
     if not readme_text:
         return ""
-    lines = readme_text.splitlines()
-    # Look for '## MCP Job' or '### MCP Job'
-    start_idx = -1
-    for i, line in enumerate(lines):
-        lower = line.strip().lower()
-        if lower.startswith("## mcp job") or lower.startswith("### mcp job"):
-            start_idx = i
-            break
-    if start_idx != -1:
-        chunk: List[str] = []
-        for j in range(start_idx + 1, len(lines)):
-            if lines[j].startswith("## ") or lines[j].startswith("### "):
-                break
-            chunk.append(lines[j])
-        return "\n".join(chunk).strip()
+    data = readme_text.encode("utf-8")
+    heading = markdown_index.job_heading(markdown_index.build_index(data))
+    if heading is not None:
+        return markdown_index.decode(data[heading.body:heading.end])
     # Fallback: the first paragraph after title
-    non_empty = [l for l in lines if l.strip()]
-    if len(non_empty) > 1:
-        return "\n".join(non_empty[1: min(6, len(non_empty))])
-    return ""
+    return markdown_index.leading_lines(data)
+
+
+def readme_index(path: Path) -> List[markdown_index.Heading]:
+    """Heading index of a markdown file, rebuilt only when the file changes; [] when it is missing."""
+
+    def build() -> List[markdown_index.Heading]:
+        try:
+            return markdown_index.index_file(path)
+        except OSError:
+            return []
+
+    return file_cache.get(("mdindex", str(path)), [path], build)
+
 
+def readme_job_section(repo_root: Path) -> str:
+    """extract_mcp_job_section for the repo's README, without reading more of it than the section."""
+    path = repo_root / "README.md"
 
+    def extract() -> str:
+        heading = markdown_index.job_heading(readme_index(path))
+        try:
+            if heading is not None:
+                return markdown_index.decode(markdown_index.read_range(path, heading.body, heading.end))
+            with open(path, "rb") as f:
+                return markdown_index.leading_lines(f.read(64 * 1024))
+        except OSError:
+            return ""
+
+    return file_cache.get(("mcp-job", str(path)), [path], extract)
+
+
+def readme_sections(repo_root: Path, names: List[str]) -> Dict[str, Optional[str]]:
+    path = repo_root / "README.md"
+    return markdown_index.sections(path, readme_index(path), names)
+
+
+@functools.lru_cache(maxsize=256)
 def generate_checklist_yaml(repo_name: str, readme_description: str, language: Optional[str]) -> str:
     job_description = readme_description or f"Automated job for {repo_name}."
     data = {
@@ -131,7 +274,7 @@ def generate_checklist_yaml(repo_name: str, readme_description: str, language: O
             "allow_shell": True,
             "allow_git": True,
             "allow_file_edits": True,
-            "shell_whitelist": ["npm", "pnpm", "yarn", "pytest", "go", "make"],
+            "shell_whitelist": ["npm", "pnpm", "yarn", "pytest", "go", "make", "pip", "python", "echo"],
             "edit_path_allowlist": [
                 "src/**",
                 "tests/**",
@@ -146,16 +289,22 @@ def generate_checklist_yaml(repo_name: str, readme_description: str, language: O
                 "title": "Install dependencies",
                 "description": "Ensure dependencies are installed for the project language",
                 "steps": [
-                    {"when": "file_exists(\"package.json\")", "run": "npm ci"},
+                    {
+                        "when": "file_exists(\"package.json\")",
+                        "run": "npm ci",
+                        "inputs": ["package.json", "package-lock.json"],
+                    },
                     {
                         "when": "file_exists(\"pyproject.toml\")",
                         "run": "pip install -U pip && pip install -e .",
+                        "inputs": ["pyproject.toml", "setup.py", "setup.cfg"],
                     },
                     {
                         "when": "file_exists(\"requirements.txt\")",
                         "run": "pip install -U pip && pip install -r requirements.txt",
+                        "inputs": ["requirements.txt"],
                     },
-                    {"when": "file_exists(\"go.mod\")", "run": "go mod download"},
+                    {"when": "file_exists(\"go.mod\")", "run": "go mod download", "inputs": ["go.mod", "go.sum"]},
                 ],
                 "success_criteria": [
                     "No non-zero exit codes from install steps",
@@ -165,6 +314,7 @@ def generate_checklist_yaml(repo_name: str, readme_description: str, language: O
                 "id": "run-tests",
                 "title": "Run test suite",
                 "description": "Execute tests to validate current state",
+                "depends_on": ["bootstrap-deps"],
                 "steps": [
                     {"when": "file_exists(\"package.json\")", "run": "npm test --silent"},
                     {
@@ -194,6 +344,8 @@ def generate_checklist_yaml(repo_name: str, readme_description: str, language: O
             },
         ],
     }
+    import yaml
+
     return yaml.safe_dump(data, sort_keys=False)
 
 
@@ -205,11 +357,8 @@ def ensure_checklist(repo_root: Path, dry_run: bool = False, language: Optional[
             "path": [str(p) for p in found],
             "message": f"Found {len(found)} checklist(s)",
         }
-    readme = read_file_text(repo_root / "README.md")
-    desc = extract_mcp_job_section(readme)
-    yaml_text = generate_checklist_yaml(repo_root.name, desc, language)
-    out_dir = repo_root / ".mcp"
-    out_path = out_dir / "checklist.yaml"
+    yaml_text = generate_checklist_yaml(repo_root.name, readme_job_section(repo_root), language)
+    out_path = repo_root / ".mcp" / "checklist.yaml"
     if dry_run:
         return {
             "created": True,
@@ -217,8 +366,7 @@ def ensure_checklist(repo_root: Path, dry_run: bool = False, language: Optional[
             "dryRun": True,
             "content": yaml_text,
         }
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(yaml_text, encoding="utf-8")
+    write_if_changed(out_path, yaml_text)
     return {"created": True, "path": str(out_path), "dryRun": False}
 
 
@@ -233,14 +381,17 @@ def load_checklist(repo_root: Path) -> Optional[Dict[str, Any]]:
             preferred = p
             break
     path = preferred or files[0]
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f)
-    except Exception:
-        return None
 
+    def parse() -> Optional[Dict[str, Any]]:
+        try:
+            return load_yaml(path)
+        except Exception:
+            return None
 
-def write_checklist_md(repo_root: Path, checklist: Dict[str, Any]) -> Path:
+    return file_cache.get(("checklist", str(path)), [path], parse)
+
+
+def render_checklist_md(checklist: Dict[str, Any], checked: FrozenSet[str] = frozenset()) -> str:
     tasks = checklist.get("tasks", [])
     lines: List[str] = []
     lines.append("# CHECKLIST")
@@ -260,7 +411,7 @@ def write_checklist_md(repo_root: Path, checklist: Dict[str, Any]) -> Path:
         tid = t.get("id", "task")
         title = t.get("title", tid)
         description = t.get("description", "")
-        lines.append(f"- [ ] {title} ({tid})")
+        lines.append(f"- [{'x' if tid in checked else ' '}] {title} ({tid})")
         if description:
             lines.append(f"  - {description}")
         steps = t.get("steps", [])
@@ -279,21 +430,45 @@ def write_checklist_md(repo_root: Path, checklist: Dict[str, Any]) -> Path:
                         lines.append("    - step")
                 else:
                     lines.append("    - step")
-    content = "\n".join(lines) + "\n"
+    return "\n".join(lines) + "\n"
+
+
+def write_if_changed(path: Path, content: str, dry_run: bool = False) -> str:
+    """Write `content` unless the file already holds exactly that; returns created | updated | unchanged."""
+    data = content.encode("utf-8")
+    try:
+        if os.stat(path).st_size == len(data) and path.read_bytes() == data:
+            return "unchanged"
+        status = "updated"
+    except OSError:
+        status = "created"
+    if not dry_run:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, data)
+    return status
+
+
+def sync_checklist_md(repo_root: Path, checklist: Dict[str, Any], dry_run: bool = False) -> "tuple[Path, str]":
     out_path = repo_root / "CHECKLIST.md"
-    out_path.write_text(content, encoding="utf-8")
-    return out_path
+    # the marker's lock: a /checklist/mark must land before the read or after the write
+    with checklist_marker.locked(repo_root):
+        try:
+            # keep boxes already ticked via /checklist/mark
+            checked = checked_ids(out_path.read_bytes())
+        except OSError:
+            checked = frozenset()
+        return out_path, write_if_changed(out_path, render_checklist_md(checklist, checked), dry_run)
+
+
+def write_checklist_md(repo_root: Path, checklist: Dict[str, Any]) -> Path:
+    return sync_checklist_md(repo_root, checklist)[0]
 
 
 def regenerate_checklist(repo_root: Path, language: Optional[str]) -> Dict[str, Any]:
-    readme = read_file_text(repo_root / "README.md")
-    desc = extract_mcp_job_section(readme)
-    yaml_text = generate_checklist_yaml(repo_root.name, desc, language)
-    out_dir = repo_root / ".mcp"
-    out_path = out_dir / "checklist.yaml"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(yaml_text, encoding="utf-8")
-    return {"path": str(out_path)}
+    yaml_text = generate_checklist_yaml(repo_root.name, readme_job_section(repo_root), language)
+    out_path = repo_root / ".mcp" / "checklist.yaml"
+    # byte-identical output leaves the file (and everything cached on its mtime) alone
+    return {"path": str(out_path), "status": write_if_changed(out_path, yaml_text)}
 
 
 def sanitize_symbol(name: str) -> str:
@@ -310,19 +485,45 @@ def sanitize_symbol(name: str) -> str:
     return sym or "task"
 
 
-def scaffold_from_checklist(repo_root: Path) -> Dict[str, Any]:
+def task_stub(tid: str, title: str, func_name: str) -> str:
+    return (
+        f"\"\"\"\nTask: {title}\nID: {tid}\nThis function should implement the checklist item logic.\n\"\"\"\n"
+        f"def {func_name}() -> None:\n"
+        f"    \"\"\"Entry point for task '{tid}'.\n"
+        f"    Implement the logic and add tests under tests/.\n"
+        f"    \"\"\"\n"
+        f"    pass\n"
+    )
+
+
+def scaffold_from_checklist(repo_root: Path, dry_run: bool = False) -> Dict[str, Any]:
+    """Bring CHECKLIST.md, src/tasks and src/master.py in line with the checklist.
+
+    Only files whose content differs are written, so unchanged files keep their mtime.
+    Existing task files are never overwritten.
+    """
     checklist = load_checklist(repo_root)
     if not checklist:
         return {"ok": False, "error": "No checklist loaded"}
-    # Always write CHECKLIST.md
-    md_path = write_checklist_md(repo_root, checklist)
+    files: Dict[str, str] = {}
+    md_path, md_status = sync_checklist_md(repo_root, checklist, dry_run)
+    files[str(md_path)] = md_status
     tasks = checklist.get("tasks", [])
     tasks_dir = repo_root / "src" / "tasks"
-    tasks_dir.mkdir(parents=True, exist_ok=True)
+    if not dry_run:
+        tasks_dir.mkdir(parents=True, exist_ok=True)
+    # one listing instead of a stat per task
+    existing = {e.name for e in os.scandir(tasks_dir)} if tasks_dir.is_dir() else set()
     # ensure package init for tasks
-    (tasks_dir / "__init__.py").write_text("", encoding="utf-8")
+    init_path = tasks_dir / "__init__.py"
+    files[str(init_path)] = "unchanged" if "__init__.py" in existing else write_if_changed(init_path, "", dry_run)
 
-    created_files: List[str] = [str(md_path)]
+    try:
+        # master.py runs tasks sequentially: dependencies first
+        order = {tid: i for i, tid in enumerate(topo_order(task_graph(tasks)))}
+        tasks = sorted(tasks, key=lambda t: order[str(t.get("id", "task"))])
+    except ValueError:
+        pass
     call_entries: List[str] = []
     call_lines: List[str] = []
     for t in tasks:
@@ -331,17 +532,11 @@ def scaffold_from_checklist(repo_root: Path) -> Dict[str, Any]:
       func_name = f"run_{sanitize_symbol(tid)}"
       file_name = f"{sanitize_symbol(tid)}.py"
       file_path = tasks_dir / file_name
-      if not file_path.exists():
-          file_content = (
-              f"\"\"\"\nTask: {title}\nID: {tid}\nThis function should implement the checklist item logic.\n\"\"\"\n"
-              f"def {func_name}() -> None:\n"
-              f"    \"\"\"Entry point for task '{tid}'.\n"
-              f"    Implement the logic and add tests under tests/.\n"
-              f"    \"\"\"\n"
-              f"    pass\n"
-          )
-          file_path.write_text(file_content, encoding="utf-8")
-          created_files.append(str(file_path))
+      if file_name in existing:
+          files.setdefault(str(file_path), "unchanged")
+      else:
+          files[str(file_path)] = write_if_changed(file_path, task_stub(tid, title, func_name), dry_run)
+          existing.add(file_name)
       # Master call entry with comment referencing file location
       call_entries.append(
           f"# Task {tid} implementation at src/tasks/{file_name}\nfrom tasks.{sanitize_symbol(tid)} import {func_name}"
@@ -362,147 +557,460 @@ def scaffold_from_checklist(repo_root: Path) -> Dict[str, Any]:
         f"    \"\"\"\n"
         f"{calls_block if calls_block else '    pass'}\n"
     )
-    master_path.parent.mkdir(parents=True, exist_ok=True)
-    master_path.write_text(master_content, encoding="utf-8")
-    created_files.append(str(master_path))
+    files[str(master_path)] = write_if_changed(master_path, master_content, dry_run)
+
+    by_status: Dict[str, List[str]] = {"created": [], "updated": [], "unchanged": []}
+    for path, status in files.items():
+        by_status[status].append(path)
+    return {"ok": True, **by_status, "files": files, "dryRun": dry_run, "checklist_md": str(md_path)}
 
-    return {"ok": True, "created": created_files, "checklist_md": str(md_path)}
+
+def mark_checklist_items(repo_root: Path, task_ids: List[str], checked: bool) -> Dict[str, Any]:
+    return checklist_marker.mark(repo_root, {tid: checked for tid in task_ids})
 
 
 def mark_checklist_item(repo_root: Path, task_id: str, checked: bool) -> Dict[str, Any]:
-    md_path = repo_root / "CHECKLIST.md"
-    if not md_path.exists():
-        return {"ok": False, "error": "CHECKLIST.md not found"}
-    content = md_path.read_text(encoding="utf-8").splitlines()
-    needle = f"({task_id})"
-    updated = []
-    changed = False
-    for line in content:
-        if line.strip().startswith("- [") and needle in line:
-            if checked:
-                newline = line.replace("- [ ]", "- [x]")
-            else:
-                newline = line.replace("- [x]", "- [ ]")
-            if newline != line:
-                changed = True
-            updated.append(newline)
-        else:
-            updated.append(line)
-    if changed:
-        md_path.write_text("\n".join(updated) + "\n", encoding="utf-8")
-    return {"ok": True, "changed": changed, "path": str(md_path)}
+    return mark_checklist_items(repo_root, [task_id], checked)
+
+
+_MASTER_IMPORT = re.compile(r"^\s*from tasks\.(\w+) import (\w+)", re.MULTILINE)
+_MASTER_CALL = re.compile(r"\b(run_\w+)\(\)")
+
+
+def master_symbols(text: str) -> "tuple[FrozenSet[tuple[str, str]], FrozenSet[str]]":
+    """(module, function) pairs imported from tasks and run_* functions called in master.py; one pass each."""
+    return frozenset(_MASTER_IMPORT.findall(text)), frozenset(_MASTER_CALL.findall(text))
 
 
 def list_task_status(repo_root: Path) -> Dict[str, Any]:
     checklist = load_checklist(repo_root) or {"tasks": []}
     ids = [t.get("id", "") for t in checklist.get("tasks", [])]
     tasks_dir = repo_root / "src" / "tasks"
-    files = []
-    if tasks_dir.exists():
-        for p in tasks_dir.glob("*.py"):
-            files.append(p.name)
+    files = file_cache.get(
+        ("task-files", str(tasks_dir)),
+        [tasks_dir],
+        lambda: frozenset(p.name for p in tasks_dir.glob("*.py")) if tasks_dir.exists() else frozenset(),
+    )
     master = repo_root / "src" / "master.py"
-    master_content = master.read_text(encoding="utf-8") if master.exists() else ""
+    imports, calls = file_cache.get(("master-symbols", str(master)), [master], lambda: master_symbols(read_file_text(master)))
     items = []
     for tid in ids:
         sym = sanitize_symbol(tid)
         file_name = f"{sym}.py"
         present = file_name in files
-        imported = f"from tasks.{sym} import run_{sym}" in master_content
-        called = f"run_{sym}()" in master_content
+        imported = (sym, f"run_{sym}") in imports
+        called = f"run_{sym}" in calls
         items.append({"id": tid, "file": file_name, "present": present, "imported": imported, "called": called})
     return {"tasks": items, "masterExists": master.exists()}
 
 
-def run_cmd(cmd: List[str], cwd: Path) -> dict:
-    try:
-        completed = subprocess.run(
-            cmd,
-            cwd=str(cwd),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            timeout=900,
-        )
-        return {"cmd": cmd, "code": completed.returncode, "output": completed.stdout}
-    except subprocess.TimeoutExpired as e:
-        return {"cmd": cmd, "code": -1, "output": f"Timeout: {str(e)}"}
-    except Exception as e:
-        return {"cmd": cmd, "code": -1, "output": f"Error: {str(e)}"}
-
-
 def command_available(command: str) -> bool:
     return shutil.which(command) is not None
 
 
-def bootstrap_and_test(repo_root: Path, language: Optional[str]) -> dict:
-    results: List[dict] = []
+def step(cmd: List[str], language: str, phase: str) -> Dict[str, Any]:
+    return {"cmd": cmd, "language": language, "phase": phase}
+
+
+def python_install_steps(repo_root: Path) -> List[Dict[str, Any]]:
+    steps = [step(["pip", "install", "-U", "pip"], "python", "install")]
+    # Prefer pyproject if exists; else requirements.txt
+    if file_exists(repo_root / "pyproject.toml"):
+        steps.append(step(["pip", "install", "-e", "."], "python", "install"))
+    elif file_exists(repo_root / "requirements.txt"):
+        steps.append(step(["pip", "install", "-r", "requirements.txt"], "python", "install"))
+    return steps
+
+
+def pytest_steps(repo_root: Path, install: List[Dict[str, Any]], bootstrap: Optional[str]) -> List[Dict[str, Any]]:
+    """The pytest step, when a pytest will be there to run it: on PATH or in the stored environment."""
+    if command_available("pytest"):
+        return [step(["pytest", "-q"], "python", "test")]
+    if not envstore.enabled():
+        return []
+    if (bootstrap or "auto").lower() == "skip":
+        # nothing gets installed: only an environment built earlier can provide pytest
+        key = env_store.key("python", envstore.env_fingerprint(repo_root, "python", [s["cmd"] for s in install]))
+        if not env_store.ready(key):
+            return []
+    return [step(["pytest", "-q"], "python", "test")]
+
+
+def plan_bootstrap(repo_root: Path, language: Optional[str], bootstrap: Optional[str] = "auto") -> Dict[str, Any]:
+    """Commands bootstrap_and_test would run, tagged with language and phase (install/test)."""
+    steps: List[Dict[str, Any]] = []
     # If language specified, prefer that flow
     lang = (language or "").lower().strip()
     if lang in {"python", "py"}:
-        results.append(run_cmd(["pip", "install", "-U", "pip"], repo_root))
-        # Prefer pyproject if exists; else requirements.txt
-        if file_exists(repo_root / "pyproject.toml"):
-            results.append(run_cmd(["pip", "install", "-e", "."], repo_root))
-        elif file_exists(repo_root / "requirements.txt"):
-            results.append(run_cmd(["pip", "install", "-r", "requirements.txt"], repo_root))
-        if command_available("pytest"):
-            results.append(run_cmd(["pytest", "-q"], repo_root))
-        return {"ok": all(r.get("code", 1) == 0 for r in results) if results else True, "results": results}
+        install = python_install_steps(repo_root)
+        steps += install + pytest_steps(repo_root, install, bootstrap)
+        return {"steps": steps}
     if lang in {"javascript", "node", "js"}:
         if not command_available("npm"):
-            return {"ok": False, "results": results, "error": "npm not available in container"}
+            return {"steps": steps, "error": "npm not available in container"}
         if file_exists(repo_root / "package.json"):
-            results.append(run_cmd(["npm", "ci"], repo_root))
-            results.append(run_cmd(["npm", "test", "--silent"], repo_root))
-        return {"ok": all(r.get("code", 1) == 0 for r in results) if results else True, "results": results}
+            steps.append(step(["npm", "ci"], "node", "install"))
+            steps.append(step(["npm", "test", "--silent"], "node", "test"))
+        return {"steps": steps}
     if lang in {"go", "golang"}:
         if file_exists(repo_root / "go.mod"):
-            results.append(run_cmd(["go", "mod", "download"], repo_root))
-            results.append(run_cmd(["go", "test", "./..."], repo_root))
-        return {"ok": all(r.get("code", 1) == 0 for r in results) if results else True, "results": results}
+            steps.append(step(["go", "mod", "download"], "go", "install"))
+            steps.append(step(["go", "test", "./..."], "go", "test"))
+        return {"steps": steps}
     if lang in {"rust"}:
         if not command_available("cargo"):
-            return {"ok": False, "results": results, "error": "cargo not available in container"}
-        results.append(run_cmd(["cargo", "test"], repo_root))
-        return {"ok": all(r.get("code", 1) == 0 for r in results) if results else True, "results": results}
+            return {"steps": steps, "error": "cargo not available in container"}
+        steps.append(step(["cargo", "test"], "rust", "test"))
+        return {"steps": steps}
     if lang in {"java"}:
         if not command_available("mvn") and not command_available("gradle"):
-            return {"ok": False, "results": results, "error": "Java build tool (mvn/gradle) not available in container"}
+            return {"steps": steps, "error": "Java build tool (mvn/gradle) not available in container"}
         if file_exists(repo_root / "pom.xml"):
-            results.append(run_cmd(["mvn", "-q", "-DskipTests=false", "test"], repo_root))
+            steps.append(step(["mvn", "-q", "-DskipTests=false", "test"], "java", "test"))
         elif file_exists(repo_root / "build.gradle") or file_exists(repo_root / "build.gradle.kts"):
-            results.append(run_cmd(["gradle", "test"], repo_root))
-        return {"ok": all(r.get("code", 1) == 0 for r in results) if results else True, "results": results}
+            steps.append(step(["gradle", "test"], "java", "test"))
+        return {"steps": steps}
     if lang in {"cpp", "c++"}:
         # Placeholder: requires project-specific build system
-        return {"ok": False, "results": results, "error": "C++ flow not implemented in container"}
+        return {"steps": steps, "error": "C++ flow not implemented in container"}
 
     # Fallback: auto-detect by files
     if file_exists(repo_root / "package.json") and command_available("npm"):
-        results.append(run_cmd(["npm", "ci"], repo_root))
-        results.append(run_cmd(["npm", "test", "--silent"], repo_root))
+        steps.append(step(["npm", "ci"], "node", "install"))
+        steps.append(step(["npm", "test", "--silent"], "node", "test"))
     if file_exists(repo_root / "pyproject.toml") or file_exists(repo_root / "requirements.txt"):
-        results.append(run_cmd(["pip", "install", "-U", "pip"], repo_root))
-        if file_exists(repo_root / "pyproject.toml"):
-            results.append(run_cmd(["pip", "install", "-e", "."], repo_root))
-        elif file_exists(repo_root / "requirements.txt"):
-            results.append(run_cmd(["pip", "install", "-r", "requirements.txt"], repo_root))
-        if command_available("pytest"):
-            results.append(run_cmd(["pytest", "-q"], repo_root))
+        install = python_install_steps(repo_root)
+        steps += install + pytest_steps(repo_root, install, bootstrap)
     if file_exists(repo_root / "go.mod"):
-        results.append(run_cmd(["go", "mod", "download"], repo_root))
-        results.append(run_cmd(["go", "test", "./..."], repo_root))
+        steps.append(step(["go", "mod", "download"], "go", "install"))
+        steps.append(step(["go", "test", "./..."], "go", "test"))
+    return {"steps": steps}
+
+
+async def bootstrap_and_test(
+    repo_root: Path,
+    language: Optional[str],
+    bootstrap: Optional[str] = "auto",
+    include_tests: bool = True,
+    test_selection: Optional[List[str]] = None,
+    shards: Optional[int] = None,
+    include_output: bool = False,
+    message_limit: Optional[int] = None,
+    use_cache: bool = True,
+    order: Optional[str] = None,
+    max_fail: Optional[int] = None,
+    go_packages: Optional[List[str]] = None,
+    warm: bool = False,
+) -> dict:
+    """Run the bootstrap plan.
+
+    bootstrap: "auto" skips a language's installs when its dependency files are
+    unchanged since the last successful install, "always" reinstalls, "skip"
+    never installs. include_tests=False stops after the install phase.
+    test_selection narrows the pytest run to these test files (none: skip it),
+    go_packages the go test run to these packages.
+    shards (> 0) runs pytest as that many parallel shards.
+    Test steps report structured per-test results under `tests`; their raw
+    output is only kept with include_output. With use_cache a test step whose
+    command already ran on an identical tree returns that result (`cached`).
+    order runs likely failures first and max_fail stops a test command after
+    that many failures; failing runs report `timeToFirstFailureMs`. warm runs
+    Jest/Vitest in a persistent worker. `cacheHitRates` reports, per language,
+    the skipped installs and the share of Go packages answered from Go's test
+    cache or of runs that found a warm Node worker.
+    """
+    started = time.time()
+    limit = message_limit or MESSAGE_LIMIT
+    plan = plan_bootstrap(repo_root, language, bootstrap)
+    steps = [s for s in plan["steps"] if include_tests or s["phase"] == "install"]
+    if test_selection is not None:
+        selected = [dict(s, cmd=s["cmd"] + test_selection) for s in steps if s["cmd"][0] == "pytest"]
+        steps = [s for s in steps if s["cmd"][0] != "pytest"] + (selected if test_selection else [])
+    if go_packages is not None:
+        selected = [dict(s, cmd=s["cmd"][:2] + go_packages) for s in steps if s["cmd"][:2] == ["go", "test"]]
+        steps = [s for s in steps if s["cmd"][:2] != ["go", "test"]] + (selected if go_packages else [])
+    mode = (bootstrap or "auto").lower()
+    cache_status: Dict[str, str] = {}
+    fingerprints: Dict[str, str] = {}
+    environments: Dict[str, Dict[str, Any]] = {}
+    results: List[dict] = []
+    for lang in dict.fromkeys(s["language"] for s in steps if s["phase"] == "install"):
+        cmds = [s["cmd"] for s in steps if s["language"] == lang and s["phase"] == "install"]
+        if envstore.enabled() and lang in envstore.STORE_LANGUAGES:
+            env_result = await ensure_environment(repo_root, lang, cmds, mode)
+            environments[lang] = env_result["environment"]
+            cache_status[lang] = env_result["cacheStatus"]
+            results += env_result["results"]
+            continue
+        if mode == "skip":
+            cache_status[lang] = "skipped"
+            continue
+        fingerprints[lang] = dependency_fingerprint(repo_root, lang, cmds)
+        hit = mode == "auto" and bootstrap_cache.matches(repo_root, lang, fingerprints[lang])
+        cache_status[lang] = "hit" if hit else "miss"
+
+    install_ok: Dict[str, bool] = {}
+    tree: Optional[str] = None
+    priority: Optional[Dict[str, Any]] = None
+    failed_at: Optional[float] = None
+    for s in steps:
+        if s["phase"] == "install":
+            if s["language"] in environments or cache_status.get(s["language"]) != "miss":
+                continue
+            with phase_labels("install", s["language"]), toolchain(repo_root, s["language"]):
+                result = await run_cmd(s["cmd"], repo_root)
+            install_ok[s["language"]] = install_ok.get(s["language"], True) and result.get("code", 1) == 0
+        else:
+            if use_cache and tree is None:
+                # hashed after the installs, which may touch the tree
+                tree = await source_tree_hash(repo_root)
+            if order and priority is None:
+                priority = await asyncio.to_thread(ordering.priorities, repo_root, order)
+            runner = None
+            if warm and s["language"] == "node" and node_runner.test_script(repo_root) is not None:
+                runner = lambda full: node_pool.run(repo_root, node_runner.worker_args(repo_root, full))  # noqa: E731
+            with phase_labels("test", s["language"]), activated(environments.get(s["language"])), toolchain(repo_root, s["language"]):
+                result, at = await run_test_step(repo_root, s["cmd"], tree, limit, priority, max_fail, shards, runner)
+            if at is not None and (failed_at is None or at < failed_at):
+                failed_at = at
+            if s["cmd"] == ["pytest", "-q"] and not result.get("cached"):
+                # A full run is the point where the test-impact index is refreshed.
+                await asyncio.to_thread(refresh_index, repo_root)
+            compact(result, include_output)
+        results.append(result)
+    for lang, ok in install_ok.items():
+        if ok:
+            bootstrap_cache.record(repo_root, lang, fingerprints[lang])
+        else:
+            bootstrap_cache.forget(repo_root, lang)
 
     overall_ok = all(r.get("code", 1) == 0 for r in results) if results else True
-    return {"ok": overall_ok, "results": results}
+    out: Dict[str, Any] = {"ok": overall_ok, "results": results}
+    if "error" in plan:
+        out["ok"] = False
+        out["error"] = plan["error"]
+    if cache_status:
+        out["bootstrapCache"] = cache_status
+    if environments:
+        out["environments"] = environments
+    if tree is not None:
+        out["treeHash"] = tree
+    if failed_at is not None:
+        out["timeToFirstFailureMs"] = round((failed_at - started) * 1000, 1)
+    rates = cache_hit_rates(cache_status, results)
+    if rates:
+        out["cacheHitRates"] = rates
+    return out
+
+
+def toolchain(repo_root: Path, language: str):
+    """Per-language cache settings for the enclosed commands (Go: the repo's build and module caches)."""
+    return golang.caches(repo_root) if language == "go" else nullcontext()
+
+
+def cache_hit_rates(cache_status: Dict[str, str], results: List[dict]) -> Dict[str, Dict[str, float]]:
+    rates: Dict[str, Dict[str, float]] = {}
+    for lang, status in cache_status.items():
+        if status in ("hit", "miss"):
+            rates.setdefault(lang, {})["install"] = 1.0 if status == "hit" else 0.0
+    for r in results:
+        if r.get("cached"):
+            continue
+        if r.get("goTestCache"):
+            rates.setdefault("go", {})["tests"] = r["goTestCache"]["hitRate"]
+        if r.get("warm") and r["cmd"][:2] == ["npm", "test"] and r.get("workerHitRate") is not None:
+            rates.setdefault("node", {})["runner"] = r["workerHitRate"]
+    return rates
+
+
+async def source_tree_hash(repo_root: Path) -> Optional[str]:
+    try:
+        tree, _source = await asyncio.to_thread(tree_hash, repo_root)
+    except OSError:
+        return None
+    return tree
+
+
+async def cached_test_run(
+    repo_root: Path, cmd: List[str], tree: Optional[str], run: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """run() unless cmd already ran in this environment on a tree with the same hash."""
+    if tree is None:
+        return await run()
+    key = result_cache.key(tree, cmd, current_env.get())
+    hit = result_cache.get(repo_root, key)
+    if hit is not None:
+        log = current_log.get()
+        if log is not None:
+            log.write({"type": "cached", "cmd": cmd, "code": hit.get("code")})
+        hit["cached"] = True
+        return hit
+    result = await run()
+    if result.get("code", -1) >= 0:
+        result_cache.put(repo_root, key, {k: v for k, v in result.items() if k != "logPath"})
+    result["cached"] = False
+    return result
+
+
+async def run_test_step(
+    repo_root: Path,
+    cmd: List[str],
+    tree: Optional[str],
+    limit: int,
+    priority: Optional[Dict[str, Any]] = None,
+    max_fail: Optional[int] = None,
+    shards: Optional[int] = None,
+    runner=None,
+) -> Tuple[Dict[str, Any], Optional[float]]:
+    """One test command through the result cache, ordered by `priority` and stopped after max_fail failures.
+
+    Returns the result and the wall time its first failing test was reported, if any failed.
+    """
+    started = time.time()
+    prepared = await ordering.prepare(repo_root, cmd, priority, max_fail, plugin=runner is None)
+    sharded = bool(shards) and cmd[0] == "pytest"
+    watch = ordering.FirstFailure()
+
+    async def run() -> Dict[str, Any]:
+        with prepared.environment():
+            if sharded:
+                return await run_sharded(repo_root, prepared.cmd[2:], shards, limit, options=prepared.options, on_line=watch)
+            return await run_with_report(prepared.cmd, repo_root, limit, runner=runner, on_line=watch)
+
+    try:
+        result = await cached_test_run(repo_root, prepared.key + ([f"--shards={shards}"] if sharded else []), tree, run)
+        seen = [t for t in (watch.at, prepared.first_failure()) if t is not None]
+    finally:
+        prepared.close()
+    if not ordering.failed(result):
+        return result, None
+    # a cached failure is known as soon as it is returned; otherwise fall back to when the run ended
+    failed_at = min(seen) if seen and not result.get("cached") else time.time()
+    result["timeToFirstFailureMs"] = round((failed_at - started) * 1000, 1)
+    return result, failed_at
+
+
+def red_options(req: Any) -> Tuple[Optional[str], Optional[int]]:
+    """(order, max_fail) from a request, or ValueError."""
+    if req.order is not None and req.order not in history.ORDERINGS:
+        raise ValueError(f"order must be one of: {', '.join(history.ORDERINGS)}")
+    if req.maxFail is not None:
+        if req.maxFail < 1:
+            raise ValueError("maxFail must be at least 1")
+        return req.order, req.maxFail
+    return req.order, (1 if req.failFast else None)
+
+
+@contextmanager
+def activated(environment: Optional[Dict[str, Any]]) -> Iterator[None]:
+    """Run the enclosed commands inside a stored environment (no-op without one)."""
+    if not environment or not environment.get("ready"):
+        yield
+        return
+    key = environment["key"]
+    with env_store.use(key), command_env(env_store.activation(environment["language"], key)):
+        yield
+
+
+async def ensure_environment(repo_root: Path, language: str, cmds: List[List[str]], mode: str) -> Dict[str, Any]:
+    """Find or build the stored environment for the repo's dependency fingerprint.
+
+    Python: a venv the install commands run in (plus pytest when the deps lack it).
+    Node: the install runs in the repo, then node_modules moves into the store and is symlinked back.
+    """
+    key = env_store.key(language, envstore.env_fingerprint(repo_root, language, cmds))
+    environment: Dict[str, Any] = {"language": language, "key": key, "path": str(env_store.path(key))}
+    results: List[dict] = []
+    async with env_store.lock(key):
+        if env_store.ready(key) and mode != "always":
+            if language == "node":
+                env_store.link_node_modules(repo_root, key)
+            return {"environment": {**environment, "ready": True}, "cacheStatus": "hit", "results": results}
+        if mode == "skip":
+            return {"environment": {**environment, "ready": False}, "cacheStatus": "skipped", "results": results}
+        path = env_store.begin(key)
+        with phase_labels("install", language):
+            if language == "python":
+                results.append(await run_cmd([sys.executable, "-m", "venv", str(path)], repo_root))
+            elif (repo_root / "node_modules").is_symlink():
+                # never let npm clean out a tree that belongs to the store
+                (repo_root / "node_modules").unlink()
+            with command_env(env_store.activation(language, key)):
+                for cmd in cmds:
+                    if results and results[-1].get("code", 1) != 0:
+                        break
+                    results.append(await run_cmd(cmd, repo_root))
+                if language == "python" and all(r.get("code", 1) == 0 for r in results) and not (path / "bin" / "pytest").exists():
+                    results.append(await run_cmd(["pip", "install", "pytest"], repo_root))
+        ok = all(r.get("code", 1) == 0 for r in results)
+        if ok and language == "node":
+            try:
+                env_store.adopt_node_modules(repo_root, key)
+            except (OSError, RuntimeError) as e:
+                ok = False
+                results.append({"cmd": ["adopt", "node_modules"], "code": -1, "output": f"Error: {str(e)}"})
+        if ok:
+            env_store.commit(key, language)
+        else:
+            env_store.discard(key)
+    return {"environment": {**environment, "ready": ok}, "cacheStatus": "miss", "results": results}
+
+
+async def job_response(job: Job, wait: Optional[bool], stream: Optional[str]):
+    if stream:
+        fmt = stream if stream in STREAM_MEDIA_TYPES else "ndjson"
+        return StreamingResponse(jobs.stream(job, fmt), media_type=STREAM_MEDIA_TYPES[fmt])
+    if wait:
+        await jobs.wait(job)
+    return job.to_dict()
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.monotonic()
+    response = await call_next(request)
+    # label by route template, not raw path, to keep cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_SECONDS.observe(
+        time.monotonic() - started, route=route, method=request.method, status=str(response.status_code)
+    )
+    return response
+
+
+def sample_job_gauges() -> None:
+    counts = jobs.stats()
+    for status in ("queued", "running", "completed", "failed", "cancelled"):
+        JOBS.set(counts.get(status, 0), status=status)
+
+
+REGISTRY.on_collect(sample_job_gauges)
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/health")
 def health():
+    mark_startup("first_response")
     return {"ok": True}
 
 
+@app.get("/ready")
+def ready():
+    """Readiness (startup finished, state directory writable), unlike /health's bare liveness."""
+    mark_startup("first_response")
+    checks = {
+        "started": "ready" in STARTUP,
+        "stateDir": os.access(state_dir("logs"), os.W_OK),
+        "accepting": not stopping.is_set(),
+    }
+    ok = all(checks.values())
+    body = {"ok": ok, "checks": checks, "startupMs": {k: round(v * 1000, 1) for k, v in STARTUP.items()}}
+    return body if ok else JSONResponse(body, status_code=503)
+
+
 @app.get("/")
 def root():
     return {
@@ -519,7 +1027,8 @@ def root():
             "health": "GET /health",
             "introduce": "POST /introduce",
             "ensureChecklist": "POST /ensure-checklist", 
-            "startTDD": "POST /tdd/start"
+            "startTDD": "POST /tdd/start",
+            "jobStatus": "GET /jobs/{id}"
         }
     }
 
@@ -548,7 +1057,7 @@ def get_checklist(req: RepoRequest):
     data = load_checklist(repo)
     md_path = repo / "CHECKLIST.md"
     md_exists = md_path.exists()
-    md_preview = md_path.read_text(encoding="utf-8")[:2000] if md_exists else None
+    md_preview = file_cache.get(("text", str(md_path)), [md_path], lambda: read_file_text(md_path))[:2000] if md_exists else None
     return {"yaml": data, "checklistMdPath": str(md_path), "checklistMdExists": md_exists, "checklistMdPreview": md_preview}
 
 
@@ -558,7 +1067,18 @@ def refresh_checklist(req: RepoRequest):
     regen = regenerate_checklist(repo, req.language)
     data = load_checklist(repo) or {"tasks": []}
     md = write_checklist_md(repo, data)
-    return {"yamlPath": regen["path"], "checklistMd": str(md)}
+    return {"yamlPath": regen["path"], "yamlStatus": regen["status"], "checklistMd": str(md)}
+
+
+@app.post("/readme/sections")
+def get_readme_sections(req: SectionsRequest):
+    repo = Path(req.repoPath).resolve()
+    path = repo / "README.md"
+    if not path.is_file():
+        return {"ok": False, "error": f"no README.md in {repo}"}
+    if not req.names:
+        return {"ok": True, "headings": [{"level": h.level, "title": h.title, "bytes": h.end - h.start} for h in readme_index(path)]}
+    return {"ok": True, "sections": readme_sections(repo, req.names)}
 
 
 @app.post("/ensure-checklist")
@@ -568,23 +1088,129 @@ def ensure(req: RepoRequest):
     return ensure_checklist(repo, bool(req.dryRun), lang)
 
 
+def repo_limits(repo: Path, requested: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """Command limits for a repo: env caps, checklist permissions.limits and the request, tightest wins."""
+    checklist = load_checklist(repo)
+    perms = checklist.get("permissions") if isinstance(checklist, dict) else None
+    return resolve_limits(perms.get("limits") if isinstance(perms, dict) else None, requested)
+
+
+def submit_limited(kind: str, repo: Path, requested: Optional[Dict[str, float]], factory, key: Optional[str] = None) -> Job:
+    """jobs.submit with the repo's command limits in the job's context; ValueError on invalid limits.
+
+    Runs on one repo queue behind each other; with a key, an identical queued or running job is joined instead.
+    """
+    with command_limits(repo_limits(repo, requested)):
+        return jobs.submit(kind, str(repo), factory, key=key, exclusive=True)
+
+
+async def run_key(kind: str, repo: Path, req: BaseModel) -> Optional[str]:
+    """Single-flight key for a run: repo, request parameters, checklists and source tree (None: don't share)."""
+    if os.environ.get("MCP_COALESCE", "1") in ("", "0"):
+        return None
+    tree = await source_tree_hash(repo)
+    if tree is None:
+        return None
+    params = {name: value for name, value in vars(req).items() if name not in ("wait", "stream")}
+    checklists = [(str(p), signature(p)) for p in find_checklists(repo)]
+    data = json.dumps([kind, str(repo), params, checklists, tree], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+async def recorded(kind: str, repo: Path, run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """run(), then its per-test results and phase times appended to the repo's run history."""
+    if not history.enabled():
+        return await run()
+    times: Dict[Any, float] = {}
+    token = phase_times.set(times)
+    started = time.time()
+    try:
+        result = await run()
+    finally:
+        phase_times.reset(token)
+    try:
+        result["historyRunId"] = await asyncio.to_thread(history.record, repo, kind, started, time.time() - started, result, times)
+    except (sqlite3.Error, OSError) as e:
+        # losing a history row must never fail the run itself
+        result["historyError"] = str(e)
+    return result
+
+
+async def submit_tdd(repo: Path, req: RepoRequest) -> Job:
+    lang = (req.language or None)
+    shards = (req.shards or os.cpu_count() or 1) if req.parallel else None
+    order, max_fail = red_options(req)
+    key = await run_key("tdd/start", repo, req)
+    if req.pipeline == "checklist":
+        return submit_limited("tdd/start", repo, req.limits, lambda: run_checklist_steps(repo, width=req.width), key)
+    return submit_limited(
+        "tdd/start",
+        repo,
+        req.limits,
+        lambda: recorded(
+            "tdd/start",
+            repo,
+            lambda: bootstrap_and_test(
+                repo,
+                lang,
+                req.bootstrap,
+                shards=shards,
+                include_output=bool(req.includeOutput),
+                message_limit=req.messageLimit,
+                use_cache=req.cache is not False,
+                order=order,
+                max_fail=max_fail,
+            ),
+        ),
+        key,
+    )
+
+
 @app.post("/tdd/start")
-def tdd_start(req: RepoRequest):
+async def tdd_start(req: RepoRequest):
     repo = Path(req.repoPath).resolve()
-    lang = (req.language or None)
-    return bootstrap_and_test(repo, lang)
+    try:
+        job = await submit_tdd(repo, req)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    return await job_response(job, req.wait, req.stream)
+
+
+async def run_checklist_steps(
+    repo_root: Path, task_ids: Optional[List[str]] = None, force: bool = False, width: Optional[int] = None
+) -> Dict[str, Any]:
+    checklist = load_checklist(repo_root)
+    if not checklist:
+        return {"ok": False, "error": "No checklist loaded"}
+    with phase_labels("checklist"):
+        return await run_checklist(repo_root, checklist, task_ids, force, width or 1, step_cache)
+
+
+@app.post("/checklist/run")
+async def checklist_run(req: ChecklistRunRequest):
+    repo = Path(req.repoPath).resolve()
+    try:
+        job = submit_limited(
+            "checklist/run", repo, req.limits, lambda: run_checklist_steps(repo, req.taskIds, bool(req.force), req.width)
+        )
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    return await job_response(job, req.wait, req.stream)
 
 
 @app.post("/scaffold")
 def scaffold(req: RepoRequest):
     repo = Path(req.repoPath).resolve()
-    return scaffold_from_checklist(repo)
+    return scaffold_from_checklist(repo, bool(req.dryRun))
 
 
 @app.post("/checklist/mark")
 def checklist_mark(req: MarkRequest):
     repo = Path(req.repoPath).resolve()
-    return mark_checklist_item(repo, req.taskId, req.checked)
+    task_ids = ([req.taskId] if req.taskId else []) + list(req.taskIds or [])
+    if not task_ids:
+        return {"ok": False, "error": "taskId or taskIds is required"}
+    return mark_checklist_items(repo, task_ids, req.checked)
 
 
 @app.post("/tasks/status")
@@ -593,31 +1219,318 @@ def tasks_status(req: RepoRequest):
     return list_task_status(repo)
 
 
-@app.post("/tests/run")
-def tests_run(req: TestRequest):
+def history_query(req: HistoryRequest, query: Callable[[Path], Dict[str, Any]]) -> Dict[str, Any]:
     repo = Path(req.repoPath).resolve()
-    # base bootstrap
-    bootstrap = bootstrap_and_test(repo, req.language)
+    if not (repo / history.HISTORY_PATH).is_file():
+        return {"ok": False, "error": f"no run history for {repo} yet"}
+    try:
+        return {"ok": True, **query(repo)}
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+
+
+@app.post("/history/slowest")
+def history_slowest(req: HistoryRequest):
+    return history_query(req, lambda repo: {"tests": history.slowest(repo, req.limit or 20, req.window or 50, req.kind)})
+
+
+@app.post("/history/regressions")
+def history_regressions(req: HistoryRequest):
+    return history_query(
+        req,
+        lambda repo: {
+            "tests": history.regressions(repo, req.window or 10, req.baseline or 50, limit=req.limit or 20, kind=req.kind)
+        },
+    )
+
+
+@app.post("/history/flaky")
+def history_flaky(req: HistoryRequest):
+    return history_query(req, lambda repo: {"tests": history.flaky(repo, req.window or 50, req.limit or 20, req.kind)})
+
+
+@app.post("/history/trends")
+def history_trends(req: HistoryRequest):
+    return history_query(req, lambda repo: history.trends(repo, req.window or 50, req.kind))
+
+
+@app.post("/history/order")
+def history_order(req: HistoryRequest):
+    def query(repo: Path) -> Dict[str, Any]:
+        stats = history.test_stats(repo, req.testIds, req.window or 50)
+        names = req.testIds if req.testIds is not None else sorted(stats)
+        return {"strategy": req.strategy, "tests": history.order(names, stats, req.strategy or "failed-first"), "stats": stats}
+
+    return history_query(req, query)
+
+
+async def impact_selection(repo: Path, req: TestRequest) -> Dict[str, Any]:
+    try:
+        changed = await changed_files(repo, req.changedSince, req.changedFiles)
+    except RuntimeError as e:
+        return {"mode": "full", "reason": str(e)}
+    impact = await asyncio.to_thread(select_tests, repo, changed)
+    impact["changedFiles"] = changed
+    return impact
+
+
+async def run_tests(repo: Path, req: TestRequest) -> dict:
+    started = time.time()
+    order, max_fail = red_options(req)
+    focused_run = bool(req.path or req.k)
+    impact = None
+    selection = None
+    go_packages = None
+    if req.changedSince or req.changedFiles is not None:
+        impact = await impact_selection(repo, req)
+        if impact["mode"] == "selected":
+            selection = impact["tests"]
+        if "changedFiles" in impact and (repo / "go.mod").is_file() and (req.language or "go").lower() in {"go", "golang"}:
+            impact["go"] = await golang.affected_packages(repo, impact["changedFiles"])
+            if impact["go"]["mode"] == "selected":
+                go_packages = impact["go"]["packages"]
+    # base bootstrap; a warm focused run skips the full suite, which would defeat its purpose
+    bootstrap = await bootstrap_and_test(
+        repo,
+        req.language,
+        req.bootstrap,
+        include_tests=not (focused_run and req.warm),
+        test_selection=selection,
+        shards=(req.shards or os.cpu_count() or 1) if req.parallel else None,
+        include_output=bool(req.includeOutput),
+        message_limit=req.messageLimit,
+        use_cache=req.cache is not False,
+        order=order,
+        max_fail=max_fail,
+        go_packages=go_packages,
+        warm=bool(req.warm),
+    )
+    if impact is not None:
+        bootstrap["impact"] = impact
     # focused run if provided
-    if req.path or req.k:
-        args: List[str] = ["pytest", "-q"]
+    if focused_run:
+        args: List[str] = ["-q"]
         if req.k:
             args += ["-k", req.k]
         if req.path:
             args += [req.path]
-        focused = run_cmd(args, repo)
-        bootstrap["focused"] = focused
+        limit = req.messageLimit or MESSAGE_LIMIT
+        tree = bootstrap.get("treeHash")
+        if tree is None and req.cache is not False:
+            tree = await source_tree_hash(repo)
+        priority = await asyncio.to_thread(ordering.priorities, repo, order) if order else None
+        with phase_labels("test", "python"), activated(bootstrap.get("environments", {}).get("python")):
+            runner = (lambda cmd: warm_pool.run(repo, cmd[1:])) if req.warm else None
+            focused, failed_at = await run_test_step(repo, ["pytest"] + args, tree, limit, priority, max_fail, runner=runner)
+        bootstrap["focused"] = compact(focused, bool(req.includeOutput))
+        if failed_at is not None and "timeToFirstFailureMs" not in bootstrap:
+            bootstrap["timeToFirstFailureMs"] = round((failed_at - started) * 1000, 1)
     return bootstrap
 
 
-@app.post("/orchestrate/run")
-def orchestrate_run(req: RepoRequest):
+@app.post("/tests/run")
+async def tests_run(req: TestRequest):
+    repo = Path(req.repoPath).resolve()
+    key = await run_key("tests/run", repo, req)
+    try:
+        red_options(req)
+        job = submit_limited("tests/run", repo, req.limits, lambda: recorded("tests/run", repo, lambda: run_tests(repo, req)), key)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    return await job_response(job, req.wait, req.stream)
+
+
+class BatchTestRequest(TestRequest):
+    repoPath: Optional[str] = None
+    repoPaths: List[str]
+    concurrency: Optional[int] = None
+
+
+async def batch_response(repos: List[str], stream: Optional[str], results: AsyncIterator[Dict[str, Any]]):
+    if stream:
+        fmt = stream if stream in STREAM_MEDIA_TYPES else "ndjson"
+        return StreamingResponse(stream_results(results, fmt), media_type=STREAM_MEDIA_TYPES[fmt])
+    return await collect_results(results, repos)
+
+
+async def finished_job(job: Job) -> Dict[str, Any]:
+    await jobs.wait(job)
+    return job.to_dict()
+
+
+@app.post("/batch/tdd/start")
+async def batch_tdd_start(req: BatchRequest):
+    async def run(repo: str) -> Dict[str, Any]:
+        return await finished_job(await submit_tdd(Path(repo).resolve(), req))
+
+    results = fan_out(req.repoPaths, run, req.concurrency)
+    return await batch_response(req.repoPaths, req.stream, results)
+
+
+@app.post("/batch/tests/run")
+async def batch_tests_run(req: BatchTestRequest):
+    async def submit(repo: Path) -> Job:
+        key = await run_key("tests/run", repo, req)
+        return submit_limited("tests/run", repo, req.limits, lambda: recorded("tests/run", repo, lambda: run_tests(repo, req)), key)
+
+    async def run(repo: str) -> Dict[str, Any]:
+        return await finished_job(await submit(Path(repo).resolve()))
+
+    results = fan_out(req.repoPaths, run, req.concurrency)
+    return await batch_response(req.repoPaths, req.stream, results)
+
+
+@app.post("/batch/tasks/status")
+async def batch_tasks_status(req: BatchRequest):
+    results = fan_out(
+        req.repoPaths, lambda repo: asyncio.to_thread(list_task_status, Path(repo).resolve()), req.concurrency
+    )
+    return await batch_response(req.repoPaths, req.stream, results)
+
+
+class WatchRequest(TestRequest):
+    debounceMs: Optional[int] = None  # quiet period that closes a burst of saves into one run
+
+
+watches: Dict[str, WatchSession] = {}
+WATCH_DEBOUNCE_MS = env_int("MCP_WATCH_DEBOUNCE_MS", 200)
+
+
+def watch_events(session: WatchSession, fmt: str) -> StreamingResponse:
+    async def events() -> AsyncIterator[str]:
+        async for event in session.subscribe():
+            yield format_event(event, fmt)
+
+    return StreamingResponse(events(), media_type=STREAM_MEDIA_TYPES[fmt])
+
+
+@app.post("/watch/start")
+async def watch_start(req: WatchRequest):
+    """Rerun the tests affected by each batch of saved changes; one session per repo."""
     repo = Path(req.repoPath).resolve()
-    cmd = [
+    if not repo.is_dir():
+        return {"ok": False, "error": f"Repository path not found: {repo}"}
+    session = next((w for w in watches.values() if w.repo == repo), None)
+    if session is None:
+        def run(changed: Optional[List[str]]) -> Job:
+            run_req = TestRequest(
+                repoPath=str(repo),
+                language=req.language,
+                bootstrap=req.bootstrap,
+                changedFiles=changed,
+                parallel=req.parallel,
+                shards=req.shards,
+                includeOutput=req.includeOutput,
+                messageLimit=req.messageLimit,
+                order=req.order,
+                failFast=req.failFast,
+                maxFail=req.maxFail,
+                warm=req.warm,
+            )
+            return jobs.submit("watch", str(repo), lambda: recorded("watch", repo, lambda: run_tests(repo, run_req)), exclusive=True)
+
+        try:
+            red_options(req)
+            limits = repo_limits(repo, req.limits)
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}
+        session = WatchSession(repo, jobs, run, (req.debounceMs or WATCH_DEBOUNCE_MS) / 1000)
+        # runs are submitted from the session's task, which inherits these limits
+        with command_limits(limits):
+            session.start()
+        watches[session.id] = session
+    if req.stream:
+        return watch_events(session, req.stream if req.stream in STREAM_MEDIA_TYPES else "ndjson")
+    return {"ok": True, **session.to_dict()}
+
+
+@app.get("/watch")
+def watch_list():
+    return {"watches": [w.to_dict() for w in watches.values()]}
+
+
+@app.get("/watch/{watch_id}/events")
+def watch_stream(watch_id: str, format: str = "sse"):
+    session = watches.get(watch_id)
+    if session is None:
+        return {"ok": False, "error": f"Watch {watch_id} not found"}
+    return watch_events(session, format if format in STREAM_MEDIA_TYPES else "sse")
+
+
+@app.delete("/watch/{watch_id}")
+def watch_stop(watch_id: str):
+    session = watches.pop(watch_id, None)
+    if session is None:
+        return {"ok": False, "error": f"Watch {watch_id} not found"}
+    session.stop()
+    return {"ok": True, **session.to_dict()}
+
+
+@app.get("/jobs")
+def jobs_list():
+    return {"jobs": [j.to_dict(include_result=False) for j in jobs.list()], "counts": jobs.stats()}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return {"ok": False, "error": f"Job {job_id} not found"}
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/stream")
+def job_stream(job_id: str, format: str = "sse"):
+    job = jobs.get(job_id)
+    if job is None:
+        return {"ok": False, "error": f"Job {job_id} not found"}
+    fmt = format if format in STREAM_MEDIA_TYPES else "sse"
+    return StreamingResponse(jobs.stream(job, fmt), media_type=STREAM_MEDIA_TYPES[fmt])
+
+
+@app.delete("/jobs/{job_id}")
+def job_cancel(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return {"ok": False, "error": f"Job {job_id} not found"}
+    return {"ok": True, "jobId": job.id, "status": job.status, "cancelRequested": not job.done}
+
+
+def task_command(tid: str) -> List[str]:
+    sym = sanitize_symbol(tid)
+    return [
         "python",
         "-c",
-        "from src.master import run_all_tasks; run_all_tasks()",
+        f"import sys; sys.path.insert(0, 'src'); from tasks.{sym} import run_{sym}; run_{sym}()",
     ]
-    return run_cmd(cmd, repo)
 
 
+async def orchestrate(repo_root: Path, width: Optional[int] = None) -> Dict[str, Any]:
+    """Run the checklist's task functions as a `depends_on` DAG, each task in its own process."""
+    checklist = load_checklist(repo_root)
+    with phase_labels("orchestrate", "python"):
+        if not checklist or not checklist.get("tasks"):
+            return await run_cmd(["python", "-c", "from src.master import run_all_tasks; run_all_tasks()"], repo_root)
+        try:
+            graph = task_graph(checklist.get("tasks", []))
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}
+        return await run_graph(graph, lambda tid: run_cmd(task_command(tid), repo_root), width or ORCHESTRATE_WIDTH)
+
+
+@app.post("/orchestrate/run")
+async def orchestrate_run(req: RepoRequest):
+    repo = Path(req.repoPath).resolve()
+    try:
+        limits = repo_limits(repo, req.limits)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    with command_limits(limits):
+        if req.stream:
+            job = jobs.submit("orchestrate/run", str(repo), lambda: orchestrate(repo, req.width), exclusive=True)
+            return await job_response(job, False, req.stream)
+        async with jobs.exclusive(str(repo)):
+            return await orchestrate(repo, req.width)
+
+
+mark_startup("import")
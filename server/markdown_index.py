@@ -0,0 +1,114 @@
+"""Heading index over a markdown file, for pulling named sections out of large READMEs.
+
+The file is memory-mapped and scanned once with a regex that only stops on
+lines that can be an ATX heading or a code fence, so the text is never decoded
+or split into lines. Each heading maps to the byte range of its section, which
+ends at the next heading of the same or a higher level. Lines inside fenced
+code blocks are not headings.
+"""
+import itertools
+import mmap
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+_HEAD = rb" {0,3}(?:(#{1,6})(?:[ \t]+([^\r\n]*))?[ \t]*\r?$|(`{3,}|~{3,}))"
+# Anchoring on "\n" rather than ^ under re.M lets the scan skip ahead to each newline: about 4x faster.
+_FIRST = re.compile(_HEAD, re.M)
+_LINE = re.compile(rb"\n" + _HEAD, re.M)
+_CLOSING = re.compile(r"(?:^|[ \t]+)#+[ \t]*$")
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+class Heading(NamedTuple):
+    level: int
+    title: str
+    start: int  # offset of the heading line
+    body: int  # offset just past the heading line
+    end: int  # end of the section (next heading of level <= this one, or EOF)
+
+
+def build_index(data: Buffer) -> List[Heading]:
+    found: List[Tuple[int, str, int, int]] = []
+    fence: Optional[bytes] = None
+    first = _FIRST.match(data)
+    for m in itertools.chain([first] if first else [], _LINE.finditer(data)):
+        line_start = m.start() if m is first else m.start() + 1
+        newline = data.find(b"\n", m.end())
+        line_end = len(data) if newline == -1 else newline + 1
+        marker = m.group(3)
+        if marker is not None:
+            if fence is None:
+                fence = marker
+            elif marker[:1] == fence[:1] and len(marker) >= len(fence) and not data[m.end():line_end].strip():
+                # a closing fence carries no info string
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        title = (m.group(2) or b"").decode("utf-8", "replace")
+        found.append((len(m.group(1)), _CLOSING.sub("", title).strip(), line_start, line_end))
+    ends = [len(data)] * len(found)
+    open_: List[int] = []
+    for i, (level, _title, start, _body) in enumerate(found):
+        while open_ and found[open_[-1]][0] >= level:
+            ends[open_.pop()] = start
+        open_.append(i)
+    return [Heading(*h, end) for h, end in zip(found, ends)]
+
+
+def index_file(path: Path) -> List[Heading]:
+    with open(path, "rb") as f:
+        if not f.seek(0, 2):
+            # mmap refuses empty files
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return build_index(data)
+
+
+def find(index: List[Heading], name: str) -> Optional[Heading]:
+    """First heading whose title equals `name`, ignoring case and surrounding space."""
+    wanted = name.strip().lower()
+    return next((h for h in index if h.title.lower() == wanted), None)
+
+
+def job_heading(index: List[Heading]) -> Optional[Heading]:
+    """The "MCP Job" section: a level 2-3 heading starting with "MCP Job", ending at the next heading up to level 3."""
+    for i, h in enumerate(index):
+        if h.level in (2, 3) and h.title.lower().startswith("mcp job"):
+            return h._replace(end=next((n.start for n in index[i + 1:] if n.level <= 3), h.end))
+    return None
+
+
+def decode(raw: bytes) -> str:
+    return "\n".join(raw.decode("utf-8", "replace").splitlines()).strip()
+
+
+def read_range(path: Path, start: int, end: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(max(0, end - start))
+
+
+def sections(path: Path, index: List[Heading], names: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Body text of each named section (None when the README has no such heading)."""
+    out: Dict[str, Optional[str]] = {}
+    for name in names:
+        h = find(index, name)
+        out[name] = None if h is None else decode(read_range(path, h.body, h.end))
+    return out
+
+
+def leading_lines(data: Buffer, count: int = 6) -> str:
+    """Lines 2..count of the non-empty lines at the top of the file (the text under the title)."""
+    lines: List[str] = []
+    pos = 0
+    while len(lines) < count and pos < len(data):
+        newline = data.find(b"\n", pos)
+        stop = len(data) if newline == -1 else newline
+        line = bytes(data[pos:stop]).decode("utf-8", "replace").rstrip("\r")
+        if line.strip():
+            lines.append(line)
+        pos = stop + 1
+    return "\n".join(lines[1:]) if len(lines) > 1 else ""
@@ -0,0 +1,200 @@
+"""Prometheus text-format metrics without the client library.
+
+Subprocess metrics are labelled with the (language, phase) taken from the
+`current_phase` context variable, which callers set around a step with
+`phase_labels()`; asyncio tasks spawned inside inherit it.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+current_phase: ContextVar[Tuple[str, str]] = ContextVar("current_phase", default=("other", ""))
+# (phase, language) -> wall seconds, accumulated for whoever set it (run history)
+phase_times: ContextVar[Optional[Dict[Tuple[str, str], float]]] = ContextVar("phase_times", default=None)
+
+
+@contextmanager
+def phase_labels(phase: str, language: Optional[str] = None) -> Iterator[None]:
+    token = current_phase.set((phase, language or ""))
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        current_phase.reset(token)
+        times = phase_times.get()
+        if times is not None:
+            key = (phase, language or "")
+            times[key] = times.get(key, 0.0) + time.monotonic() - started
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt(name: str, labels: Labels, value: float) -> str:
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return f"{name}{{{body}}} {float(value)!r}" if body else f"{name} {float(value)!r}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return self.header() + [_fmt(self.name, k, v) for k, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+    def set_max(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, value), value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        super().__init__(name, help_text)
+        self.buckets = sorted(buckets)
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + [float("inf")], counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(_fmt(f"{self.name}_bucket", key + (("le", le),), cumulative))
+                lines.append(_fmt(f"{self.name}_sum", key, total[0]))
+                lines.append(_fmt(f"{self.name}_count", key, cumulative))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def on_collect(self, fn: Callable[[], None]) -> None:
+        """fn runs before every render, to refresh gauges that are sampled rather than tracked."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            fn()
+        return "\n".join(line for m in self._metrics for line in m.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "tdd_http_request_duration_seconds", "HTTP request latency by route (time to response headers).",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+))
+SUBPROCESS_SECONDS = REGISTRY.register(Histogram(
+    "tdd_subprocess_duration_seconds", "Subprocess wall time by language and phase.",
+    (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 900),
+))
+SUBPROCESS_EXITS = REGISTRY.register(Counter("tdd_subprocess_exits_total", "Subprocess exits by phase and exit code."))
+SUBPROCESS_TIMEOUTS = REGISTRY.register(Counter("tdd_subprocess_timeouts_total", "Subprocesses killed on timeout."))
+SUBPROCESS_ACTIVE = REGISTRY.register(Gauge("tdd_subprocesses_active", "Subprocesses currently running."))
+SUBPROCESS_PEAK_RSS = REGISTRY.register(Gauge(
+    "tdd_subprocess_peak_rss_bytes", "Largest peak RSS seen for a single subprocess, by language and phase.",
+))
+SUBPROCESS_CPU_SECONDS = REGISTRY.register(Counter(
+    "tdd_subprocess_cpu_seconds_total", "User + system CPU time of subprocesses, by language and phase.",
+))
+SUBPROCESS_LIMIT_KILLS = REGISTRY.register(Counter(
+    "tdd_subprocess_limit_kills_total", "Process groups killed for exceeding a cpu, memory or wall limit.",
+))
+COALESCED_REQUESTS = REGISTRY.register(Counter(
+    "tdd_coalesced_requests_total", "Requests that joined an identical queued or running job instead of starting one.",
+))
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    "tdd_startup_seconds", "Seconds from process start to each startup stage (import, ready, first_response).",
+))
+
+
+def process_started_at() -> float:
+    """Wall-clock creation time of this process (from /proc on Linux; else now, at first call)."""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+PROCESS_STARTED = process_started_at()
+STARTUP: Dict[str, float] = {}
+
+
+def mark_startup(stage: str) -> None:
+    """Record the first time `stage` is reached."""
+    if stage not in STARTUP:
+        STARTUP[stage] = max(0.0, time.time() - PROCESS_STARTED)
+        STARTUP_SECONDS.set(STARTUP[stage], stage=stage)
+
+
+def observe_subprocess(seconds: float, code: int, timed_out: bool = False, rusage: Optional[Dict[str, float]] = None) -> None:
+    phase, language = current_phase.get()
+    SUBPROCESS_SECONDS.observe(seconds, language=language, phase=phase)
+    SUBPROCESS_EXITS.inc(phase=phase, code=str(code))
+    if timed_out:
+        SUBPROCESS_TIMEOUTS.inc(phase=phase)
+    if rusage:
+        SUBPROCESS_PEAK_RSS.set_max(rusage["maxRssKb"] * 1024, language=language, phase=phase)
+        SUBPROCESS_CPU_SECONDS.inc((rusage["userMs"] + rusage["systemMs"]) / 1000, language=language, phase=phase)
@@ -0,0 +1,54 @@
+"""Warm Jest/Vitest runs for repos whose `npm test` is a plain runner call (see node_worker.js).
+
+The worker skips npm, Node start-up and loading the runner on every run. Test
+scripts that do more than call jest/vitest with --options (chained commands,
+env assignments, option values in separate words) keep running through npm.
+"""
+import json
+import shlex
+import shutil
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from server.process import current_env
+
+WORKER_SCRIPT = Path(__file__).with_name("node_worker.js")
+RUNNERS = ("jest", "vitest")
+
+
+def test_script(repo_root: Path) -> Optional[Tuple[str, List[str]]]:
+    """(runner, args) of package.json's test script when a worker can run it, else None."""
+    try:
+        scripts = json.loads((repo_root / "package.json").read_text(encoding="utf-8")).get("scripts", {})
+        tokens = shlex.split(str(scripts.get("test", "")))
+    except (OSError, ValueError, AttributeError):
+        return None
+    if tokens[:1] == ["npx"]:
+        tokens = tokens[1:]
+    if not tokens or tokens[0] not in RUNNERS:
+        return None
+    args = tokens[1:]
+    if tokens[0] == "vitest" and args[:1] == ["run"]:
+        args = args[1:]  # the worker always runs once
+    if not all(a.startswith("--") for a in args):
+        return None
+    return tokens[0], args
+
+
+def node_worker(repo_root: Path) -> List[str]:
+    """WarmPool launcher: argv for a worker running the repo's test runner."""
+    script = test_script(repo_root)
+    if script is None:
+        raise RuntimeError("package.json test script is not a plain jest/vitest call")
+    env = current_env.get()
+    node = shutil.which("node", path=env.get("PATH") if env else None) or "node"
+    return [node, str(WORKER_SCRIPT), script[0]]
+
+
+def worker_args(repo_root: Path, cmd: List[str]) -> Optional[List[str]]:
+    """Runner arguments equivalent to an `npm test [-- args]` command, or None when it cannot run warm."""
+    script = test_script(repo_root)
+    if script is None or cmd[:2] != ["npm", "test"]:
+        return None
+    extra = cmd[cmd.index("--") + 1:] if "--" in cmd else []
+    return script[1] + extra
@@ -0,0 +1,145 @@
+// Long-lived Jest/Vitest runner driven by server/warm_pool.py (the Node
+// counterpart of pytest_worker.py, same protocol).
+//
+// Started as `node node_worker.js <jest|vitest>` with the repo as the working
+// directory. It loads the runner from the repo's node_modules once, then reads
+// one JSON request per line on stdin ({"args": [...]}) and runs it in-process.
+// After each run it prints a sentinel line with the exit code and a snapshot of
+// the config files and node_modules the loaded runner depends on.
+
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const { pathToFileURL } = require('url');
+
+const SENTINEL = '\x00MCP-WORKER ';
+const CONFIG_FILES = [
+  'package.json',
+  'package-lock.json',
+  'npm-shrinkwrap.json',
+  'node_modules',
+  'tsconfig.json',
+  'babel.config.js',
+  '.babelrc',
+];
+const CONFIG_PREFIXES = ['jest.config.', 'vitest.config.', 'vite.config.'];
+const NUMERIC_OPTIONS = new Set(['bail', 'maxWorkers', 'maxConcurrency', 'testTimeout']);
+
+const root = process.cwd();
+const flavor = process.argv[2];
+
+function watchedFiles() {
+  const names = new Set(CONFIG_FILES);
+  for (const name of fs.readdirSync(root)) {
+    if (CONFIG_PREFIXES.some((prefix) => name.startsWith(prefix))) {
+      names.add(name);
+    }
+  }
+  const paths = [...names].map((name) => path.join(root, name));
+  // config modules the runner required (jest.config.js and what it imports)
+  for (const file of Object.keys(require.cache)) {
+    if (file.startsWith(root + path.sep) && !file.includes(`${path.sep}node_modules${path.sep}`)) {
+      paths.push(file);
+    }
+  }
+  const snapshot = {};
+  for (const file of paths) {
+    try {
+      const st = fs.statSync(file, { bigint: true });
+      // nanoseconds exceed Number precision: sent as a string
+      snapshot[file] = [st.mtimeNs.toString(), Number(st.size)];
+    } catch (e) {
+      // missing files are not part of the snapshot
+    }
+  }
+  return snapshot;
+}
+
+function reply(message) {
+  process.stdout.write(`${SENTINEL}${JSON.stringify(message)}\n`);
+}
+
+function camel(name) {
+  return name.replace(/-([a-z])/g, (_, c) => c.toUpperCase());
+}
+
+// The server only sends `--flag` and `--key=value` arguments (plus test paths).
+function parseArgs(args) {
+  const argv = { _: [], $0: flavor };
+  for (const token of args) {
+    if (!token.startsWith('--')) {
+      argv._.push(token);
+      continue;
+    }
+    const eq = token.indexOf('=');
+    const key = camel(token.slice(2, eq === -1 ? undefined : eq));
+    let value = eq === -1 ? true : token.slice(eq + 1);
+    if (NUMERIC_OPTIONS.has(key) && /^\d+$/.test(value)) {
+      value = Number(value);
+    }
+    argv[key] = value;
+  }
+  return argv;
+}
+
+function load(name) {
+  return require(require.resolve(name, { paths: [root] }));
+}
+
+async function loadVitest() {
+  const pkgPath = require.resolve('vitest/package.json', { paths: [root] });
+  let entry = require(pkgPath).exports['./node'];
+  while (entry && typeof entry === 'object') {
+    entry = entry.import || entry.default;
+  }
+  return import(pathToFileURL(path.join(path.dirname(pkgPath), entry)).href);
+}
+
+async function runJest(runner, args) {
+  const { results } = await runner.runCLI(parseArgs(args), [root]);
+  return results.success ? 0 : 1;
+}
+
+async function runVitest(runner, args) {
+  const { _: filters, $0: _name, reporter, ...options } = parseArgs(args);
+  if (reporter) {
+    options.reporters = [reporter];
+  }
+  process.exitCode = 0;
+  const ctx = await runner.startVitest('test', filters, { ...options, watch: false, run: true });
+  if (ctx) {
+    await ctx.close();
+  }
+  const code = process.exitCode || 0;
+  process.exitCode = 0;
+  return code;
+}
+
+async function main() {
+  if (process.env.NODE_ENV === undefined) {
+    // what the jest and vitest CLIs do before running
+    process.env.NODE_ENV = 'test';
+  }
+  const runner = flavor === 'vitest' ? await loadVitest() : load('jest');
+  const run = flavor === 'vitest' ? runVitest : runJest;
+  reply({ ready: true, files: watchedFiles() });
+  const lines = readline.createInterface({ input: process.stdin });
+  for await (const line of lines) {
+    if (!line.trim()) {
+      continue;
+    }
+    let code;
+    try {
+      code = await run(runner, JSON.parse(line).args || []);
+    } catch (e) {
+      console.log(`Error: ${e && e.message ? e.message : e}`);
+      code = -1;
+    }
+    reply({ code, files: watchedFiles() });
+  }
+}
+
+main().catch((e) => {
+  console.log(`Error: ${e && e.message ? e.message : e}`);
+  process.exit(1);
+});
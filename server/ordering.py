@@ -0,0 +1,219 @@
+"""Test ordering, fail-fast flags and time-to-first-failure for test steps.
+
+Ordering ranks tests that failed in the last recorded run first, then tests in
+files modified since that run (for Python, also the tests that import them),
+then the rest, fastest first (history.order). pytest applies the ranking
+through the mcp_test_order plugin. go test gets its packages in that order.
+Maven, Jest and Vitest already run previously failed tests first, so they only
+get switched to that mode where it is optional. Fail-fast maps to each
+runner's own flag.
+"""
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from server import history
+from server.impact import select_tests
+from server.process import capture, command_env, current_env
+from server.reports import PLUGIN, PLUGIN_DIR, script_args
+from server.settings import state_dir
+from server.watch import scan
+
+
+# A line reporting a failing test: pytest -q progress, go test, Jest/Vitest and
+# go package summaries, cargo test, Maven Surefire, Gradle.
+FAILURE_LINE = re.compile(
+    r"^[.sxXFE]*[FE][.sxXFE]*(\s+\[\s*\d+%\])?$"
+    r"|^\s*--- FAIL: "
+    r"|^\s*FAIL\s+\S"
+    r"|^test \S+ \.\.\. FAILED$"
+    r"|<<< (FAILURE|ERROR)!"
+    r"|^\S.* > .* FAILED$"
+)
+
+
+class FirstFailure:
+    """Line hook noting the wall time at which a command first reports a failing test."""
+
+    def __init__(self) -> None:
+        self.at: Optional[float] = None
+
+    def __call__(self, line: str) -> str:
+        if self.at is None and FAILURE_LINE.search(line):
+            self.at = time.time()
+        return line
+
+
+def fail_fast_args(cmd: List[str], max_fail: int) -> List[str]:
+    """cmd set to stop after max_fail failing tests (go and Gradle stop at the first)."""
+    if cmd[0] == "pytest":
+        return cmd + [f"--maxfail={max_fail}"]
+    if cmd[:2] == ["go", "test"]:
+        return cmd[:2] + ["-failfast"] + cmd[2:]
+    if cmd[:2] == ["npm", "test"]:
+        return script_args(cmd, [f"--bail={max_fail}"])
+    if cmd[0] == "mvn":
+        return cmd + [f"-Dsurefire.skipAfterFailureCount={max_fail}"]
+    if cmd[0] == "gradle":
+        return cmd + ["--fail-fast"]
+    # cargo test already stops after the first failing test binary
+    return cmd
+
+
+def priorities(repo_root: Path, strategy: str) -> Dict[str, Any]:
+    """What ordering needs to know: per-test history stats and the files modified since the last run."""
+    if strategy not in history.ORDERINGS:
+        raise ValueError(f"unknown ordering {strategy!r} (expected one of: {', '.join(history.ORDERINGS)})")
+    if not (repo_root / history.HISTORY_PATH).is_file():
+        return {"strategy": strategy, "stats": {}, "modified": []}
+    stats = history.test_stats(repo_root)
+    since = history.last_started(repo_root)
+    modified: Set[str] = set()
+    if since is not None:
+        cutoff = int(since * 1e9)
+        modified = {rel for rel, (mtime, _size) in scan(repo_root).items() if mtime > cutoff}
+        changed_py = sorted(rel for rel in modified if rel.endswith(".py"))
+        if changed_py:
+            modified.update(select_tests(repo_root, changed_py).get("tests", []))
+    return {"strategy": strategy, "stats": stats, "modified": sorted(modified)}
+
+
+def _go_module(repo_root: Path) -> Optional[str]:
+    try:
+        for line in (repo_root / "go.mod").read_text(encoding="utf-8").splitlines():
+            if line.startswith("module "):
+                return line.split()[1].strip('"')
+    except (OSError, IndexError):
+        pass
+    return None
+
+
+async def _go_packages(repo_root: Path, patterns: List[str]) -> Optional[List[str]]:
+    try:
+        code, out, _ = await capture(["go", "list", *patterns], repo_root)
+    except RuntimeError:
+        return None
+    return out.decode().split() if code == 0 else None
+
+
+async def order_go_packages(repo_root: Path, cmd: List[str], plan: Dict[str, Any]) -> List[str]:
+    """`go test ./...` with the packages listed explicitly, in priority order."""
+    patterns = [a for a in cmd[2:] if not a.startswith("-")]
+    flags = [a for a in cmd[2:] if a.startswith("-")]
+    packages = await _go_packages(repo_root, patterns or ["./..."])
+    module = _go_module(repo_root)
+    if not packages or module is None:
+        return cmd
+    stats: Dict[str, Dict[str, Any]] = {}
+    for test_id, entry in plan["stats"].items():
+        package = test_id.split("::", 1)[0]
+        agg = stats.setdefault(package, {"medianMs": 0.0})
+        agg["medianMs"] += entry.get("medianMs") or 0.0
+        if entry.get("lastOutcome") in ("failed", "error"):
+            agg["lastOutcome"] = "failed"
+    modified = set()
+    for rel in plan["modified"]:
+        if rel.endswith(".go"):
+            directory = os.path.dirname(rel)
+            modified.add(f"{module}/{directory}" if directory else module)
+    return cmd[:2] + flags + history.order(packages, stats, plan["strategy"], modified)
+
+
+def failed(result: Dict[str, Any]) -> bool:
+    """Whether a test step's result reports a failing test (or, without per-test results, failed)."""
+    tests = result.get("tests")
+    if tests is not None:
+        return bool(tests.get("failed") or tests.get("error"))
+    return result.get("code", 0) != 0
+
+
+class PreparedRun:
+    """A test command rewritten for ordering / fail-fast, plus the environment it needs.
+
+    key is the command as far as results go (ordering does not change them);
+    options are the pytest flags added, for runs that split the command up.
+    """
+
+    def __init__(self, cmd: List[str]):
+        self.cmd = cmd
+        self.key = cmd
+        self.options: List[str] = []
+        self.env: Dict[str, str] = {}
+        self._files: List[Path] = []
+
+    def temp_file(self, prefix: str, content: str = "") -> Path:
+        fd, name = tempfile.mkstemp(prefix=prefix, suffix=".json", dir=state_dir("reports"))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        self._files.append(Path(name))
+        return Path(name)
+
+    @contextmanager
+    def environment(self) -> Iterator[None]:
+        if not self.env:
+            yield
+            return
+        env = dict(current_env.get() or os.environ)
+        for key, value in self.env.items():
+            env[key] = f"{value}{os.pathsep}{env[key]}" if key == "PYTHONPATH" and env.get(key) else value
+        with command_env(env):
+            yield
+
+    def first_failure(self) -> Optional[float]:
+        """Wall time of the first failure the pytest plugin saw, if it was loaded."""
+        path = self.env.get("MCP_FIRST_FAILURE")
+        try:
+            return float(Path(path).read_text(encoding="utf-8")) if path else None
+        except (OSError, ValueError):
+            return None
+
+    def close(self) -> None:
+        for path in self._files:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def _ranking(plan: Dict[str, Any]) -> Dict[str, Any]:
+    stats = plan["stats"]
+    known = [e["medianMs"] for e in stats.values() if e.get("medianMs") is not None]
+    return {
+        "strategy": plan["strategy"],
+        "failed": [t for t, e in stats.items() if e.get("lastOutcome") in ("failed", "error")],
+        "modified": plan["modified"],
+        "durations": {t: e["medianMs"] for t, e in stats.items() if e.get("medianMs") is not None},
+        "default": statistics.median(known) if known else 0.0,
+    }
+
+
+async def prepare(
+    repo_root: Path, cmd: List[str], plan: Optional[Dict[str, Any]], max_fail: Optional[int], plugin: bool = True
+) -> PreparedRun:
+    """Rewrite a test step for `plan` (from priorities()) and max_fail.
+
+    plugin=False for pytest runs that cannot load the ordering plugin (warm workers).
+    """
+    prepared = PreparedRun(fail_fast_args(cmd, max_fail) if max_fail else list(cmd))
+    if cmd[0] == "pytest":
+        if max_fail:
+            prepared.options.append(f"--maxfail={max_fail}")
+        if plugin and (plan is not None or max_fail):
+            # the plugin also timestamps the first failure, which -q progress only shows once a line fills up
+            prepared.options[:0] = ["-p", PLUGIN]
+            prepared.env["PYTHONPATH"] = str(PLUGIN_DIR)
+            prepared.env["MCP_FIRST_FAILURE"] = str(prepared.temp_file("first-failure-"))
+            if plan is not None:
+                prepared.env["MCP_TEST_ORDER"] = str(prepared.temp_file("test-order-", json.dumps(_ranking(plan))))
+        prepared.cmd = cmd[:2] + prepared.options + cmd[2:]
+    elif plan is not None and cmd[:2] == ["go", "test"]:
+        prepared.cmd = await order_go_packages(repo_root, prepared.cmd, plan)
+    elif plan is not None and cmd[0] == "mvn" and plan["strategy"] == "failed-first":
+        prepared.cmd = prepared.cmd + ["-Dsurefire.runOrder=failedfirst"]
+    return prepared
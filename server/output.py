@@ -0,0 +1,85 @@
+"""Spill-to-disk output logs that streaming clients can follow while a job runs."""
+import asyncio
+import contextvars
+import json
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+class OutputLog:
+    """Append-only NDJSON event log on disk.
+
+    Nothing but the file handle is held in memory, so followers can replay the
+    whole run no matter how much a command prints.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")
+        self._wakeup = asyncio.Event()
+        self.closed = False
+
+    def write(self, event: Dict[str, Any], flush: bool = True) -> None:
+        if self.closed:
+            return
+        event.setdefault("ts", time.time())
+        self._fh.write(json.dumps(event) + "\n")
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.closed:
+            return
+        self._fh.flush()
+        # Swap in a fresh event before waking everyone waiting on the old one.
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.flush()
+            self._fh.close()
+            self.closed = True
+            self._wakeup.set()
+
+    def discard(self) -> None:
+        self.close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    async def follow(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every event from the start of the log until it is closed."""
+        with open(self.path, "r", encoding="utf-8") as fh:
+            while True:
+                wakeup = self._wakeup
+                closed = self.closed
+                while True:
+                    pos = fh.tell()
+                    line = fh.readline()
+                    if not line:
+                        break
+                    if not line.endswith("\n"):
+                        # partially flushed record; pick it up on the next wakeup
+                        fh.seek(pos)
+                        break
+                    yield json.loads(line)
+                if closed:
+                    return
+                await wakeup.wait()
+
+
+# Log of the job currently running in this task; run_cmd tees output into it.
+current_log: "contextvars.ContextVar[Optional[OutputLog]]" = contextvars.ContextVar("current_log", default=None)
+
+
+def format_event(event: Dict[str, Any], fmt: str) -> str:
+    if fmt == "sse":
+        return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+
+STREAM_MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
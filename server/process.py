@@ -0,0 +1,258 @@
+import asyncio
+import os
+import subprocess
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from server.metrics import SUBPROCESS_ACTIVE, SUBPROCESS_LIMIT_KILLS, observe_subprocess
+from server.output import OutputLog, current_log
+from server.sandbox import apply_rlimits, current_limits, kill_group, limit_message, watchdog
+from server.settings import env_int
+
+
+DEFAULT_TIMEOUT = 900
+# For helper commands a run depends on (git diff, go list, pytest --collect-only).
+HELPER_TIMEOUT = env_int("MCP_HELPER_TIMEOUT", 300)
+# Only the most recent output is kept in memory; the job log on disk has the rest.
+OUTPUT_TAIL_LINES = env_int("MCP_OUTPUT_TAIL_LINES", 2000)
+MAX_LINE_BYTES = 16384
+READ_CHUNK = 65536
+
+# Environment for spawned commands (None: inherit the server's), e.g. an activated venv.
+current_env: ContextVar[Optional[Dict[str, str]]] = ContextVar("current_env", default=None)
+
+
+@contextmanager
+def command_env(env: Optional[Dict[str, str]]) -> Iterator[None]:
+    token = current_env.set(env)
+    try:
+        yield
+    finally:
+        current_env.reset(token)
+
+
+async def _wait4(proc: subprocess.Popen, on_exit: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Reap proc with wait4() and return its own resource usage.
+
+    asyncio's child watcher would reap the child itself and discard the rusage,
+    so run_cmd spawns with Popen and waits here: on a pidfd where available,
+    polling otherwise. on_exit runs after proc exits but before it is reaped,
+    while its pid (and so its process group id) cannot be reused.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        pidfd: Optional[int] = os.pidfd_open(proc.pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    if pidfd is not None:
+        exited = loop.create_future()
+        loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+        try:
+            await exited
+        finally:
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+    else:
+        while os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None:
+            await asyncio.sleep(0.05)
+    if on_exit is not None:
+        on_exit()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        "maxRssKb": usage.ru_maxrss,
+        "userMs": round(usage.ru_utime * 1000, 1),
+        "systemMs": round(usage.ru_stime * 1000, 1),
+    }
+
+
+async def _kill(proc: subprocess.Popen) -> Dict[str, Any]:
+    if proc.returncode is not None:
+        return {}
+    # the child leads its own session: take its children down with it
+    kill_group(proc.pid)
+    return await _wait4(proc)
+
+
+async def _spawn(cmd: List[str], cwd: Path) -> Tuple[subprocess.Popen, asyncio.StreamReader, asyncio.BaseTransport]:
+    # with env set, Popen looks the program up on env's PATH
+    proc = subprocess.Popen(
+        cmd, cwd=str(cwd), env=current_env.get(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True
+    )
+    apply_rlimits(proc.pid, current_limits.get() or {})
+    reader = asyncio.StreamReader()
+    try:
+        transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), proc.stdout
+        )
+    except BaseException:
+        await _kill(proc)
+        raise
+    return proc, reader, transport
+
+
+LineHook = Callable[[str], Optional[str]]
+
+
+async def _pump(stream: asyncio.StreamReader, tail: Deque[str], log: Optional[OutputLog], on_line: Optional[LineHook]) -> int:
+    """Split a byte stream into lines, keeping a bounded tail and teeing into the log.
+
+    on_line may rewrite each line (or drop it by returning None) before it is kept.
+    """
+    total = 0
+    pending = b""
+
+    def emit(raw: bytes) -> None:
+        nonlocal total
+        text: Optional[str] = raw[:MAX_LINE_BYTES].decode("utf-8", errors="replace").rstrip("\r")
+        if on_line is not None:
+            text = on_line(text)
+            if text is None:
+                return
+        total += 1
+        tail.append(text)
+        if log is not None:
+            log.write({"type": "line", "text": text}, flush=False)
+
+    while True:
+        chunk = await stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for raw in lines:
+            emit(raw)
+        if len(pending) > MAX_LINE_BYTES:
+            emit(pending)
+            pending = b""
+        if log is not None and lines:
+            log.flush()
+    if pending:
+        emit(pending)
+    if log is not None:
+        log.flush()
+    return total
+
+
+async def run_cmd(cmd: List[str], cwd: Path, timeout: float = DEFAULT_TIMEOUT, on_line: Optional[LineHook] = None) -> dict:
+    """Run cmd, returning {cmd, code, output, durationMs, rusage?, truncated?, logPath?}.
+
+    Under command_limits() the result also carries `limits`, the session's
+    `groupPeak` usage and, when one was exceeded, `limitHit` (cpu, memory or wall).
+    Whatever the command leaves running in its session is killed when it exits.
+    """
+    limits = current_limits.get() or {}
+    timeout = min(timeout, limits.get("wallSeconds", timeout))
+    log = current_log.get()
+    if log is not None:
+        log.write({"type": "start", "cmd": cmd})
+    started = time.monotonic()
+    try:
+        proc, stdout, transport = await _spawn(cmd, cwd)
+    except Exception as e:
+        result = {"cmd": cmd, "code": -1, "output": f"Error: {str(e)}"}
+        if log is not None:
+            log.write({"type": "exit", "cmd": cmd, "code": -1})
+        return result
+    tail: Deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+    usage: Dict[str, Any] = {}
+    peak: Dict[str, int] = {}
+    guard = None
+    if "cpuSeconds" in limits or "memoryMb" in limits:
+        guard = asyncio.ensure_future(watchdog(proc.pid, limits, peak))
+
+    async def communicate() -> int:
+        pump = asyncio.ensure_future(_pump(stdout, tail, log, on_line))
+        try:
+            # background children would otherwise hold the pipe open until the timeout
+            usage.update(await _wait4(proc, on_exit=lambda: kill_group(proc.pid)))
+            return await pump
+        finally:
+            pump.cancel()
+
+    timed_out = False
+    limit_hit: Optional[str] = None
+    SUBPROCESS_ACTIVE.inc(1)
+    try:
+        total = await asyncio.wait_for(communicate(), timeout)
+        code = proc.returncode
+        output = "\n".join(tail) + "\n" if tail else ""
+    except asyncio.TimeoutError:
+        usage.update(await _kill(proc))
+        timed_out = True
+        limit_hit = "wall" if "wallSeconds" in limits else None
+        total = len(tail)
+        code = -1
+        output = f"Timeout: Command {cmd!r} timed out after {timeout} seconds"
+    except asyncio.CancelledError:
+        # Job was cancelled: never leave the child running behind us.
+        await _kill(proc)
+        raise
+    finally:
+        SUBPROCESS_ACTIVE.inc(-1)
+        transport.close()
+        if guard is not None:
+            if guard.done():
+                limit_hit = limit_hit or guard.result()
+            else:
+                guard.cancel()
+    seconds = time.monotonic() - started
+    if limit_hit:
+        output += limit_message(limit_hit, limits)
+    result = {"cmd": cmd, "code": code, "output": output, "durationMs": round(seconds * 1000, 1)}
+    if usage:
+        result["rusage"] = usage
+    if limits:
+        result["limits"] = limits
+    if peak:
+        result["groupPeak"] = peak
+    if limit_hit:
+        result["limitHit"] = limit_hit
+        SUBPROCESS_LIMIT_KILLS.inc(limit=limit_hit)
+    observe_subprocess(seconds, code, timed_out, usage)
+    if total > len(tail):
+        result["truncated"] = True
+    if log is not None:
+        result["logPath"] = str(log.path)
+        log.write({"type": "exit", "cmd": cmd, "code": code})
+    return result
+
+
+async def capture(cmd: List[str], cwd: Path, timeout: float = HELPER_TIMEOUT) -> Tuple[int, bytes, bytes]:
+    """Run a helper command to completion and return (code, stdout, stderr).
+
+    Sandboxed like run_cmd (own session, current limits, group killed on timeout
+    or cancellation) but its output is returned whole and stays out of the job
+    log. RuntimeError when it cannot start, times out or exceeds a limit.
+    """
+    limits = current_limits.get() or {}
+    timeout = min(timeout, limits.get("wallSeconds", timeout))
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, cwd=str(cwd), env=current_env.get(), stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True,
+        )
+    except OSError as e:
+        raise RuntimeError(f"{cmd[0]} could not be started: {e}")
+    apply_rlimits(proc.pid, limits)
+    guard = None
+    if "cpuSeconds" in limits or "memoryMb" in limits:
+        guard = asyncio.ensure_future(watchdog(proc.pid, limits, {}))
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except BaseException as e:
+        kill_group(proc.pid)
+        await proc.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise RuntimeError(f"{' '.join(cmd[:3])} timed out after {timeout:g} seconds")
+        raise
+    finally:
+        if guard is not None:
+            guard.cancel()
+    if guard is not None and guard.done() and not guard.cancelled() and guard.result():
+        raise RuntimeError(f"{' '.join(cmd[:3])}: " + limit_message(guard.result(), limits).strip())
+    return proc.returncode, out, err
@@ -0,0 +1,91 @@
+"""pytest plugin that runs collected tests in the order the server ranked them and reports them live.
+
+Loaded with `-p mcp_test_order` and this directory on PYTHONPATH (it holds
+nothing else, so repo modules cannot be shadowed). MCP_TEST_ORDER names a JSON
+file {"strategy", "failed": [nodeid], "modified": [path], "durations": {nodeid: ms},
+"default": ms}; the ranking mirrors server/history.py's order(). When
+MCP_FIRST_FAILURE names a file, the wall time of the first failing test is
+written to it. When MCP_TEST_EVENTS names a file, one JSON line per finished
+test ({"id", "outcome", "durationMs", "message"?}) is appended to it as the test
+completes, for the server to stream. Standalone: it runs inside the repo's environment, where the
+server package is not importable.
+"""
+import json
+import os
+import time
+
+import pytest
+
+
+def _key(plan):
+    failed = set(plan.get("failed", []))
+    modified = set(plan.get("modified", []))
+    durations = plan.get("durations", {})
+    default = plan.get("default", 0.0)
+    shortest = plan.get("strategy") == "shortest-first"
+
+    def key(item):
+        nodeid = item.nodeid
+        duration = durations.get(nodeid, default)
+        if shortest:
+            return (0, duration)
+        if nodeid in failed:
+            return (0, duration)
+        return (1 if nodeid.split("::", 1)[0] in modified else 2, duration)
+
+    return key
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(session, config, items):
+    path = os.environ.get("MCP_TEST_ORDER")
+    if not path:
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            plan = json.load(f)
+    except (OSError, ValueError):
+        return
+    # sorted() is stable: ties keep collection order
+    items[:] = sorted(items, key=_key(plan))
+
+
+def _event(report):
+    """The finished test's result, once its report settles the outcome (None for other phases)."""
+    if report.when == "call":
+        outcome = "skipped" if report.skipped else "failed" if report.failed else "passed"
+    elif report.skipped:
+        outcome = "skipped"
+    elif report.failed:
+        outcome = "error"
+    else:
+        return None
+    event = {"id": report.nodeid, "outcome": outcome, "durationMs": round(report.duration * 1000, 1)}
+    if outcome != "passed" and report.longrepr:
+        event["message"] = report.longreprtext
+    return event
+
+
+def _write_event(report):
+    path = os.environ.get("MCP_TEST_EVENTS")
+    event = _event(report) if path else None
+    if event is None:
+        return
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+    except OSError:
+        pass
+
+
+def pytest_runtest_logreport(report):
+    _write_event(report)
+    path = os.environ.get("MCP_FIRST_FAILURE")
+    if not path or not report.failed:
+        return
+    try:
+        if os.path.getsize(path) == 0:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(repr(time.time()))
+    except OSError:
+        pass
@@ -0,0 +1,78 @@
+"""Long-lived pytest worker driven by server/warm_pool.py.
+
+Reads one JSON request per line on stdin ({"args": [...]}), runs pytest.main
+in-process and prints its output followed by a sentinel line carrying the exit
+code and a snapshot of every repo file this process has imported. Started with
+the repo as the working directory; it pre-imports pytest, conftest files and
+the test modules via a collect-only pass so focused runs skip that cost.
+"""
+import json
+import os
+import sys
+import traceback
+
+# Run as a script: drop server/ from sys.path so it cannot shadow repo modules.
+if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+    sys.path[0] = os.getcwd()
+
+import pytest  # noqa: E402
+
+SENTINEL = "\x00MCP-WORKER "
+CONFIG_FILES = ("pytest.ini", "pyproject.toml", "setup.cfg", "tox.ini", "conftest.py")
+
+
+def imported_files(root: str) -> dict:
+    snapshot = {}
+    paths = [getattr(m, "__file__", None) for m in list(sys.modules.values())]
+    paths += [os.path.join(root, name) for name in CONFIG_FILES]
+    for path in paths:
+        if not path:
+            continue
+        path = os.path.abspath(path)
+        if not path.startswith(root + os.sep) or "site-packages" in path:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        snapshot[path] = [st.st_mtime_ns, st.st_size]
+    return snapshot
+
+
+def reply(message: dict) -> None:
+    sys.stdout.flush()
+    sys.stderr.flush()
+    sys.__stdout__.write(SENTINEL + json.dumps(message) + "\n")
+    sys.__stdout__.flush()
+
+
+def main() -> None:
+    root = os.getcwd()
+    # Warm-up: import conftest/test modules (and the project they import) once.
+    devnull = open(os.devnull, "w")
+    saved = os.dup(1)
+    os.dup2(devnull.fileno(), 1)
+    try:
+        pytest.main(["--collect-only", "-q", "-p", "no:cacheprovider"])
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        devnull.close()
+    reply({"ready": True, "files": imported_files(root)})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        try:
+            code = int(pytest.main(request.get("args", [])))
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            sys.stdout.write(traceback.format_exc())
+            code = -1
+        reply({"code": code, "files": imported_files(root)})
+
+
+if __name__ == "__main__":
+    main()
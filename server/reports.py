@@ -0,0 +1,347 @@
+"""Normalize test runner reports into one compact per-test schema.
+
+Each test result is {"id", "outcome", "durationMs", "message"?} where outcome is
+passed | failed | error | skipped. Runners are switched to machine-readable
+reporters (pytest --junitxml, go test -json, Jest/Vitest JSON) instead of
+scraping the text log. go test events and pytest results (through the plugin in
+pytest_plugins/) reach the job log as each test finishes; Jest and Vitest write
+their report when the run ends, so their per-test events follow the exit.
+"""
+import asyncio
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from server.output import current_log
+from server.process import LineHook, command_env, current_env, run_cmd
+from server.settings import env_int, state_dir
+
+MESSAGE_LIMIT = env_int("MCP_MESSAGE_LIMIT", 2000)
+PLUGIN_DIR = Path(__file__).with_name("pytest_plugins")
+PLUGIN = "mcp_test_order"
+TAIL_INTERVAL = 0.2
+
+
+def junit_key(nodeid: str) -> str:
+    """The (classname, name) pair pytest's junitxml writes for a node id, joined by '::'."""
+    parts = nodeid.split("::")
+    module = parts[0][:-3] if parts[0].endswith(".py") else parts[0]
+    classname = ".".join([module.replace("/", ".")] + parts[1:-1])
+    return f"{classname}::{parts[-1]}"
+
+
+def nodeid_from_junit(classname: str, name: str, repo_root: Path) -> str:
+    """Best-effort inverse of junit_key(): find the module file the dotted classname starts with."""
+    parts = classname.split(".")
+    for i in range(len(parts), 0, -1):
+        candidate = "/".join(parts[:i]) + ".py"
+        if (repo_root / candidate).is_file():
+            return "::".join([candidate] + parts[i:] + [name])
+    return f"{classname}::{name}"
+
+
+def truncate(text: Optional[str], limit: int = MESSAGE_LIMIT) -> Optional[str]:
+    if not text:
+        return text
+    return text if len(text) <= limit else text[:limit] + f"... [{len(text) - limit} more chars]"
+
+
+def make_result(test_id: str, outcome: str, duration_ms: float, message: Optional[str], limit: int) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"id": test_id, "outcome": outcome, "durationMs": round(duration_ms, 1)}
+    if message and outcome != "passed":
+        result["message"] = truncate(message.strip(), limit)
+    return result
+
+
+def parse_junit_xml(
+    path: Path,
+    nodeids: Optional[Dict[str, str]] = None,
+    message_limit: int = MESSAGE_LIMIT,
+    repo_root: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """Per-test results from a JUnit XML file.
+
+    nodeids maps junit_key() back to pytest node ids; without it ids are
+    recovered from the repo layout when repo_root is given.
+    Parsed with iterparse, dropping each <testcase> once read, so huge reports stay cheap.
+    """
+    import xml.etree.ElementTree as ET
+
+    results: List[Dict[str, Any]] = []
+    try:
+        for _, elem in ET.iterparse(str(path), events=("end",)):
+            if elem.tag != "testcase":
+                continue
+            classname, name = elem.get("classname", ""), elem.get("name", "")
+            key = f"{classname}::{name}"
+            if nodeids and key in nodeids:
+                test_id = nodeids[key]
+            elif repo_root is not None:
+                test_id = nodeid_from_junit(classname, name, repo_root)
+            else:
+                test_id = key
+            outcome = "passed"
+            message = None
+            for child in elem:
+                if child.tag in {"failure", "error", "skipped"}:
+                    outcome = {"failure": "failed", "error": "error", "skipped": "skipped"}[child.tag]
+                    message = (child.text or "").strip() or child.get("message")
+                    break
+            results.append(make_result(test_id, outcome, float(elem.get("time") or 0) * 1000, message, message_limit))
+            elem.clear()
+    except (OSError, ET.ParseError):
+        pass
+    return results
+
+
+def parse_jest_json(path: Path, repo_root: Path, message_limit: int = MESSAGE_LIMIT) -> List[Dict[str, Any]]:
+    """Jest --json (and Vitest's jest-compatible json reporter) output file."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    statuses = {"passed": "passed", "failed": "failed", "pending": "skipped", "skipped": "skipped", "todo": "skipped", "disabled": "skipped"}
+    results: List[Dict[str, Any]] = []
+    for suite in data.get("testResults", []):
+        name = suite.get("name", "")
+        rel = os.path.relpath(name, repo_root) if os.path.isabs(name) else name
+        cases = suite.get("assertionResults", [])
+        if not cases and suite.get("status") == "failed":
+            results.append(make_result(rel, "error", 0, suite.get("message"), message_limit))
+        for case in cases:
+            results.append(
+                make_result(
+                    f"{rel}::{case.get('fullName') or case.get('title')}",
+                    statuses.get(case.get("status", ""), "error"),
+                    float(case.get("duration") or 0),
+                    "\n".join(case.get("failureMessages") or []),
+                    message_limit,
+                )
+            )
+    return results
+
+
+class GoJsonParser:
+    """Incremental `go test -json` parser used as a run_cmd line hook.
+
+    Turns each event back into the human-readable line it carries (so logs and
+    tails stay readable) and records per-test results as the events stream in.
+    """
+
+    def __init__(self, message_limit: int = MESSAGE_LIMIT):
+        self.message_limit = message_limit
+        self.results: List[Dict[str, Any]] = []
+        self._output: Dict[str, List[str]] = {}
+        self._failed_tests: Dict[str, int] = {}
+        self.packages = 0
+        self.cached_packages = 0
+
+    def test_cache(self) -> Optional[Dict[str, Any]]:
+        """How many of the tested packages Go answered from its test cache."""
+        if not self.packages:
+            return None
+        return {"packages": self.packages, "cached": self.cached_packages, "hitRate": round(self.cached_packages / self.packages, 3)}
+
+    def __call__(self, line: str) -> Optional[str]:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return line
+        if not isinstance(event, dict):
+            return line
+        action = event.get("Action")
+        pkg = event.get("Package", "")
+        test = event.get("Test")
+        key = f"{pkg}::{test}" if test else pkg
+        if action == "output":
+            text = (event.get("Output") or "").rstrip("\n")
+            buf = self._output.setdefault(key, [])
+            if sum(len(t) for t in buf) < self.message_limit:
+                buf.append(text)
+            return text
+        if action in {"pass", "fail", "skip"}:
+            outcome = {"pass": "passed", "fail": "failed", "skip": "skipped"}[action]
+            output = "\n".join(self._output.pop(key, []))
+            if not test and outcome != "skipped":
+                self.packages += 1
+                self.cached_packages += "\t(cached)" in output
+            if test:
+                result = make_result(key, outcome, float(event.get("Elapsed") or 0) * 1000, output, self.message_limit)
+                self.results.append(result)
+                if outcome == "failed":
+                    self._failed_tests[pkg] = self._failed_tests.get(pkg, 0) + 1
+                log = current_log.get()
+                if log is not None:
+                    log.write({"type": "test", **result}, flush=False)
+            elif outcome == "failed" and not self._failed_tests.get(pkg):
+                # package failed without a failing test: build error, panic in init, ...
+                self.results.append(make_result(pkg, "error", float(event.get("Elapsed") or 0) * 1000, output, self.message_limit))
+        return None
+
+
+async def tail_events(path: Path, done: asyncio.Event, emit: Callable[[Dict[str, Any]], None]) -> None:
+    """Pass each JSON line appended to path to emit() until done is set, then drain what is left."""
+    pos = 0
+    pending = b""
+    while True:
+        finished = done.is_set()
+        try:
+            with open(path, "rb") as f:
+                f.seek(pos)
+                chunk = f.read()
+        except OSError:
+            chunk = b""
+        pos += len(chunk)
+        *lines, pending = (pending + chunk).split(b"\n")
+        for raw in lines:
+            try:
+                emit(json.loads(raw))
+            except (ValueError, TypeError, KeyError):
+                continue
+        if finished:
+            return
+        try:
+            await asyncio.wait_for(done.wait(), TAIL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def live_pytest(cmd: List[str], events: Path) -> "tuple[List[str], Dict[str, str]]":
+    """pytest cmd and environment for the plugin to append per-test events to `events`."""
+    env = dict(current_env.get() or os.environ)
+    if str(PLUGIN_DIR) not in env.get("PYTHONPATH", "").split(os.pathsep):
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (str(PLUGIN_DIR), env.get("PYTHONPATH")) if p)
+    env["MCP_TEST_EVENTS"] = str(events)
+    loaded = any(a == "-p" and b == PLUGIN for a, b in zip(cmd, cmd[1:]))
+    return (cmd if loaded else cmd[:1] + ["-p", PLUGIN] + cmd[1:]), env
+
+
+def jest_flavor(repo_root: Path) -> Optional[str]:
+    try:
+        scripts = json.loads((repo_root / "package.json").read_text(encoding="utf-8")).get("scripts", {})
+    except (OSError, ValueError, AttributeError):
+        return None
+    test_script = str(scripts.get("test", ""))
+    if "vitest" in test_script:
+        return "vitest"
+    if "jest" in test_script:
+        return "jest"
+    return None
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    totals = {"total": len(results), "passed": 0, "failed": 0, "error": 0, "skipped": 0}
+    duration = 0.0
+    for r in results:
+        totals[r["outcome"]] = totals.get(r["outcome"], 0) + 1
+        duration += r.get("durationMs", 0)
+    totals["durationMs"] = round(duration, 1)
+    return totals
+
+
+def chain(first: Optional[LineHook], then: Optional[LineHook]) -> Optional[LineHook]:
+    """A line hook running `first`, then `then` on whatever line it kept."""
+    if first is None or then is None:
+        return first or then
+
+    def hook(line: str) -> Optional[str]:
+        kept = first(line)
+        return None if kept is None else then(kept)
+
+    return hook
+
+
+def script_args(cmd: List[str], args: List[str]) -> List[str]:
+    """npm cmd with args passed through to the script (after a single "--")."""
+    return cmd + args if "--" in cmd else cmd + ["--"] + args
+
+
+def reporter_args(cmd: List[str], repo_root: Path, report: Path) -> Optional[List[str]]:
+    """Command rewritten to emit a machine-readable report, or None when the runner is unknown."""
+    if cmd[0] == "pytest":
+        return cmd + [f"--junitxml={report}"]
+    if cmd[:2] == ["go", "test"]:
+        return cmd[:2] + ["-json"] + cmd[2:]
+    if cmd[:2] == ["npm", "test"]:
+        flavor = jest_flavor(repo_root)
+        if flavor == "jest":
+            return script_args(cmd, ["--json", f"--outputFile={report}"])
+        if flavor == "vitest":
+            return script_args(cmd, ["--reporter=json", f"--outputFile={report}"])
+    return None
+
+
+async def run_with_report(
+    cmd: List[str], repo_root: Path, message_limit: int = MESSAGE_LIMIT, runner=None, on_line: Optional[LineHook] = None
+) -> Dict[str, Any]:
+    """Run a test command with a structured reporter and attach `tests` (totals + results).
+
+    runner(cmd) overrides how the rewritten command is executed (e.g. a warm pytest worker).
+    on_line sees each output line (after go's JSON events are turned back into text).
+    With a job log, pytest runs outside a runner stream their per-test events as they finish.
+    """
+    fd, name = tempfile.mkstemp(prefix="report-", suffix=".out", dir=state_dir("reports"))
+    os.close(fd)
+    report = Path(name)
+    events = report.with_suffix(".events")
+    log = current_log.get()
+    streamed: set = set()
+    try:
+        full = reporter_args(cmd, repo_root, report)
+        if full is None:
+            return await run_cmd(cmd, repo_root, on_line=on_line)
+        go = GoJsonParser(message_limit) if cmd[:2] == ["go", "test"] else None
+        if runner is not None:
+            result = await runner(full)
+        elif cmd[0] == "pytest" and log is not None:
+            full, env = live_pytest(full, events)
+
+            def emit(event: Dict[str, Any]) -> None:
+                test = make_result(event["id"], event["outcome"], float(event.get("durationMs") or 0), event.get("message"), message_limit)
+                streamed.add(test["id"])
+                log.write({"type": "test", **test})
+
+            done = asyncio.Event()
+            tail = asyncio.ensure_future(tail_events(events, done, emit))
+            try:
+                with command_env(env):
+                    result = await run_cmd(full, repo_root, on_line=on_line)
+            finally:
+                done.set()
+                await tail
+        else:
+            result = await run_cmd(full, repo_root, on_line=chain(go, on_line))
+        result["cmd"] = cmd
+        if go is not None:
+            tests = go.results
+            if go.test_cache() is not None:
+                result["goTestCache"] = go.test_cache()
+        elif cmd[0] == "pytest":
+            tests = parse_junit_xml(report, message_limit=message_limit, repo_root=repo_root)
+        else:
+            tests = parse_jest_json(report, repo_root, message_limit)
+        if log is not None and go is None:
+            for t in tests:
+                if t["id"] not in streamed:
+                    log.write({"type": "test", **t}, flush=False)
+            log.flush()
+        if tests or result.get("code") == 0:
+            result["tests"] = {**summarize(tests), "results": tests}
+        return result
+    finally:
+        for path in (report, events):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def compact(result: Dict[str, Any], include_output: bool) -> Dict[str, Any]:
+    """Drop the raw log from results that carry structured test results, unless asked for."""
+    if not include_output and "tests" in result:
+        result.pop("output", None)
+        for shard in result.get("shards", []):
+            shard.pop("output", None)
+    return result
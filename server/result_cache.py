@@ -0,0 +1,182 @@
+"""Cache of test-step results keyed on the content of the source tree.
+
+The tree hash covers every file git tracks or would track (the index entries,
+plus the content of modified and untracked files), or every file outside the
+usual cache directories when the repo is not a git checkout. File contents are
+hashed once per (mtime, size, inode) through an index kept next to the
+results in .mcp/cache, so an unchanged tree costs a git call and a few stats.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.settings import env_int
+from server.watch import WATCH_SKIP_DIRS, ignored
+
+RESULTS_PATH = Path(".mcp") / "cache" / "test-results.json"
+HASHES_PATH = Path(".mcp") / "cache" / "file-hashes.json"
+# Hashes of files modified this recently are not kept: a write within the same
+# timestamp tick could change the content without changing the signature.
+RACY_SECONDS = 2.0
+
+
+def _save_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # unique per writer: concurrent tree hashes of one repo save the same index
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _load_json(path: Path) -> Any:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+class FileHashes:
+    """sha256 of repo files, recomputed only when a file's stat signature changes."""
+
+    def __init__(self, repo_root: Path):
+        self.path = repo_root / HASHES_PATH
+        self.root = repo_root
+        self._entries: Dict[str, List[Any]] = _load_json(self.path) or {}
+        self._dirty = False
+
+    def digest(self, rel: str, now: float) -> str:
+        try:
+            st = os.stat(self.root / rel)
+        except OSError:
+            return "missing"
+        sig = [st.st_mtime_ns, st.st_size, st.st_ino]
+        entry = self._entries.get(rel)
+        if entry is not None and entry[:3] == sig:
+            return entry[3]
+        h = hashlib.sha256()
+        try:
+            with open(self.root / rel, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except OSError:
+            return "unreadable"
+        value = h.hexdigest()
+        if st.st_mtime_ns / 1e9 < now - RACY_SECONDS:
+            self._entries[rel] = sig + [value]
+            self._dirty = True
+        return value
+
+    def save(self, keep: Optional[List[str]] = None) -> None:
+        if keep is not None:
+            wanted = set(keep)
+            stale = [rel for rel in self._entries if rel not in wanted]
+            for rel in stale:
+                del self._entries[rel]
+            self._dirty = self._dirty or bool(stale)
+        if self._dirty:
+            _save_json(self.path, self._entries)
+            self._dirty = False
+
+
+def _git(repo_root: Path, *args: str) -> Optional[bytes]:
+    try:
+        proc = subprocess.run(["git", *args], cwd=str(repo_root), capture_output=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return proc.stdout if proc.returncode == 0 else None
+
+
+def _walk(repo_root: Path) -> List[str]:
+    files: List[str] = []
+    for dirpath, dirnames, names in os.walk(repo_root):
+        dirnames[:] = [d for d in dirnames if d not in WATCH_SKIP_DIRS and not d.endswith(".egg-info")]
+        for name in names:
+            rel = os.path.relpath(os.path.join(dirpath, name), repo_root)
+            if not ignored(rel):
+                files.append(rel)
+    return sorted(files)
+
+
+def tree_hash(repo_root: Path) -> Tuple[str, str]:
+    """(hash, source) of the working tree; source is "git" or "files"."""
+    h = hashlib.sha256()
+    hashes = FileHashes(repo_root)
+    now = time.time()
+    staged = _git(repo_root, "ls-files", "-s", "-z")
+    dirty = _git(repo_root, "ls-files", "-m", "-o", "--exclude-standard", "-z") if staged is not None else None
+    if staged is not None and dirty is not None:
+        # Index entries carry blob hashes; only files that differ from the index need reading.
+        h.update(b"git\0" + staged)
+        rels = sorted({os.fsdecode(p) for p in dirty.split(b"\0") if p})
+        rels = [rel for rel in rels if not ignored(rel)]
+        source = "git"
+    else:
+        rels = _walk(repo_root)
+        source = "files"
+    for rel in rels:
+        h.update(f"\0{rel}\0{hashes.digest(rel, now)}".encode())
+    hashes.save(keep=rels)
+    return h.hexdigest(), source
+
+
+def runner_identity(cmd: List[str], env: Optional[Dict[str, str]]) -> str:
+    """Which executable would run cmd, so a different environment never shares results."""
+    path = (env or os.environ).get("PATH")
+    return shutil.which(cmd[0], path=path) or cmd[0]
+
+
+class ResultCache:
+    """Per-repo LRU of test results, persisted in .mcp/cache/test-results.json.
+
+    A hit only reorders the entries in memory; the order is written out with the next put.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or env_int("MCP_RESULT_CACHE_SIZE", 64)
+        self._repos: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(tree: str, cmd: List[str], env: Optional[Dict[str, str]]) -> str:
+        data = json.dumps({"tree": tree, "cmd": cmd, "runner": runner_identity(cmd, env)})
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _entries(self, repo_root: Path) -> "OrderedDict[str, Dict[str, Any]]":
+        entries = self._repos.get(str(repo_root))
+        if entries is None:
+            entries = OrderedDict(_load_json(repo_root / RESULTS_PATH) or [])
+            self._repos[str(repo_root)] = entries
+        return entries
+
+    def get(self, repo_root: Path, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._entries(repo_root)
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            entries.move_to_end(key)
+            return json.loads(json.dumps(entry))
+
+    def put(self, repo_root: Path, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            entries = self._entries(repo_root)
+            entries[key] = {**json.loads(json.dumps(result)), "cachedAt": time.time()}
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            _save_json(repo_root / RESULTS_PATH, list(entries.items()))
+
+    def clear(self, repo_root: Path) -> None:
+        with self._lock:
+            self._repos.pop(str(repo_root), None)
+            try:
+                (repo_root / RESULTS_PATH).unlink()
+            except OSError:
+                pass
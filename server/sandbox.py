@@ -0,0 +1,148 @@
+"""Resource limits for spawned commands.
+
+Every command leads its own session. While it runs, a watchdog samples the
+whole session from /proc, so CPU time and RSS are totals over the process
+tree. When a limit is exceeded the session is killed. RLIMIT_CPU is set as a
+per-process backstop. Memory is deliberately not an rlimit: RLIMIT_AS counts
+address space that Go, Node and JVM runtimes reserve without using.
+
+Limits come from MCP_LIMIT_CPU_SECONDS / MCP_LIMIT_MEMORY_MB /
+MCP_LIMIT_WALL_SECONDS (server-wide caps), from the checklist's
+`permissions.limits` and from the request. The tightest value of each wins.
+"""
+import asyncio
+import os
+import signal
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+LIMIT_KEYS = ("cpuSeconds", "memoryMb", "wallSeconds")
+# checklist YAML spells them like its other keys
+CHECKLIST_KEYS = {"cpu_seconds": "cpuSeconds", "memory_mb": "memoryMb", "wall_seconds": "wallSeconds"}
+ENV_KEYS = {"MCP_LIMIT_CPU_SECONDS": "cpuSeconds", "MCP_LIMIT_MEMORY_MB": "memoryMb", "MCP_LIMIT_WALL_SECONDS": "wallSeconds"}
+SAMPLE_INTERVAL = 0.2
+
+current_limits: ContextVar[Optional[Dict[str, float]]] = ContextVar("current_limits", default=None)
+
+
+@contextmanager
+def command_limits(limits: Optional[Dict[str, float]]) -> Iterator[None]:
+    token = current_limits.set(limits or None)
+    try:
+        yield
+    finally:
+        current_limits.reset(token)
+
+
+def _positive(name: str, value: Any) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"limit {name} must be a number, got {value!r}")
+    if number <= 0:
+        raise ValueError(f"limit {name} must be positive, got {value!r}")
+    return number
+
+
+def resolve_limits(checklist: Optional[Dict[str, Any]] = None, requested: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """Tightest of the env caps, checklist `permissions.limits` and request limits; ValueError on bad input."""
+    sources = [{key: os.environ.get(env) for env, key in ENV_KEYS.items()}]
+    sources.append({CHECKLIST_KEYS.get(k, k): v for k, v in (checklist or {}).items()})
+    sources.append(requested or {})
+    limits: Dict[str, float] = {}
+    for source in sources:
+        for key, value in source.items():
+            if key not in LIMIT_KEYS:
+                raise ValueError(f"unknown limit {key!r} (expected one of: {', '.join(LIMIT_KEYS)})")
+            if value in (None, ""):
+                continue
+            number = _positive(key, value)
+            limits[key] = min(limits.get(key, number), number)
+    return limits
+
+
+def apply_rlimits(pid: int, limits: Dict[str, float]) -> None:
+    cpu = limits.get("cpuSeconds")
+    if cpu is None:
+        return
+    try:
+        import resource
+
+        # slack past the watchdog's own check; inherited by every descendant
+        soft = int(cpu) + 2
+        resource.prlimit(pid, resource.RLIMIT_CPU, (soft, soft + 1))
+    except (ImportError, AttributeError, OSError, ValueError):
+        pass
+
+
+def kill_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def limit_message(hit: str, limits: Dict[str, float]) -> str:
+    if hit == "cpu":
+        return f"Limit: CPU time limit of {limits['cpuSeconds']:g}s exceeded; process group killed\n"
+    if hit == "memory":
+        return f"Limit: memory limit of {limits['memoryMb']:g} MB exceeded; process group killed\n"
+    return ""
+
+
+_PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def session_usage(sid: int) -> Optional[Dict[str, int]]:
+    """RSS and CPU totals over every process in session `sid` (None without /proc)."""
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return None
+    rss_pages = 0
+    ticks = 0
+    processes = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                fields = [int(x) for x in f.read().rsplit(b")", 1)[1].split()[1:22]]
+        except (OSError, IndexError, ValueError):
+            continue
+        # fields[i] is stat field i + 4: session 6, utime 14, stime 15, cutime 16, cstime 17, rss 24
+        if fields[2] != sid:
+            continue
+        processes += 1
+        ticks += fields[10] + fields[11]
+        if int(pid) == sid:
+            # children the leader already reaped
+            ticks += fields[12] + fields[13]
+        rss_pages += fields[20]
+    return {"rssKb": rss_pages * _PAGE_KB, "cpuMs": ticks * 1000 // _TICKS, "processes": processes}
+
+
+async def watchdog(sid: int, limits: Dict[str, float], peak: Dict[str, int]) -> Optional[str]:
+    """Sample session `sid` until cancelled; kill it and return the limit's name once one is exceeded.
+
+    `peak` is updated in place with the largest RSS / process count and the latest CPU total.
+    """
+    memory_kb = limits["memoryMb"] * 1024 if "memoryMb" in limits else None
+    cpu_ms = limits["cpuSeconds"] * 1000 if "cpuSeconds" in limits else None
+    while True:
+        usage = await asyncio.to_thread(session_usage, sid)
+        if usage is None:
+            return None
+        if usage["processes"]:
+            peak["rssKb"] = max(peak.get("rssKb", 0), usage["rssKb"])
+            peak["processes"] = max(peak.get("processes", 0), usage["processes"])
+            peak["cpuMs"] = max(peak.get("cpuMs", 0), usage["cpuMs"])
+        hit = None
+        if memory_kb is not None and usage["rssKb"] > memory_kb:
+            hit = "memory"
+        elif cpu_ms is not None and usage["cpuMs"] > cpu_ms:
+            hit = "cpu"
+        if hit is not None:
+            kill_group(sid)
+            return hit
+        await asyncio.sleep(SAMPLE_INTERVAL)
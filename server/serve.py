@@ -0,0 +1,28 @@
+"""Start the server: `python -m server.serve`.
+
+MCP_HOST and MCP_PORT pick the address (default 0.0.0.0:63777). MCP_WORKERS > 1
+runs that many uvicorn worker processes on one socket. Each worker keeps its
+own jobs, caches and watch sessions, so use that mode with `"wait": true` or
+`"stream"` requests rather than polling `/jobs/{id}`, which may land on another
+worker.
+"""
+import os
+
+import uvicorn
+
+from server.settings import env_int
+
+
+def main() -> None:
+    workers = env_int("MCP_WORKERS", 1)
+    uvicorn.run(
+        "server.main:app",
+        host=os.environ.get("MCP_HOST", "0.0.0.0"),
+        port=env_int("MCP_PORT", 63777),
+        workers=workers if workers > 1 else None,
+        log_level=os.environ.get("MCP_LOG_LEVEL", "info"),
+    )
+
+
+if __name__ == "__main__":
+    main()
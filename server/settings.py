@@ -0,0 +1,18 @@
+import os
+import tempfile
+from pathlib import Path
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+def state_dir(name: str) -> Path:
+    """Server-owned scratch directory (outside of any mounted repo)."""
+    base = Path(os.environ.get("MCP_STATE_DIR") or Path(tempfile.gettempdir()) / "tdd-mcp")
+    path = base / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
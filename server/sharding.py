@@ -0,0 +1,131 @@
+"""Split a pytest suite into duration-balanced shards and run them in parallel."""
+import asyncio
+import heapq
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from server.process import LineHook, capture, run_cmd
+from server.reports import MESSAGE_LIMIT, junit_key, parse_junit_xml, summarize
+
+DURATIONS_PATH = Path(".mcp") / "cache" / "durations.json"
+DEFAULT_DURATION = 0.1  # seconds, for tests without history
+# Keep each shard's command line well under ARG_MAX; past this, shard by file instead of by test.
+MAX_ARGV_BYTES = 512 * 1024
+
+
+async def collect_tests(repo_root: Path, args: List[str]) -> List[str]:
+    code, out, err = await capture(["pytest", "--collect-only", "-q", *args], repo_root)
+    if code not in (0, 5):
+        raise RuntimeError("pytest collection failed:\n" + (out + err).decode(errors="replace")[-4000:])
+    return [line for line in out.decode(errors="replace").splitlines() if "::" in line and not line.startswith(" ")]
+
+
+class DurationStore:
+    """Per-test durations (seconds) from previous runs, smoothed so one slow run doesn't dominate."""
+
+    def __init__(self, repo_root: Path):
+        self.path = repo_root / DURATIONS_PATH
+        try:
+            self.durations: Dict[str, float] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.durations = {}
+
+    def estimate(self, test_id: str, default: float) -> float:
+        return self.durations.get(test_id, default)
+
+    def default(self) -> float:
+        return statistics.median(self.durations.values()) if self.durations else DEFAULT_DURATION
+
+    def update(self, results: List[Dict[str, Any]]) -> None:
+        for r in results:
+            seconds = r.get("durationMs", 0) / 1000
+            old = self.durations.get(r["id"])
+            self.durations[r["id"]] = seconds if old is None else round(0.7 * seconds + 0.3 * old, 4)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.durations), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def balance(units: Dict[str, float], shards: int) -> List[List[str]]:
+    """Longest-processing-time-first: hand each unit to the currently lightest shard."""
+    heap = [(0.0, i) for i in range(shards)]
+    buckets: List[List[str]] = [[] for _ in range(shards)]
+    for unit, cost in sorted(units.items(), key=lambda kv: (-kv[1], kv[0])):
+        load, i = heapq.heappop(heap)
+        buckets[i].append(unit)
+        heapq.heappush(heap, (load + cost, i))
+    return [b for b in buckets if b]
+
+
+def plan_shards(test_ids: List[str], store: DurationStore, shards: int) -> "tuple[List[List[str]], Dict[str, float]]":
+    """Shard buckets plus the estimated cost (seconds) of every unit in them."""
+    default = store.default()
+    units = {t: store.estimate(t, default) for t in test_ids}
+    if sum(len(t) + 1 for t in test_ids) > MAX_ARGV_BYTES:
+        per_file: Dict[str, float] = {}
+        for t, cost in units.items():
+            f = t.split("::", 1)[0]
+            per_file[f] = per_file.get(f, 0.0) + cost
+        units = per_file
+    return balance(units, max(1, min(shards, len(units)))), units
+
+
+async def run_sharded(
+    repo_root: Path,
+    args: List[str],
+    shards: Optional[int] = None,
+    message_limit: int = MESSAGE_LIMIT,
+    options: Optional[List[str]] = None,
+    on_line: Optional[LineHook] = None,
+) -> Dict[str, Any]:
+    """Run `pytest -q <args>` split over `shards` processes (default: CPU count) and merge per-test results.
+
+    options are pytest flags given to every shard (args only select what is collected).
+    """
+    shards = shards or os.cpu_count() or 1
+    started = time.monotonic()
+    try:
+        test_ids = await collect_tests(repo_root, args)
+    except RuntimeError as e:
+        return {"cmd": ["pytest", "-q"] + args, "code": -1, "output": f"Error: {str(e)}"}
+    store = DurationStore(repo_root)
+    plan, costs = plan_shards(test_ids, store, shards)
+    nodeids = {junit_key(t): t for t in test_ids}
+    with tempfile.TemporaryDirectory(prefix="tdd-mcp-shards-") as tmp:
+        async def one(i: int, units: List[str]) -> Dict[str, Any]:
+            report = Path(tmp) / f"shard-{i}.xml"
+            t0 = time.monotonic()
+            res = await run_cmd(["pytest", "-q", f"--junitxml={report}"] + (options or []) + units, repo_root, on_line=on_line)
+            tests = parse_junit_xml(report, nodeids, message_limit, repo_root)
+            return {
+                "index": i,
+                "units": len(units),
+                "code": res["code"],
+                "durationMs": round((time.monotonic() - t0) * 1000, 1),
+                "expectedMs": round(sum(costs[u] for u in units) * 1000, 1),
+                "output": res["output"],
+                "tests": tests,
+            }
+
+        shard_results = await asyncio.gather(*(one(i, units) for i, units in enumerate(plan)))
+    results = [t for s in shard_results for t in s.pop("tests")]
+    store.update(results)
+    store.save()
+    codes = [s["code"] for s in shard_results if s["code"] not in (0, 5)]
+    output = "".join(f"--- shard {s['index']} ---\n{s.pop('output')}" for s in shard_results)
+    return {
+        "cmd": ["pytest", "-q"] + args,
+        "code": codes[0] if codes else (0 if results or not test_ids else 5),
+        "output": output,
+        "shards": shard_results,
+        "wallMs": round((time.monotonic() - started) * 1000, 1),
+        "tests": {**summarize(results), "results": results},
+    }
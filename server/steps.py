@@ -0,0 +1,266 @@
+"""Run the `steps` of checklist tasks.
+
+A step is {"run": "<cmd>", "when": "<predicate>", "inputs": ["<glob>", ...]}.
+`when` is a small expression language (file_exists, dir_exists, glob, env,
+and/or/not) compiled once per distinct expression. Steps with `inputs` are
+skipped while the matched files are unchanged since their last successful run.
+Commands are split on `&&` / `;` and run without a shell; every program must
+be in `permissions.shell_whitelist` when one is declared.
+"""
+import ast
+import glob as globlib
+import hashlib
+import json
+import os
+import shlex
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from server.dag import run_graph, task_graph
+from server.process import run_cmd
+from server.settings import state_dir
+
+
+class FsSnapshot:
+    """Memoized filesystem lookups for one checklist run, forgotten once a step has run."""
+
+    def __init__(self, repo_root: Path):
+        self.repo_root = repo_root
+        self._exists: Dict[Tuple[str, str], bool] = {}
+        self._globs: Dict[str, List[str]] = {}
+
+    def exists(self, path: str, kind: str = "any") -> bool:
+        key = (path, kind)
+        if key not in self._exists:
+            full = self.repo_root / path
+            check = {"any": os.path.exists, "file": os.path.isfile, "dir": os.path.isdir}[kind]
+            self._exists[key] = check(full)
+        return self._exists[key]
+
+    def glob(self, pattern: str) -> List[str]:
+        if pattern not in self._globs:
+            matches = globlib.glob(pattern, root_dir=str(self.repo_root), recursive=True)
+            self._globs[pattern] = sorted(m for m in matches if os.path.isfile(self.repo_root / m))
+        return self._globs[pattern]
+
+    def invalidate(self) -> None:
+        self._exists.clear()
+        self._globs.clear()
+
+
+Predicate = Callable[[FsSnapshot], bool]
+
+PREDICATES: Dict[str, Callable[[FsSnapshot, str], bool]] = {
+    "file_exists": lambda fs, p: fs.exists(p),
+    "dir_exists": lambda fs, p: fs.exists(p, "dir"),
+    "glob": lambda fs, p: bool(fs.glob(p)),
+    "env": lambda fs, name: bool(os.environ.get(name)),
+}
+
+
+def _compile(node: ast.AST) -> Predicate:
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile(v) for v in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda fs: all(p(fs) for p in parts)
+        return lambda fs: any(p(fs) for p in parts)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        inner = _compile(node.operand)
+        return lambda fs: not inner(fs)
+    if isinstance(node, ast.Constant) and isinstance(node.value, bool):
+        value = node.value
+        return lambda fs: value
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in PREDICATES
+        and len(node.args) == 1
+        and not node.keywords
+        and isinstance(node.args[0], ast.Constant)
+        and isinstance(node.args[0].value, str)
+    ):
+        fn, arg = PREDICATES[node.func.id], node.args[0].value
+        return lambda fs: fn(fs, arg)
+    raise ValueError(f"unsupported expression: {ast.unparse(node)}")
+
+
+@lru_cache(maxsize=1024)
+def compile_when(expr: str) -> Predicate:
+    """Compile a `when` expression; raises ValueError on anything outside the predicate language."""
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid expression: {e.msg}")
+    return _compile(tree.body)
+
+
+def split_command(cmd: str) -> List[List[str]]:
+    """`a && b; c` -> [[a...], [b...], [c...]]; pipes, redirects and the like are rejected."""
+    lexer = shlex.shlex(cmd, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    commands: List[List[str]] = [[]]
+    for token in lexer:
+        if token in ("&&", ";"):
+            commands.append([])
+        elif token and all(ch in "();<>|&" for ch in token):
+            raise ValueError(f"unsupported shell syntax '{token}'")
+        else:
+            commands[-1].append(token)
+    if any(not c for c in commands):
+        raise ValueError("empty command")
+    return commands
+
+
+def inputs_fingerprint(fs: FsSnapshot, patterns: List[str]) -> str:
+    h = hashlib.sha256()
+    for pattern in patterns:
+        h.update(b"\0" + pattern.encode())
+        for rel in fs.glob(pattern):
+            try:
+                st = os.stat(fs.repo_root / rel)
+            except OSError:
+                continue
+            h.update(f"\0{rel}\0{st.st_mtime_ns}\0{st.st_size}".encode())
+    return h.hexdigest()
+
+
+class StepCache:
+    """Input fingerprints of the last successful run of each step, per repo.
+
+    Kept in the server's state directory like the bootstrap cache: what a step
+    produced (installed packages, ...) belongs to this environment, not the repo.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or state_dir("steps") / "fingerprints.json"
+        self._entries: Optional[Dict[str, str]] = None
+
+    def _load(self) -> Dict[str, str]:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, key: str) -> Optional[str]:
+        return self._load().get(key)
+
+    def put(self, key: str, fingerprint: Optional[str]) -> None:
+        entries = self._load()
+        if fingerprint is None:
+            entries.pop(key, None)
+        else:
+            entries[key] = fingerprint
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._load()), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def step_key(repo_root: Path, task_id: str, index: int, run: str) -> str:
+    return f"{repo_root}::{task_id}::{index}::{hashlib.sha256(run.encode()).hexdigest()[:16]}"
+
+
+async def run_step(
+    repo_root: Path,
+    step: Dict[str, Any],
+    fs: FsSnapshot,
+    whitelist: Optional[List[str]],
+    cache: StepCache,
+    key: str,
+    force: bool,
+) -> Dict[str, Any]:
+    run = step.get("run")
+    result: Dict[str, Any] = {"run": run} if run else {k: v for k, v in step.items() if k != "when"}
+    when = step.get("when")
+    try:
+        if when is not None and not compile_when(str(when))(fs):
+            return {**result, "status": "skipped", "reason": f"when: {when}"}
+        if not run:
+            return {**result, "status": "skipped", "reason": "only run steps are executed"}
+        commands = split_command(str(run))
+    except ValueError as e:
+        return {**result, "status": "error", "error": str(e)}
+    if whitelist is not None:
+        denied = [c[0] for c in commands if os.path.basename(c[0]) not in whitelist]
+        if denied:
+            return {**result, "status": "denied", "error": f"not in shell_whitelist: {', '.join(denied)}"}
+    inputs = step.get("inputs") or []
+    fingerprint = inputs_fingerprint(fs, [str(p) for p in inputs]) if inputs else None
+    if fingerprint is not None and not force and cache.get(key) == fingerprint:
+        return {**result, "status": "cached", "reason": "inputs unchanged since last successful run"}
+    started = time.monotonic()
+    outputs: List[str] = []
+    code = 0
+    for argv in commands:
+        res = await run_cmd(argv, repo_root)
+        outputs.append(res["output"])
+        code = res["code"]
+        if code != 0:
+            if "limitHit" in res:
+                result["limitHit"] = res["limitHit"]
+            break
+    cache.put(key, fingerprint if code == 0 else None)
+    return {
+        **result,
+        "status": "passed" if code == 0 else "failed",
+        "code": code,
+        "durationMs": round((time.monotonic() - started) * 1000, 1),
+        "output": "".join(outputs),
+    }
+
+
+async def run_checklist(
+    repo_root: Path,
+    checklist: Dict[str, Any],
+    task_ids: Optional[List[str]] = None,
+    force: bool = False,
+    width: int = 1,
+    cache: Optional[StepCache] = None,
+) -> Dict[str, Any]:
+    """Run the steps of every task (or of task_ids) in `depends_on` order; a failing step fails its task."""
+    perms = checklist.get("permissions") or {}
+    if perms.get("allow_shell") is False:
+        whitelist: Optional[List[str]] = []
+    else:
+        whitelist = perms.get("shell_whitelist")
+        whitelist = [str(w) for w in whitelist] if isinstance(whitelist, list) else None
+    tasks = {str(t.get("id", "task")): t for t in checklist.get("tasks", [])}
+    try:
+        graph = task_graph(list(tasks.values()))
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    if task_ids:
+        unknown = [t for t in task_ids if t not in graph]
+        if unknown:
+            return {"ok": False, "error": f"Unknown task(s): {', '.join(unknown)}"}
+        # selected tasks run without their dependencies; those are the caller's to run
+        graph = {tid: [d for d in graph[tid] if d in task_ids] for tid in graph if tid in task_ids}
+    fs = FsSnapshot(repo_root)
+    cache = cache or StepCache()
+
+    async def run_task(tid: str) -> Dict[str, Any]:
+        steps: List[Dict[str, Any]] = []
+        failed = False
+        for i, step in enumerate(tasks[tid].get("steps") or []):
+            if not isinstance(step, dict):
+                continue
+            if failed:
+                steps.append({"run": step.get("run"), "status": "skipped", "reason": "earlier step failed"})
+                continue
+            res = await run_step(repo_root, step, fs, whitelist, cache, step_key(repo_root, tid, i, str(step.get("run"))), force)
+            if res["status"] in ("passed", "failed"):
+                # the command may have created or removed what later `when`s check
+                fs.invalidate()
+            failed = res["status"] in ("failed", "error", "denied")
+            steps.append(res)
+        return {"code": 1 if failed else 0, "steps": steps}
+
+    try:
+        return await run_graph(graph, run_task, width)
+    finally:
+        cache.save()
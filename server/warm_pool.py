@@ -0,0 +1,279 @@
+"""Pool of pre-warmed test runner processes per repo (see pytest_worker.py and node_worker.js)."""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from server.metrics import SUBPROCESS_LIMIT_KILLS, observe_subprocess
+from server.output import current_log
+from server.process import DEFAULT_TIMEOUT, MAX_LINE_BYTES, OUTPUT_TAIL_LINES, current_env
+from server.sandbox import current_limits, kill_group, limit_message, session_usage, watchdog
+from server.settings import env_int
+
+
+WORKER_SCRIPT = Path(__file__).with_name("pytest_worker.py")
+SENTINEL = "\x00MCP-WORKER "
+STARTUP_TIMEOUT = 300
+
+
+def pytest_worker(repo_root: Path) -> List[str]:
+    env = current_env.get()
+    python = shutil.which("python", path=env.get("PATH") if env else None) or sys.executable
+    return [python, str(WORKER_SCRIPT)]
+
+
+class WarmWorker:
+    def __init__(self, repo_root: Path, argv: List[str]):
+        self.repo_root = repo_root
+        self.argv = argv
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.files: Dict[str, List[Any]] = {}
+        self.runs = 0
+
+    async def start(self) -> None:
+        self.proc = await asyncio.create_subprocess_exec(
+            *self.argv,
+            cwd=str(self.repo_root),
+            env=current_env.get(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            limit=MAX_LINE_BYTES * 64,
+            start_new_session=True,
+        )
+        reply, _ = await asyncio.wait_for(self._read_until_reply(None), STARTUP_TIMEOUT)
+        if not reply.get("ready"):
+            raise RuntimeError(f"{Path(self.argv[1]).name} failed to start")
+        self.files = reply.get("files", {})
+
+    async def watch(self, limits: Dict[str, float], peak: Dict[str, int]) -> "Optional[asyncio.Future[Optional[str]]]":
+        """Start a watchdog holding the worker's session to `limits` for one run (None: nothing to watch).
+
+        The worker outlives its runs, so CPU time is counted from now rather
+        than set as an rlimit, which would add up over every run it serves.
+        """
+        if self.proc is None or ("cpuSeconds" not in limits and "memoryMb" not in limits):
+            return None
+        if "cpuSeconds" in limits:
+            used = await asyncio.to_thread(session_usage, self.proc.pid) or {}
+            limits = {**limits, "cpuSeconds": limits["cpuSeconds"] + used.get("cpuMs", 0) / 1000}
+        return asyncio.ensure_future(watchdog(self.proc.pid, limits, peak))
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    def stale(self) -> bool:
+        """True when a repo file this worker has imported changed on disk."""
+        for path, (mtime_ns, size) in self.files.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                return True
+            if st.st_mtime_ns != int(mtime_ns) or st.st_size != size:
+                return True
+        return False
+
+    async def _read_until_reply(self, tail: Optional[Deque[str]]) -> "tuple[Dict[str, Any], int]":
+        assert self.proc is not None and self.proc.stdout is not None
+        log = current_log.get()
+        total = 0
+        while True:
+            raw = await self.proc.stdout.readline()
+            if not raw:
+                raise RuntimeError(f"{Path(self.argv[1]).name} exited unexpectedly")
+            text = raw[:MAX_LINE_BYTES].decode("utf-8", errors="replace").rstrip("\r\n")
+            if text.startswith(SENTINEL):
+                if log is not None:
+                    log.flush()
+                return json.loads(text[len(SENTINEL):]), total
+            if tail is None:
+                continue
+            total += 1
+            tail.append(text)
+            if log is not None:
+                log.write({"type": "line", "text": text}, flush=False)
+
+    async def run(self, args: List[str], tail: Deque[str]) -> "tuple[int, int]":
+        assert self.proc is not None and self.proc.stdin is not None
+        self.proc.stdin.write((json.dumps({"args": args}) + "\n").encode())
+        await self.proc.stdin.drain()
+        reply, total = await self._read_until_reply(tail)
+        self.files = reply.get("files", self.files)
+        self.runs += 1
+        return int(reply.get("code", -1)), total
+
+    async def stop(self) -> None:
+        if self.alive:
+            assert self.proc is not None
+            # the worker leads its own session: take whatever the tests started with it
+            kill_group(self.proc.pid)
+            await self.proc.wait()
+
+
+class WarmPool:
+    """Idle warm workers per repo.
+
+    A worker is recycled (killed and replaced) once any repo file it imported
+    changes, since pytest would otherwise keep running the stale module.
+    launch(repo_root) gives the worker's argv; command is what a run reports
+    as its cmd.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_runs: Optional[int] = None,
+        launch: Callable[[Path], List[str]] = pytest_worker,
+        command: Optional[List[str]] = None,
+    ):
+        self.size = size or env_int("MCP_WARM_WORKERS_PER_REPO", 2)
+        self.max_runs = max_runs or env_int("MCP_WARM_WORKER_MAX_RUNS", 200)
+        self.launch = launch
+        self.command = command or ["pytest"]
+        self._idle: Dict[str, List[WarmWorker]] = {}
+        self._spawning: Dict[str, int] = {}
+        self._prewarming: Set["asyncio.Task[None]"] = set()
+        self._closing = False
+        self.recycled = 0
+        self.reused = 0
+        self.spawned = 0
+
+    @staticmethod
+    def _key(repo_root: Path) -> str:
+        # workers started inside different environments (venvs) are not interchangeable
+        env = current_env.get()
+        return f"{repo_root}\0{env.get('VIRTUAL_ENV', '') if env else ''}"
+
+    async def _spawn(self, repo_root: Path) -> WarmWorker:
+        worker = WarmWorker(repo_root, self.launch(repo_root))
+        try:
+            await worker.start()
+        except BaseException:
+            await worker.stop()
+            raise
+        return worker
+
+    async def _acquire(self, repo_root: Path) -> "tuple[WarmWorker, bool]":
+        idle = self._idle.setdefault(self._key(repo_root), [])
+        while idle:
+            worker = idle.pop()
+            if worker.alive and not worker.stale() and worker.runs < self.max_runs:
+                self.reused += 1
+                return worker, True
+            self.recycled += 1
+            await worker.stop()
+        worker = await self._spawn(repo_root)
+        self.spawned += 1
+        return worker, False
+
+    def _refill(self, repo_root: Path) -> None:
+        key = self._key(repo_root)
+        missing = self.size - len(self._idle.get(key, [])) - self._spawning.get(key, 0)
+        for _ in range(0 if self._closing else max(0, missing)):
+            self._spawning[key] = self._spawning.get(key, 0) + 1
+            # held here until done: shutdown() waits for it, and the loop keeps only a weak reference
+            task = asyncio.get_running_loop().create_task(self._prewarm(repo_root))
+            self._prewarming.add(task)
+            task.add_done_callback(self._prewarming.discard)
+
+    async def _prewarm(self, repo_root: Path) -> None:
+        key = self._key(repo_root)
+        try:
+            worker = await self._spawn(repo_root)
+            if self._closing:
+                await worker.stop()
+            else:
+                self._idle.setdefault(key, []).append(worker)
+        except Exception:
+            pass
+        finally:
+            self._spawning[key] -= 1
+
+    async def run(self, repo_root: Path, args: List[str], timeout: float = DEFAULT_TIMEOUT) -> dict:
+        cmd = self.command + args
+        limits = current_limits.get() or {}
+        timeout = min(timeout, limits.get("wallSeconds", timeout))
+        log = current_log.get()
+        if log is not None:
+            log.write({"type": "start", "cmd": cmd, "warm": True})
+        started = time.monotonic()
+        tail: Deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+        worker: Optional[WarmWorker] = None
+        guard = None
+        peak: Dict[str, int] = {}
+        try:
+            worker, reused = await self._acquire(repo_root)
+            guard = await worker.watch(limits, peak)
+            code, total = await asyncio.wait_for(worker.run(args, tail), timeout)
+        except asyncio.TimeoutError:
+            if worker is not None:
+                await worker.stop()
+            observe_subprocess(time.monotonic() - started, -1, timed_out=True)
+            result = {"cmd": cmd, "code": -1, "output": f"Timeout: Command {cmd!r} timed out after {timeout} seconds", "warm": True}
+            if "wallSeconds" in limits:
+                result.update(limits=limits, limitHit="wall")
+                SUBPROCESS_LIMIT_KILLS.inc(limit="wall")
+            return result
+        except asyncio.CancelledError:
+            if worker is not None:
+                await worker.stop()
+            raise
+        except Exception as e:
+            if worker is not None:
+                await worker.stop()
+            hit = guard.result() if guard is not None and guard.done() else None
+            if hit:
+                SUBPROCESS_LIMIT_KILLS.inc(limit=hit)
+                output = "\n".join(tail) + "\n" + limit_message(hit, limits)
+                return {"cmd": cmd, "code": -1, "output": output, "warm": True, "limits": limits, "groupPeak": peak, "limitHit": hit}
+            return {"cmd": cmd, "code": -1, "output": f"Error: {str(e)}", "warm": True}
+        finally:
+            if guard is not None and not guard.done():
+                guard.cancel()
+        self._idle.setdefault(self._key(repo_root), []).append(worker)
+        self._refill(repo_root)
+        seconds = time.monotonic() - started
+        observe_subprocess(seconds, code)
+        result = {
+            "cmd": cmd,
+            "code": code,
+            "output": "\n".join(tail) + "\n" if tail else "",
+            "warm": True,
+            "workerReused": reused,
+            "workerHitRate": self.hit_rate(),
+            "durationMs": round(seconds * 1000, 1),
+        }
+        if limits:
+            result["limits"] = limits
+        if peak:
+            result["groupPeak"] = peak
+        if total > len(tail):
+            result["truncated"] = True
+        if log is not None:
+            result["logPath"] = str(log.path)
+            log.write({"type": "exit", "cmd": cmd, "code": code})
+        return result
+
+    def hit_rate(self) -> Optional[float]:
+        """Share of runs that found a warm worker waiting."""
+        runs = self.reused + self.spawned
+        return round(self.reused / runs, 3) if runs else None
+
+    async def shutdown(self) -> None:
+        self._closing = True
+        for task in list(self._prewarming):
+            task.cancel()
+        # _spawn stops a worker whose start is cancelled
+        await asyncio.gather(*list(self._prewarming), return_exceptions=True)
+        for workers in self._idle.values():
+            for worker in workers:
+                await worker.stop()
+        self._idle.clear()
+        # nothing is left starting: the pool can be used (and refilled) again
+        self._closing = False
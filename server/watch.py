@@ -0,0 +1,215 @@
+"""Watch sessions: rerun the tests affected by file changes as they are saved.
+
+A session follows the repo tree (inotify, or a polling scan where inotify is
+unavailable), debounces bursts of changes into one batch, submits a test run
+for it and broadcasts the run's events to every subscriber. A batch arriving
+while a run is in flight cancels that run: only the latest state matters.
+"""
+import asyncio
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from server.fswatch import IN_CREATE, IN_ISDIR, IN_MOVED_TO, IN_Q_OVERFLOW, Inotify
+from server.impact import SKIP_DIRS
+from server.jobs import Job, JobManager
+
+WATCH_SKIP_DIRS = SKIP_DIRS | {".pytest_cache", ".mypy_cache", ".ruff_cache", ".hypothesis", "htmlcov"}
+IGNORED_SUFFIXES = (".pyc", ".pyo", ".swp", ".swx", ".tmp", "~")
+
+
+def ignored(rel: str) -> bool:
+    parts = rel.split(os.sep)
+    if any(p in WATCH_SKIP_DIRS or p.endswith(".egg-info") for p in parts[:-1]):
+        return True
+    name = parts[-1]
+    return name.endswith(IGNORED_SUFFIXES) or name.startswith(".#")
+
+
+def scan(root: Path) -> Dict[str, Tuple[int, int]]:
+    """(mtime_ns, size) of every watched file, keyed by repo-relative path."""
+    state: Dict[str, Tuple[int, int]] = {}
+    for dirpath, dirnames, files in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in WATCH_SKIP_DIRS and not d.endswith(".egg-info")]
+        for name in files:
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root)
+            if ignored(rel):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            state[rel] = (st.st_mtime_ns, st.st_size)
+    return state
+
+
+class ChangeFeed:
+    """Changed repo-relative paths as they happen; None means "unknown, assume everything"."""
+
+    def __init__(self, root: Path, poll_interval: float = 0.5):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._inotify = Inotify.create(nonblocking=True)
+        self._queue: "asyncio.Queue[Optional[Set[str]]]" = asyncio.Queue()
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        self._poller: Optional[asyncio.Task] = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "poll"
+
+    def start(self) -> None:
+        if self._inotify is not None and self._watch_tree(self.root):
+            asyncio.get_running_loop().add_reader(self._inotify.fd, self._on_readable)
+            return
+        if self._inotify is not None:
+            # ran out of watches part-way: polling is the only complete view
+            self._inotify.close()
+            self._inotify = None
+        self._snapshot = scan(self.root)
+        self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+        if self._poller is not None:
+            self._poller.cancel()
+
+    def _watch_tree(self, top: Path) -> bool:
+        assert self._inotify is not None
+        for dirpath, dirnames, _files in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d not in WATCH_SKIP_DIRS and not d.endswith(".egg-info")]
+            if self._inotify.add_watch(dirpath) is None:
+                return False
+        return True
+
+    def _on_readable(self) -> None:
+        assert self._inotify is not None
+        changed: Set[str] = set()
+        for wd, mask, name in self._inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                self._queue.put_nowait(None)
+                continue
+            base = self._inotify.paths.get(wd)
+            if base is None or not name:
+                continue
+            path = os.path.join(base, name)
+            rel = os.path.relpath(path, self.root)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not ignored(os.path.join(rel, "x")):
+                    self._watch_tree(Path(path))
+                    # files written before the watch landed would otherwise go unnoticed
+                    changed.update(os.path.join(rel, f) for f in scan(Path(path)))
+                continue
+            if not ignored(rel):
+                changed.add(rel)
+        if changed:
+            self._queue.put_nowait(changed)
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await asyncio.to_thread(scan, self.root)
+            changed = {rel for rel in current.keys() | self._snapshot.keys() if current.get(rel) != self._snapshot.get(rel)}
+            self._snapshot = current
+            if changed:
+                self._queue.put_nowait(changed)
+
+    async def batches(self, debounce: float) -> AsyncIterator[Optional[List[str]]]:
+        """Coalesce changes until `debounce` seconds pass without another one."""
+        while True:
+            first = await self._queue.get()
+            pending: Optional[Set[str]] = set(first) if first is not None else None
+            while True:
+                try:
+                    more = await asyncio.wait_for(self._queue.get(), debounce)
+                except asyncio.TimeoutError:
+                    break
+                pending = None if more is None or pending is None else pending | more
+            yield sorted(pending) if pending is not None else None
+
+
+class WatchSession:
+    def __init__(self, repo: Path, jobs: JobManager, run: Callable[[Optional[List[str]]], Job], debounce: float, queue_size: int = 1000):
+        self.id = uuid.uuid4().hex[:12]
+        self.repo = repo
+        self.jobs = jobs
+        self.run = run
+        self.debounce = debounce
+        self.queue_size = queue_size
+        self.created_at = time.time()
+        self.runs = 0
+        self.current: Optional[Job] = None
+        self.last: Optional[Dict[str, Any]] = None
+        self.feed = ChangeFeed(repo)
+        self._subscribers: Set["asyncio.Queue[Optional[Dict[str, Any]]]"] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.feed.start()
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self.feed.close()
+        if self.current is not None:
+            self.jobs.cancel(self.current.id)
+        for queue in self._subscribers:
+            queue.put_nowait(None)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        event.setdefault("ts", time.time())
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # a subscriber that can't keep up loses events rather than stalling the session
+                pass
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield {"type": "watch", **self.to_dict()}
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+    async def _loop(self) -> None:
+        async for changed in self.feed.batches(self.debounce):
+            if self.current is not None and not self.current.done:
+                self.jobs.cancel(self.current.id)
+            self.runs += 1
+            self.publish({"type": "change", "run": self.runs, "files": changed})
+            job = self.run(changed)
+            self.current = job
+            asyncio.get_running_loop().create_task(self._forward(self.runs, job))
+
+    async def _forward(self, run: int, job: Job) -> None:
+        async for event in job.log.follow():
+            self.publish({**event, "run": run})
+        await self.jobs.wait(job)
+        self.last = {"run": run, **job.to_dict()}
+        self.publish({"type": "result", **self.last})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "watchId": self.id,
+            "repo": str(self.repo),
+            "mode": self.feed.mode,
+            "debounceMs": round(self.debounce * 1000),
+            "createdAt": self.created_at,
+            "runs": self.runs,
+            "running": self.current is not None and not self.current.done,
+            "subscribers": len(self._subscribers),
+            "last": self.last,
+        }
@@ -67,13 +67,15 @@ docker run -d --name "${CONTAINER_NAME}" -p ${PORT}:63777 \
   -v "${REPO_PATH}:/work" \
   "${IMAGE_TAG}"
 
-# Wait for FastAPI to become ready
+# Wait for FastAPI to become ready (polling every 0.1s for up to 30s)
 echo "[start-mcp] Waiting for API to be ready..."
-for i in 1 2 3 4 5 6 7 8 9 10; do
-  if curl -fsS "http://localhost:${PORT}/health" >/dev/null; then
+i=0
+while [ "$i" -lt 300 ]; do
+  if curl -fsS "http://localhost:${PORT}/ready" >/dev/null 2>&1; then
     break
   fi
-  sleep 1
+  i=$((i + 1))
+  sleep 0.1
 done
 
 echo "[start-mcp] Introducing to server..."
@@ -100,7 +102,7 @@ else
   echo "[start-mcp] Checklist exists. Starting TDD bootstrap/tests..."
   TDD=$(curl -sS -X POST "http://localhost:${PORT}/tdd/start" \
     -H 'Content-Type: application/json' \
-    -d "{\"repoPath\": \"/work\", \"language\": \"${LANGUAGE_INPUT}\"}")
+    -d "{\"repoPath\": \"/work\", \"language\": \"${LANGUAGE_INPUT}\", \"wait\": true}")
   echo "$TDD" | sed 's/.*/[server] &/'
 fi
 
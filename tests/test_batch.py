@@ -0,0 +1,36 @@
+import asyncio
+
+from server.batch import collect_results, fan_out
+
+
+def test_fan_out_yields_in_completion_order_with_bounded_concurrency():
+    delays = {"slow": 0.2, "fast": 0.01, "mid": 0.05, "boom": 0}
+    in_flight = []
+    peak = [0]
+
+    async def work(repo):
+        in_flight.append(repo)
+        peak[0] = max(peak[0], len(in_flight))
+        await asyncio.sleep(delays[repo])
+        in_flight.remove(repo)
+        if repo == "boom":
+            raise RuntimeError("no checklist")
+        return {"ok": True}
+
+    async def main():
+        return [r async for r in fan_out(list(delays), work, limit=3)]
+
+    results = asyncio.run(main())
+    assert [r["repoPath"] for r in results][0] == "fast"
+    assert results[-1]["repoPath"] == "slow"
+    assert {"repoPath": "boom", "ok": False, "error": "no checklist"} in results
+    assert peak[0] == 3
+
+
+def test_collect_results_keeps_request_order():
+    async def work(repo):
+        await asyncio.sleep(0.02 if repo == "a" else 0)
+        return {"ok": True}
+
+    out = asyncio.run(collect_results(fan_out(["a", "b", "a"], work), ["a", "b", "a"]))
+    assert [r["repoPath"] for r in out["results"]] == ["a", "b"]
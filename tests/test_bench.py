@@ -0,0 +1,14 @@
+from benchmarks.run import compare, run
+
+
+def test_benchmark_report_is_machine_readable(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path))
+    report = run([5], min_time=0)
+    names = {r["name"] for r in report["results"]}
+    assert {"load_checklist.cold", "scaffold.cold", "list_task_status", "http POST /tasks/status"} <= names
+    cold = next(r for r in report["results"] if r["name"] == "scaffold.cold")
+    noop = next(r for r in report["results"] if r["name"] == "scaffold.noop")
+    assert cold["filesWritten"] > 0 and noop["filesWritten"] == 0
+    for r in report["results"]:
+        assert r["iterations"] >= 3 and r["p99Ms"] >= r["p50Ms"] >= 0
+    assert {row["p50Ratio"] for row in compare(report, report)} <= {1.0, None}
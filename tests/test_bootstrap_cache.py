@@ -0,0 +1,49 @@
+import asyncio
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from server import main as srv
+from server.bootstrap_cache import BootstrapCache, dependency_fingerprint
+
+
+def test_entry_needs_the_outputs_its_install_left(tmp_path):
+    cache = BootstrapCache(tmp_path / "fingerprints.json")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "package-lock.json").write_text("{}")
+    fingerprint = dependency_fingerprint(repo, "node", [["npm", "ci"]])
+    (repo / "node_modules").mkdir()
+    # taken before the install, the fingerprint does not depend on its outputs
+    assert dependency_fingerprint(repo, "node", [["npm", "ci"]]) == fingerprint
+    cache.record(repo, "node", fingerprint)
+    assert cache.matches(repo, "node", fingerprint)
+    (repo / "node_modules").rmdir()
+    assert not cache.matches(repo, "node", fingerprint)
+    # an install that produced nothing (no dependencies) still counts
+    cache.record(repo, "node", fingerprint)
+    assert BootstrapCache(tmp_path / "fingerprints.json").matches(repo, "node", fingerprint)
+
+
+@pytest.mark.skipif(shutil.which("npm") is None, reason="npm not installed")
+def test_second_bootstrap_of_an_unchanged_repo_is_a_hit(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_ENV_STORE", "0")
+    monkeypatch.setenv("npm_config_offline", "true")
+    monkeypatch.setattr(srv, "bootstrap_cache", BootstrapCache(tmp_path / "fingerprints.json"))
+    repo = tmp_path / "repo"
+    (repo / "dep").mkdir(parents=True)
+    (repo / "dep" / "package.json").write_text(json.dumps({"name": "dep", "version": "1.0.0"}))
+    (repo / "package.json").write_text(json.dumps({"name": "app", "version": "1.0.0", "dependencies": {"dep": "file:./dep"}}))
+    subprocess.run(["npm", "install", "--package-lock-only"], cwd=repo, check=True, capture_output=True, timeout=120)
+
+    def bootstrap():
+        return asyncio.run(srv.bootstrap_and_test(repo, "node", "auto", include_tests=False))
+
+    first = bootstrap()
+    assert first["bootstrapCache"] == {"node": "miss"} and first["ok"]
+    assert (repo / "node_modules" / "dep").exists()
+    assert bootstrap()["bootstrapCache"] == {"node": "hit"}
+    shutil.rmtree(repo / "node_modules")
+    assert bootstrap()["bootstrapCache"] == {"node": "miss"}
@@ -0,0 +1,63 @@
+import os
+import time
+
+from server.checklist_cache import FileCache, signature
+
+
+def test_cache_hits_until_file_signature_changes(tmp_path):
+    path = tmp_path / "c.yaml"
+    path.write_text("a: 1\n")
+    cache = FileCache(max_entries=4, use_inotify=False)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return path.read_text()
+
+    assert cache.get("k", [path], compute) == "a: 1\n"
+    assert cache.get("k", [path], compute) == "a: 1\n"
+    assert len(calls) == 1
+    path.write_text("a: 22\n")
+    assert cache.get("k", [path], compute) == "a: 22\n"
+    assert len(calls) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = FileCache(max_entries=2, use_inotify=False)
+    for key in ("a", "b", "a", "c"):
+        cache.get(key, [tmp_path], lambda: key)
+    assert cache.stats()["entries"] == 2
+    assert cache.get("a", [tmp_path], lambda: "recomputed") == "a"
+    assert cache.get("b", [tmp_path], lambda: "recomputed") == "recomputed"
+
+
+def test_inotify_invalidation(tmp_path):
+    path = tmp_path / "m.py"
+    path.write_text("x")
+    cache = FileCache(use_inotify=True)
+    assert cache.get("k", [path], path.read_text) == "x"
+    # same size, inode and mtime: only the inotify event can tell
+    st = os.stat(path)
+    path.write_text("y")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert signature(path) == (st.st_mtime_ns, st.st_size, st.st_ino)
+    deadline = time.time() + 2
+    while cache.get("k", [path], path.read_text) != "y" and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get("k", [path], path.read_text) == "y"
+
+
+def test_evicted_entries_release_their_watches(tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+    cache = FileCache(max_entries=2, use_inotify=True)
+    cache.get("a", [tmp_path / "a"], lambda: "a")
+    cache.get("a2", [tmp_path / "a"], lambda: "a2")
+    assert cache.stats()["watches"] == 1
+    # "a" goes, but "a2" still needs the watch on a/
+    cache.get("b", [tmp_path / "b"], lambda: "b")
+    assert cache.stats()["watches"] == 2
+    cache.get("c", [tmp_path / "c"], lambda: "c")
+    assert cache.stats()["watches"] == 2 and set(cache._inotify.paths.values()) == {str(tmp_path / "b"), str(tmp_path / "c")}
+    cache.invalidate("c")
+    assert cache.stats()["watches"] == 1
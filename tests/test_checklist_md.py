@@ -0,0 +1,77 @@
+import threading
+
+from server import main as srv
+from server.checklist_md import ChecklistMarker, build_index, checked_ids
+
+CHECKLIST = "# CHECKLIST\n\n## Tasks\n- [ ] Install (bootstrap-deps)\n  - Steps:\n- [ ] Run tests (run-tests)\n"
+
+
+def test_build_index_points_at_checkboxes():
+    content = CHECKLIST.encode()
+    index = build_index(content)
+    assert set(index) == {"bootstrap-deps", "run-tests"}
+    for offsets in index.values():
+        assert content[offsets[0]:offsets[0] + 5] == b"- [ ]"
+
+
+def test_batch_mark_and_unmark(tmp_path):
+    md = tmp_path / "CHECKLIST.md"
+    md.write_text(CHECKLIST)
+    marker = ChecklistMarker()
+    result = marker.mark(tmp_path, {"bootstrap-deps": True, "run-tests": True, "nope": True})
+    assert result["updated"] == ["bootstrap-deps", "run-tests"]
+    assert result["missing"] == ["nope"]
+    assert md.read_text().count("- [x]") == 2
+    assert marker.mark(tmp_path, {"run-tests": True})["changed"] is False
+    marker.mark(tmp_path, {"run-tests": False})
+    assert "- [ ] Run tests (run-tests)" in md.read_text()
+
+
+def test_concurrent_marks_are_not_lost(tmp_path):
+    ids = [f"t{i}" for i in range(50)]
+    (tmp_path / "CHECKLIST.md").write_text("".join(f"- [ ] Task ({tid})\n" for tid in ids))
+    marker = ChecklistMarker()
+    threads = [threading.Thread(target=marker.mark, args=(tmp_path, {tid: True})) for tid in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert (tmp_path / "CHECKLIST.md").read_text().count("- [x]") == 50
+    assert marker.writes <= 50
+
+
+def test_checked_ids():
+    assert checked_ids(b"- [x] A (a)\n- [ ] B (b)\n  - [X] C (c)\n") == {"a"}
+
+
+def test_marks_survive_concurrent_regeneration(tmp_path):
+    checklist = {"tasks": [{"id": f"t{i}", "title": f"Task {i}"} for i in range(30)]}
+    md = srv.sync_checklist_md(tmp_path, checklist)[0]
+    stop = threading.Event()
+    partial = []
+
+    def regenerate():
+        while not stop.is_set():
+            srv.sync_checklist_md(tmp_path, {"tasks": checklist["tasks"] + [{"id": "extra", "title": "Extra"}]})
+            srv.sync_checklist_md(tmp_path, checklist)
+
+    def read():
+        # files are replaced by rename, so a reader never sees one half written
+        while not stop.is_set():
+            index = build_index(md.read_bytes())
+            if any(f"t{i}" not in index for i in range(30)):
+                partial.append(sorted(index))
+
+    workers = [threading.Thread(target=regenerate), threading.Thread(target=read)]
+    for t in workers:
+        t.start()
+    marks = [threading.Thread(target=srv.mark_checklist_items, args=(tmp_path, [t["id"]], True)) for t in checklist["tasks"]]
+    for t in marks:
+        t.start()
+    for t in marks:
+        t.join()
+    stop.set()
+    for t in workers:
+        t.join()
+    assert checked_ids(md.read_bytes()) == {t["id"] for t in checklist["tasks"]}
+    assert partial == []
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from server.dag import critical_path, run_graph, task_graph, topo_order
+
+
+def test_task_graph_validates():
+    assert task_graph([{"id": "a"}, {"id": "b", "depends_on": "a"}]) == {"a": [], "b": ["a"]}
+    with pytest.raises(ValueError, match="unknown"):
+        task_graph([{"id": "a", "depends_on": ["x"]}])
+    with pytest.raises(ValueError, match="cycle"):
+        task_graph([{"id": "a", "depends_on": ["b"]}, {"id": "b", "depends_on": ["a"]}])
+
+
+def test_topo_order_keeps_declaration_order():
+    assert topo_order({"a": [], "b": [], "c": []}) == ["a", "b", "c"]
+    assert topo_order({"test": ["build"], "lint": [], "build": []}) == ["lint", "build", "test"]
+
+
+def test_critical_path():
+    graph = {"boot": [], "lint": [], "build": ["boot"], "test": ["build", "lint"]}
+    assert critical_path(graph, {"boot": 1, "lint": 5, "build": 1, "test": 1}) == ["lint", "test"]
+    assert critical_path(graph, {"boot": 3, "lint": 1, "build": 3, "test": 1}) == ["boot", "build", "test"]
+
+
+def test_run_graph_runs_independent_tasks_concurrently():
+    graph = {"boot": [], "lint": [], "build": ["boot"], "bad": [], "after-bad": ["bad"]}
+    running = []
+    peak = [0]
+
+    async def run(tid):
+        running.append(tid)
+        peak[0] = max(peak[0], len(running))
+        await asyncio.sleep(0.05)
+        running.remove(tid)
+        return {"code": 1 if tid == "bad" else 0}
+
+    result = asyncio.run(run_graph(graph, run, width=4))
+    status = {t["id"]: t["status"] for t in result["tasks"]}
+    assert status == {"boot": "passed", "lint": "passed", "build": "passed", "bad": "failed", "after-bad": "skipped"}
+    assert peak[0] == 3
+    assert result["code"] == 1
+    assert result["criticalPath"][-1] == "build"
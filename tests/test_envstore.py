@@ -0,0 +1,80 @@
+from pathlib import Path
+
+from server import main as srv
+from server.envstore import EnvStore, env_fingerprint
+
+PIP = [["pip", "install", "-r", "requirements.txt"]]
+
+
+def test_identical_dependencies_share_a_fingerprint_unless_editable(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    for repo in (a, b):
+        repo.mkdir()
+        (repo / "requirements.txt").write_text("requests==2.31.0\n")
+    assert env_fingerprint(a, "python", PIP) == env_fingerprint(b, "python", PIP)
+    (b / "requirements.txt").write_text("requests==2.32.0\n")
+    assert env_fingerprint(a, "python", PIP) != env_fingerprint(b, "python", PIP)
+
+    editable = [["pip", "install", "-e", "."]]
+    (b / "requirements.txt").write_text("requests==2.31.0\n")
+    assert env_fingerprint(a, "python", editable) != env_fingerprint(b, "python", editable)
+
+
+def fill(store: EnvStore, key: str, size: int) -> None:
+    path = store.begin(key)
+    (path / "blob").write_bytes(b"x" * size)
+    store.commit(key, "python")
+
+
+def test_evicts_least_recently_used_but_never_in_use(tmp_path):
+    store = EnvStore(tmp_path / "envs", budget_mb=1)
+    half = 600 * 1024
+    fill(store, "python-old", half)
+    with store.use("python-old"):
+        fill(store, "python-new", half)
+        # over budget, but the older entry is in use and the new one was just built
+        assert store.ready("python-old") and store.ready("python-new")
+    fill(store, "python-newest", half)
+    assert not store.path("python-old").exists()
+    assert not store.path("python-new").exists()
+    assert store.ready("python-newest")
+    assert store.stats()["entries"] == 1
+
+
+def test_node_modules_is_adopted_then_linked(tmp_path):
+    store = EnvStore(tmp_path / "envs")
+    key = "node-abc"
+    first, second = tmp_path / "first", tmp_path / "second"
+    (first / "node_modules" / "left-pad").mkdir(parents=True)
+    (second / "node_modules").mkdir(parents=True)
+    store.begin(key)
+    store.adopt_node_modules(first, key)
+    store.commit(key, "node")
+    store.link_node_modules(second, key)
+    for repo in (first, second):
+        link = repo / "node_modules"
+        assert link.is_symlink()
+        assert Path(link.resolve()) == store.path(key) / "node_modules"
+        assert (link / "left-pad").is_dir()
+
+
+def test_skipped_bootstrap_plans_pytest_only_where_it_exists(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_ENV_STORE", "1")
+    monkeypatch.setattr(srv, "command_available", lambda command: command != "pytest")
+    store = EnvStore(tmp_path / "envs")
+    monkeypatch.setattr(srv, "env_store", store)
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "requirements.txt").write_text("requests==2.31.0\n")
+
+    def test_cmds(bootstrap):
+        return [s["cmd"] for s in srv.plan_bootstrap(repo, "python", bootstrap)["steps"] if s["phase"] == "test"]
+
+    # an install would build the environment and its pytest; skipping it leaves none
+    assert test_cmds("auto") == [["pytest", "-q"]]
+    assert test_cmds("skip") == []
+    install = [s["cmd"] for s in srv.python_install_steps(repo)]
+    fill(store, store.key("python", env_fingerprint(repo, "python", install)), 1)
+    assert test_cmds("skip") == [["pytest", "-q"]]
+    monkeypatch.setenv("MCP_ENV_STORE", "0")
+    assert test_cmds("auto") == []
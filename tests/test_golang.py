@@ -0,0 +1,60 @@
+import asyncio
+import shutil
+import subprocess
+
+import pytest
+
+from server import golang
+from server import main as srv
+from server.bootstrap_cache import BootstrapCache
+
+
+def package(path, imports=(), test_imports=()):
+    return {"ImportPath": f"example.com/m/{path}".rstrip("/."), "Dir": f"/repo/{path}",
+            "Imports": list(imports), "TestImports": list(test_imports)}
+
+
+def test_changes_select_their_packages_and_importers():
+    packages = [
+        package("."),
+        package("core", imports=["fmt"]),
+        package("api", imports=["example.com/m/core"]),
+        package("cli", test_imports=["example.com/m/api"]),
+        package("other"),
+    ]
+    select = lambda changed: golang.select_packages("/repo", packages, changed)  # noqa: E731
+    assert select(["core/sum.go"])["packages"] == ["example.com/m/core", "example.com/m/api", "example.com/m/cli"]
+    assert select(["other/testdata/input.txt", "README.md", ".mcp/checklist.yaml"])["packages"] == ["example.com/m/other"]
+    assert select(["go.sum"])["mode"] == "full"
+    assert select(["newpkg/x.go"])["mode"] == "full"
+
+
+@pytest.mark.skipif(shutil.which("go") is None, reason="go not installed")
+def test_go_runs_keep_caches_in_the_repo_and_report_hits(tmp_path, monkeypatch):
+    monkeypatch.setattr(srv, "bootstrap_cache", BootstrapCache(tmp_path / "fingerprints.json"))
+    (tmp_path / "go.mod").write_text("module example.com/m\n\ngo 1.20\n")
+    for name, body in {"a": 'import "example.com/m/b"\n\nfunc A() int { return b.B() }\n', "b": "func B() int { return 1 }\n"}.items():
+        (tmp_path / name).mkdir()
+        (tmp_path / name / f"{name}.go").write_text(f"package {name}\n\n{body}")
+        (tmp_path / name / f"{name}_test.go").write_text(f'package {name}\n\nimport "testing"\n\nfunc TestIt(t *testing.T) {{}}\n')
+
+    # as if the repo's cache had been kept from earlier runs: the standard library is already built
+    cache = tmp_path / golang.BUILD_CACHE
+    cache.parent.mkdir(parents=True)
+    cache.symlink_to(subprocess.run(["go", "env", "GOCACHE"], capture_output=True, text=True).stdout.strip())
+
+    def run(bootstrap="auto", **options):
+        return asyncio.run(srv.bootstrap_and_test(tmp_path, "go", bootstrap, use_cache=False, **options))
+
+    env = golang.cache_env(tmp_path)
+    assert env["GOCACHE"] == str(cache) and "-modcacherw" in env["GOFLAGS"]
+    assert run()["cacheHitRates"]["go"] == {"install": 0.0, "tests": 0.0}
+    again = run()
+    # go mod download is not repeated once it created the repo's module cache
+    assert again["cacheHitRates"]["go"] == {"install": 1.0, "tests": 1.0}
+    assert again["results"][0]["goTestCache"] == {"packages": 2, "cached": 2, "hitRate": 1.0}
+
+    impact = asyncio.run(golang.affected_packages(tmp_path, ["a/a.go"]))
+    assert impact == {"mode": "selected", "packages": ["example.com/m/a"]}
+    only_a = run("skip", go_packages=impact["packages"])
+    assert [t["id"] for t in only_a["results"][0]["tests"]["results"]] == ["example.com/m/a::TestIt"]
@@ -0,0 +1,64 @@
+import asyncio
+import sqlite3
+
+from server import history
+from server import main as srv
+from server.metrics import phase_labels
+
+
+def run_result(outcomes, tree="t1", cached=False):
+    tests = [{"id": name, "outcome": outcome, "durationMs": ms} for name, (outcome, ms) in outcomes.items()]
+    step = {"cmd": ["pytest", "-q"], "code": 1 if any(o in ("failed", "error") for o, _ in outcomes.values()) else 0,
+            "tests": {"results": tests}, "cached": cached}
+    return {"ok": step["code"] == 0, "results": [step], "treeHash": tree}
+
+
+def test_queries_over_recorded_runs(tmp_path):
+    for i in range(12):
+        slow = 300.0 if i >= 8 else 100.0
+        flaky = "failed" if i % 3 == 0 else "passed"
+        outcomes = {"t.py::test_slow": ("passed", slow), "t.py::test_flaky": (flaky, 5.0), "t.py::test_fast": ("passed", 1.0)}
+        history.record(tmp_path, "tests/run", 1000.0 + i, 0.5, run_result(outcomes, tree="same"), {("test", "python"): 0.4})
+    # cached results are not counted twice
+    history.record(tmp_path, "tests/run", 2000.0, 0.01, run_result({"t.py::test_fast": ("failed", 1.0)}, cached=True), {})
+
+    assert [t["id"] for t in history.slowest(tmp_path, limit=2)] == ["t.py::test_slow", "t.py::test_flaky"]
+    regressed = history.regressions(tmp_path, window=4, baseline=8)
+    assert [(t["id"], t["recentMs"], t["baselineMs"]) for t in regressed] == [("t.py::test_slow", 300.0, 100.0)]
+    flaky = history.flaky(tmp_path)
+    assert [t["id"] for t in flaky] == ["t.py::test_flaky"]
+    assert flaky[0]["failures"] == 4 and flaky[0]["sameTreeFlips"] == 1
+    trends = history.trends(tmp_path)
+    assert len(trends["runs"]) == 13
+    assert trends["phases"]["test:python"]["p50Ms"] == 400.0
+    assert trends["kinds"]["tests/run"]["runs"] == 13
+
+    stats = history.test_stats(tmp_path)
+    assert stats["t.py::test_flaky"]["lastOutcome"] == "passed"
+    assert stats["t.py::test_fast"]["failRate"] == 0.0
+    names = ["t.py::test_slow", "u.py::test_new", "t.py::test_fast"]
+    # no history: the median duration (test_flaky's 5 ms)
+    assert history.order(names, stats, "shortest-first") == ["t.py::test_fast", "u.py::test_new", "t.py::test_slow"]
+    stats["t.py::test_slow"]["lastOutcome"] = "failed"
+    assert history.order(names, stats, modified={"u.py"}) == ["t.py::test_slow", "u.py::test_new", "t.py::test_fast"]
+
+
+def test_retention_drops_old_runs_and_their_tests(tmp_path):
+    for i in range(30):
+        history.record(tmp_path, "tests/run", float(i), 0.1, run_result({f"t.py::test_{i}": ("passed", 1.0)}), {}, keep=10)
+    conn = sqlite3.connect(str(tmp_path / history.HISTORY_PATH))
+    runs, tests = conn.execute("SELECT COUNT(*), (SELECT COUNT(*) FROM tests) FROM runs").fetchone()
+    conn.close()
+    assert 10 <= runs <= 11 and tests == runs
+
+
+def test_recorded_runs_land_in_history_with_phase_times(tmp_path):
+    async def run():
+        with phase_labels("install", "python"):
+            await asyncio.sleep(0.01)
+        return run_result({"t.py::test_a": ("passed", 2.0)})
+
+    result = asyncio.run(srv.recorded("tdd/start", tmp_path, run))
+    assert result["historyRunId"] == 1
+    entry = history.trends(tmp_path)["runs"][0]
+    assert entry["kind"] == "tdd/start" and entry["phases"]["install:python"] >= 10
@@ -0,0 +1,33 @@
+from server.impact import refresh_index, select_tests
+
+
+def make_repo(tmp_path):
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "src" / "pkg" / "core.py").write_text("def f():\n    return 1\n")
+    (tmp_path / "src" / "pkg" / "api.py").write_text("from .core import f\n")
+    (tmp_path / "src" / "other.py").write_text("X = 1\n")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_api.py").write_text("from pkg.api import f\n")
+    (tmp_path / "tests" / "test_other.py").write_text("import other\n")
+    refresh_index(tmp_path)
+    return tmp_path
+
+
+def test_selects_tests_through_transitive_imports(tmp_path):
+    repo = make_repo(tmp_path)
+    assert select_tests(repo, ["src/pkg/core.py"]) == {"mode": "selected", "tests": ["tests/test_api.py"]}
+    assert select_tests(repo, ["src/other.py"])["tests"] == ["tests/test_other.py"]
+    assert select_tests(repo, ["README.md"])["tests"] == []
+
+
+def test_config_change_falls_back_to_full_suite(tmp_path):
+    repo = make_repo(tmp_path)
+    assert select_tests(repo, ["pyproject.toml"])["mode"] == "full"
+
+
+def test_new_test_file_is_indexed(tmp_path):
+    repo = make_repo(tmp_path)
+    (repo / "tests" / "test_new.py").write_text("from pkg import core\n")
+    assert select_tests(repo, ["tests/test_new.py"])["tests"] == ["tests/test_new.py"]
+    assert select_tests(repo, ["src/pkg/core.py"])["tests"] == ["tests/test_api.py", "tests/test_new.py"]
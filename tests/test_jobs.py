@@ -0,0 +1,182 @@
+import asyncio
+import time
+from pathlib import Path
+
+from server import main as srv
+from server.jobs import JobManager
+from server.process import run_cmd
+
+
+def gone(pid):
+    try:
+        return Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0] == "Z"
+    except OSError:
+        return True
+
+
+def test_job_lifecycle(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+
+    async def main():
+        jobs = JobManager()
+        release = asyncio.Event()
+        seen = []
+
+        async def work():
+            seen.append(job.status)
+            await release.wait()
+            return {"ok": True}
+
+        async def broken():
+            raise ValueError("bad input")
+
+        job = jobs.submit("tests/run", "/repo", work)
+        queued = job.to_dict()
+        await asyncio.sleep(0)
+        running = job.to_dict()
+        release.set()
+        await jobs.wait(job)
+        failed = await jobs.wait(jobs.submit("tests/run", "/repo", broken))
+        return jobs, job, queued, running, seen, failed
+
+    jobs, job, queued, running, seen, failed = asyncio.run(main())
+    assert queued["status"] == "queued" and queued["startedAt"] is None and "result" not in queued
+    assert running["status"] == "running" and seen == ["running"]
+    done = job.to_dict()
+    assert done["status"] == "completed" and done["result"] == {"ok": True}
+    assert done["createdAt"] <= done["startedAt"] <= done["finishedAt"]
+    assert failed.status == "failed" and failed.error == "Error: bad input"
+    assert jobs.get(job.id) is job and jobs.stats() == {"completed": 1, "failed": 1}
+    assert '"status": "completed"' in Path(done["logPath"]).read_text()
+
+
+def test_cancelling_a_running_job_kills_its_command(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+
+    async def main():
+        jobs = JobManager()
+        job = jobs.submit("tests/run", "/repo", lambda: run_cmd(["sh", "-c", "sleep 30 & echo $$ $! > pids; wait"], tmp_path))
+        while not (tmp_path / "pids").exists() or not (tmp_path / "pids").read_text().strip():
+            await asyncio.sleep(0.01)
+        assert jobs.cancel(job.id) is job
+        await jobs.wait(job)
+        return job
+
+    job = asyncio.run(main())
+    assert job.status == "cancelled" and job.finished_at is not None
+    # the shell and the child it left in its session (an orphan is reaped by init, a moment later)
+    pids = [int(pid) for pid in (tmp_path / "pids").read_text().split()]
+    deadline = time.monotonic() + 5
+    while not all(gone(pid) for pid in pids) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert all(gone(pid) for pid in pids)
+
+
+def test_global_and_per_repo_limits_bound_concurrency(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+
+    async def main():
+        jobs = JobManager(max_concurrent=3, max_per_repo=2)
+        active = {}
+        peaks = {"total": 0}
+
+        def work(repo):
+            async def run():
+                active[repo] = active.get(repo, 0) + 1
+                peaks[repo] = max(peaks.get(repo, 0), active[repo])
+                peaks["total"] = max(peaks["total"], sum(active.values()))
+                await asyncio.sleep(0.02)
+                active[repo] -= 1
+                return {"ok": True}
+
+            return run
+
+        submitted = [jobs.submit("tests/run", repo, work(repo)) for repo in ("/a", "/b", "/c") for _ in range(4)]
+        await asyncio.sleep(0.005)
+        waiting = sum(job.status == "queued" for job in submitted)
+        for job in submitted:
+            await jobs.wait(job)
+        return peaks, waiting, submitted
+
+    peaks, waiting, submitted = asyncio.run(main())
+    assert peaks["total"] == 3
+    assert max(peaks[repo] for repo in ("/a", "/b", "/c")) == 2
+    assert waiting == 9
+    assert all(job.status == "completed" for job in submitted)
+
+
+def test_identical_keys_share_one_job_until_it_finishes(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+
+    async def main():
+        jobs = JobManager()
+        release = asyncio.Event()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await release.wait()
+            return {"ok": True, "run": len(runs)}
+
+        first = jobs.submit("tests/run", "/repo", work, key="k")
+        second = jobs.submit("tests/run", "/repo", work, key="k")
+        other = jobs.submit("tests/run", "/repo", work, key="other")
+        release.set()
+        await jobs.wait(first)
+        await jobs.wait(other)
+        again = jobs.submit("tests/run", "/repo", work, key="k")
+        await jobs.wait(again)
+        return first, second, other, again, runs
+
+    first, second, other, again, runs = asyncio.run(main())
+    assert second is first
+    assert first.to_dict()["attached"] == 1
+    assert other is not first and again is not first
+    assert len(runs) == 3
+
+
+def test_exclusive_jobs_on_one_repo_never_overlap(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+
+    async def main():
+        jobs = JobManager(max_concurrent=4, max_per_repo=4)
+        active = []
+        order = []
+
+        def work(n):
+            async def run():
+                active.append(n)
+                order.append((n, sum(1 for a in active if a < 3), len(active)))
+                await asyncio.sleep(0.01)
+                active.remove(n)
+                return {"ok": True}
+
+            return run
+
+        submitted = [jobs.submit("tdd/start", "/repo", work(n), exclusive=True) for n in range(3)]
+        submitted.append(jobs.submit("tdd/start", "/elsewhere", work(3), exclusive=True))
+        for job in submitted:
+            await jobs.wait(job)
+        return order
+
+    order = asyncio.run(main())
+    assert [n for n, _, _ in order if n < 3] == [0, 1, 2]
+    assert all(same <= 1 for _, same, _ in order)
+    # another repo is not held up by the lock
+    assert max(total for _, _, total in order) == 2
+
+
+def test_run_key_follows_parameters_and_source_tree(tmp_path, monkeypatch):
+    (tmp_path / "a.py").write_text("x = 1\n")
+
+    def key(**fields):
+        return asyncio.run(srv.run_key("tests/run", tmp_path, srv.TestRequest(repoPath=str(tmp_path), **fields)))
+
+    base = key()
+    assert base is not None
+    assert key(wait=True, stream="ndjson") == base
+    assert key(k="test_a") != base
+    (tmp_path / "a.py").write_text("x = 2\n")
+    assert key() != base
+    monkeypatch.setenv("MCP_COALESCE", "0")
+    assert key() is None
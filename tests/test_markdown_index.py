@@ -0,0 +1,65 @@
+import os
+
+from server import main as srv
+from server.markdown_index import build_index, index_file, sections
+
+README = """# Project
+Intro line.
+
+## Install
+pip install it
+
+```sh
+## not a heading
+```
+
+### Extras ###
+optional bits
+
+## MCP Job
+Run every task.
+
+### Details
+more
+
+## Usage
+call it
+"""
+
+
+def test_index_maps_headings_to_sections_outside_fences(tmp_path):
+    path = tmp_path / "README.md"
+    path.write_text(README)
+    index = index_file(path)
+    assert [(h.level, h.title) for h in index] == [
+        (1, "Project"), (2, "Install"), (3, "Extras"), (2, "MCP Job"), (3, "Details"), (2, "Usage"),
+    ]
+    found = sections(path, index, ["install", "Usage", "Missing"])
+    assert found["install"].startswith("pip install it") and found["install"].endswith("optional bits")
+    assert found["Usage"] == "call it"
+    assert found["Missing"] is None
+    assert build_index(README.encode()) == index
+    (tmp_path / "empty.md").write_text("")
+    assert index_file(tmp_path / "empty.md") == []
+
+
+def test_job_section_keeps_legacy_bounds():
+    # ends at the next level 2-3 heading, as before
+    assert srv.extract_mcp_job_section(README) == "Run every task."
+    assert srv.extract_mcp_job_section("# Title\n\nfirst\nsecond\n") == "first\nsecond"
+    assert srv.extract_mcp_job_section("") == ""
+
+
+def test_regenerate_skips_identical_output(tmp_path):
+    (tmp_path / "README.md").write_text(README)
+    assert srv.regenerate_checklist(tmp_path, "python")["status"] == "created"
+    out = tmp_path / ".mcp" / "checklist.yaml"
+    assert "Run every task." in out.read_text()
+    os.utime(out, ns=(0, 0))
+    # touching the README elsewhere changes nothing in the output
+    (tmp_path / "README.md").write_text(README + "\n## More\ntext\n")
+    assert srv.regenerate_checklist(tmp_path, "python")["status"] == "unchanged"
+    assert os.stat(out).st_mtime_ns == 0
+    (tmp_path / "README.md").write_text(README.replace("Run every task.", "Run it all."))
+    assert srv.regenerate_checklist(tmp_path, "python")["status"] == "updated"
+    assert srv.readme_sections(tmp_path, ["MCP Job"]) == {"MCP Job": "Run it all.\n\n### Details\nmore"}
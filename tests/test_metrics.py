@@ -0,0 +1,47 @@
+import asyncio
+import sys
+from pathlib import Path
+
+from server.metrics import SUBPROCESS_EXITS, Counter, Histogram, phase_labels
+from server.process import run_cmd
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("t_seconds", "help", (0.1, 1))
+    for v in (0.05, 0.1, 0.5, 3):
+        h.observe(v, route="/x")
+    lines = h.render()
+    assert 't_seconds_bucket{route="/x",le="0.1"} 2.0' in lines
+    assert 't_seconds_bucket{route="/x",le="1.0"} 3.0' in lines
+    assert 't_seconds_bucket{route="/x",le="+Inf"} 4.0' in lines
+    assert 't_seconds_count{route="/x"} 4.0' in lines
+
+
+def test_label_values_are_escaped():
+    c = Counter("t_total", "help")
+    c.inc(route='a"b\\c')
+    assert c.render()[-1] == 't_total{route="a\\"b\\\\c"} 1.0'
+
+
+def test_run_cmd_reports_duration_rusage_and_phase():
+    async def main():
+        with phase_labels("install", "python"):
+            return await run_cmd([sys.executable, "-c", "x = bytearray(30_000_000); print('ok')"], Path("."))
+
+    result = asyncio.run(main())
+    assert result["code"] == 0 and result["output"] == "ok\n"
+    assert result["durationMs"] > 0
+    assert result["rusage"]["maxRssKb"] >= 30_000
+    assert any(k == (("code", "0"), ("phase", "install")) for k in SUBPROCESS_EXITS._values)
+
+
+def test_ready_reports_startup_stages():
+    from fastapi.testclient import TestClient
+
+    from server.main import app
+
+    with TestClient(app) as client:
+        body = client.get("/ready").json()
+    assert body["ok"] and all(body["checks"].values())
+    assert {"import", "ready", "first_response"} <= set(body["startupMs"])
+    assert body["startupMs"]["import"] <= body["startupMs"]["ready"]
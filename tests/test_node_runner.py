@@ -0,0 +1,78 @@
+import asyncio
+import json
+import shutil
+
+import pytest
+
+from server import main as srv
+from server import node_runner
+from server.bootstrap_cache import dependency_fingerprint
+from server.warm_pool import WarmPool
+
+# Stands in for the jest package: runCLI with the shape of the real one.
+FAKE_JEST = """
+let calls = 0;
+exports.runCLI = async (argv, projects) => {
+  calls += 1;
+  console.log(`PASS call ${calls} in pid ${process.pid}`);
+  require('fs').writeFileSync(argv.outputFile, JSON.stringify({testResults: [{
+    name: projects[0] + '/sum.test.js',
+    assertionResults: [{fullName: 'adds', status: argv.bail === 1 ? 'failed' : 'passed', duration: 1}],
+  }]}));
+  return {results: {success: argv.bail !== 1}};
+};
+"""
+
+
+def package(repo, test_script, **extra):
+    (repo / "package.json").write_text(json.dumps({"scripts": {"test": test_script}, **extra}))
+
+
+def test_only_plain_runner_scripts_run_warm(tmp_path):
+    cases = {
+        "jest --runInBand": ("jest", ["--runInBand"]),
+        "npx vitest run --coverage": ("vitest", ["--coverage"]),
+        "jest --config jest.config.js": None,
+        "jest && eslint .": None,
+        "mocha": None,
+    }
+    for script, expected in cases.items():
+        package(tmp_path, script)
+        assert node_runner.test_script(tmp_path) == expected, script
+    package(tmp_path, "jest --ci")
+    assert node_runner.worker_args(tmp_path, ["npm", "test", "--silent", "--", "--json"]) == ["--ci", "--json"]
+
+
+def test_test_script_edits_keep_the_install(tmp_path):
+    package(tmp_path, "jest", dependencies={"left-pad": "1.3.0"})
+    before = dependency_fingerprint(tmp_path, "node", [["npm", "ci"]])
+    package(tmp_path, "jest --ci", dependencies={"left-pad": "1.3.0"})
+    assert dependency_fingerprint(tmp_path, "node", [["npm", "ci"]]) == before
+    package(tmp_path, "jest --ci", dependencies={"left-pad": "1.3.1"})
+    assert dependency_fingerprint(tmp_path, "node", [["npm", "ci"]]) != before
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_warm_node_runs_reuse_one_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+    repo = tmp_path / "repo"
+    (repo / "node_modules" / "jest").mkdir(parents=True)
+    (repo / "node_modules" / "jest" / "index.js").write_text(FAKE_JEST)
+    package(repo, "jest")
+    pool = WarmPool(size=1, launch=node_runner.node_worker, command=["npm", "test", "--"])
+    monkeypatch.setattr(srv, "node_pool", pool)
+
+    async def main():
+        runs = []
+        for max_fail in (None, None, 1):
+            runs.append(await srv.bootstrap_and_test(repo, "node", "skip", use_cache=False, warm=True, max_fail=max_fail))
+        await pool.shutdown()
+        return runs
+
+    first, second, failing = asyncio.run(main())
+    step = second["results"][0]
+    assert step["warm"] and step["workerReused"] and step["tests"]["passed"] == 1
+    assert second["cacheHitRates"]["node"]["runner"] == 0.5
+    # --bail reaches the runner through the same worker
+    assert failing["results"][0]["tests"]["failed"] == 1 and "timeToFirstFailureMs" in failing
+    assert first["results"][0]["workerReused"] is False
@@ -0,0 +1,69 @@
+import asyncio
+
+from server import history
+from server import main as srv
+from server import ordering
+from server.reports import reporter_args
+
+SUITE = """
+import time
+
+def test_slow():
+    time.sleep(0.5)
+
+def test_fast():
+    pass
+
+def test_broken():
+    assert False
+"""
+
+
+def test_fail_fast_args_per_runner(tmp_path):
+    assert ordering.fail_fast_args(["pytest", "-q"], 2) == ["pytest", "-q", "--maxfail=2"]
+    assert ordering.fail_fast_args(["go", "test", "./..."], 1) == ["go", "test", "-failfast", "./..."]
+    assert ordering.fail_fast_args(["npm", "test", "--silent"], 1) == ["npm", "test", "--silent", "--", "--bail=1"]
+    assert ordering.fail_fast_args(["cargo", "test"], 1) == ["cargo", "test"]
+    (tmp_path / "package.json").write_text('{"scripts": {"test": "jest"}}')
+    bailing = ordering.fail_fast_args(["npm", "test"], 1)
+    # the reporter flags join the same "--"
+    assert reporter_args(bailing, tmp_path, tmp_path / "r.json") == ["npm", "test", "--", "--bail=1", "--json", f"--outputFile={tmp_path / 'r.json'}"]
+
+
+def test_first_failure_lines():
+    for line in ["..F.", "F [100%]", "--- FAIL: TestX (0.00s)", "FAIL src/a.test.js", "test a::b ... FAILED",
+                 "[ERROR] Tests run: 1, Failures: 1, Errors: 0, Skipped: 0 <<< FAILURE!", "FooTest > bar() FAILED"]:
+        watch = ordering.FirstFailure()
+        assert watch(line) == line and watch.at is not None, line
+    watch = ordering.FirstFailure()
+    for line in ["....", "ok  \texample.com/m\t0.1s", "PASS src/a.test.js", "2 failed, 1 passed in 0.1s"]:
+        watch(line)
+    assert watch.at is None
+
+
+def test_failed_first_order_and_time_to_first_failure(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "test_suite.py").write_text(SUITE)
+
+    def run(**options):
+        result = asyncio.run(srv.bootstrap_and_test(repo, "python", "skip", use_cache=False, **options))
+        history.record(repo, "tests/run", 1000.0, 1.0, result, {})
+        return result
+
+    first = run()
+    assert [t["id"] for t in first["results"][0]["tests"]["results"]][0] == "test_suite.py::test_slow"
+    # test_broken only fails after the fixed sleep in test_slow
+    assert first["timeToFirstFailureMs"] >= 500
+
+    ordered = run(order="failed-first", max_fail=1)
+    step = ordered["results"][0]
+    # the failure from the last run goes first and stops the run
+    assert [t["id"] for t in step["tests"]["results"]] == ["test_suite.py::test_broken"]
+    assert step["tests"]["failed"] == 1 and step["tests"]["passed"] == 0
+    assert 0 <= step["timeToFirstFailureMs"] <= ordered["timeToFirstFailureMs"]
+    assert list((tmp_path / "state" / "reports").iterdir()) == []
+
+    fastest = run(order="shortest-first")
+    assert [t["id"] for t in fastest["results"][0]["tests"]["results"]][-1] == "test_suite.py::test_slow"
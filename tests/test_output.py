@@ -0,0 +1,40 @@
+import asyncio
+import json
+import sys
+
+from server import process
+from server.jobs import JobManager
+from server.process import run_cmd
+
+PRINT_LINES = "import sys\nfor i in range(int(sys.argv[1])):\n    print(f'line {i}', flush=i % 100 == 0)\n"
+
+
+def test_followers_replay_the_whole_run_from_disk(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+    # only the last 50 lines are kept in memory
+    monkeypatch.setattr(process, "OUTPUT_TAIL_LINES", 50)
+    count = 5000
+
+    async def collect(job):
+        return [event async for event in job.log.follow()]
+
+    async def main():
+        jobs = JobManager()
+        job = jobs.submit("tests/run", "/repo", lambda: run_cmd([sys.executable, "-c", PRINT_LINES, str(count)], tmp_path))
+        live = asyncio.ensure_future(collect(job))
+        await asyncio.sleep(0)
+        await jobs.wait(job)
+        # ends once the job is done, without a cancel
+        following = await asyncio.wait_for(live, 5)
+        late = await collect(job)
+        streamed = [json.loads(line) async for line in jobs.stream(job, "ndjson")]
+        return job, following, late, streamed
+
+    job, following, late, streamed = asyncio.run(main())
+    result = job.result
+    assert result["truncated"] and result["output"].splitlines() == [f"line {i}" for i in range(count - 50, count)]
+    lines = [e["text"] for e in late if e["type"] == "line"]
+    assert lines == [f"line {i}" for i in range(count)]
+    assert late[0]["type"] == "start" and (late[-1]["type"], late[-1]["status"]) == ("status", "completed")
+    assert following == late
+    assert streamed[:-1] == late and streamed[-1]["type"] == "done" and streamed[-1]["status"] == "completed"
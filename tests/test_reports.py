@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+from server.jobs import JobManager
+from server.reports import GoJsonParser, parse_junit_xml, run_with_report, summarize
+
+
+def test_go_json_parser_records_tests_and_keeps_readable_output():
+    parser = GoJsonParser(message_limit=100)
+    events = [
+        {"Action": "run", "Package": "ex/pkg", "Test": "TestOk"},
+        {"Action": "output", "Package": "ex/pkg", "Test": "TestOk", "Output": "=== RUN   TestOk\n"},
+        {"Action": "pass", "Package": "ex/pkg", "Test": "TestOk", "Elapsed": 0.01},
+        {"Action": "output", "Package": "ex/pkg", "Test": "TestBad", "Output": "    bad_test.go:9: boom\n"},
+        {"Action": "fail", "Package": "ex/pkg", "Test": "TestBad", "Elapsed": 0.02},
+        {"Action": "fail", "Package": "ex/pkg", "Elapsed": 0.5},
+    ]
+    shown = [parser(json.dumps(e)) for e in events]
+    assert shown[1] == "=== RUN   TestOk"
+    assert shown[2] is None
+    assert [(r["id"], r["outcome"]) for r in parser.results] == [("ex/pkg::TestOk", "passed"), ("ex/pkg::TestBad", "failed")]
+    assert parser.results[1]["message"] == "bad_test.go:9: boom"
+
+
+def test_junit_ids_map_back_to_node_ids(tmp_path):
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_x.py").write_text("")
+    report = tmp_path / "r.xml"
+    report.write_text(
+        '<testsuites><testsuite>'
+        '<testcase classname="tests.test_x.TestA" name="test_one" time="0.5"/>'
+        '<testcase classname="tests.test_x" name="test_two" time="0.1"><failure message="m">' + "x" * 50 + '</failure></testcase>'
+        '</testsuite></testsuites>'
+    )
+    results = parse_junit_xml(report, message_limit=10, repo_root=tmp_path)
+    assert [r["id"] for r in results] == ["tests/test_x.py::TestA::test_one", "tests/test_x.py::test_two"]
+    assert results[1]["message"].startswith("xxxxxxxxxx... [40 more chars]")
+    assert summarize(results)["failed"] == 1
+
+
+def test_pytest_results_stream_while_the_run_goes_on(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    # test_waits only passes if its neighbour's result was streamed before the run ended
+    (repo / "test_live.py").write_text(
+        "import os, time\n\n"
+        "def test_first():\n    pass\n\n"
+        "def test_skipped():\n    import pytest; pytest.skip('later')\n\n"
+        "def test_waits():\n"
+        "    for _ in range(200):\n"
+        "        if os.path.exists('go'):\n            return\n"
+        "        time.sleep(0.05)\n"
+        "    raise AssertionError('test_first was not streamed')\n"
+    )
+
+    async def main():
+        jobs = JobManager()
+        job = jobs.submit("tests/run", str(repo), lambda: run_with_report(["pytest", "-q"], repo))
+        seen = []
+        async for event in job.log.follow():
+            if event["type"] == "test":
+                seen.append(event)
+                if event["id"] == "test_live.py::test_first":
+                    (repo / "go").touch()
+        await jobs.wait(job)
+        return job.result, seen
+
+    result, seen = asyncio.run(main())
+    assert result["tests"]["passed"] == 2 and result["tests"]["skipped"] == 1
+    assert [(e["id"], e["outcome"]) for e in seen] == [
+        ("test_live.py::test_first", "passed"), ("test_live.py::test_skipped", "skipped"), ("test_live.py::test_waits", "passed"),
+    ]
+    assert "later" in seen[1]["message"]
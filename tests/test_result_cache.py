@@ -0,0 +1,69 @@
+import shutil
+import subprocess
+
+import pytest
+
+from server.result_cache import ResultCache, tree_hash
+
+
+def test_tree_hash_tracks_content_but_not_caches(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    first, source = tree_hash(tmp_path)
+    assert source == "files"
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "__pycache__" / "a.cpython-311.pyc").write_bytes(b"\0")
+    assert tree_hash(tmp_path)[0] == first
+    (tmp_path / "a.py").write_text("x = 2\n")
+    assert tree_hash(tmp_path)[0] != first
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_tree_hash_in_git_sees_modified_and_untracked_files(tmp_path):
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    (tmp_path / "a.py").write_text("x = 1\n")
+    git("init", "-q")
+    git("add", "a.py")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init")
+    clean, source = tree_hash(tmp_path)
+    assert source == "git"
+    (tmp_path / "a.py").write_text("x = 2\n")
+    modified = tree_hash(tmp_path)[0]
+    (tmp_path / "b.py").write_text("y = 1\n")
+    untracked = tree_hash(tmp_path)[0]
+    assert len({clean, modified, untracked}) == 3
+    (tmp_path / "a.py").write_text("x = 1\n")
+    (tmp_path / "b.py").unlink()
+    assert tree_hash(tmp_path)[0] == clean
+
+
+def test_results_persist_and_evict_least_recently_used(tmp_path):
+    cache = ResultCache(max_entries=2)
+    keys = [ResultCache.key("tree", ["pytest", "-q", str(i)], None) for i in range(3)]
+    cache.put(tmp_path, keys[0], {"code": 0})
+    cache.put(tmp_path, keys[1], {"code": 1})
+    assert cache.get(tmp_path, keys[0])["code"] == 0
+    cache.put(tmp_path, keys[2], {"code": 0})
+
+    reloaded = ResultCache(max_entries=2)
+    assert reloaded.get(tmp_path, keys[1]) is None
+    assert reloaded.get(tmp_path, keys[0])["code"] == 0
+    assert reloaded.get(tmp_path, keys[2])["code"] == 0
+    assert ResultCache.key("other", ["pytest", "-q", "0"], None) != keys[0]
+
+
+def test_hits_do_not_rewrite_the_results_file(tmp_path):
+    cache = ResultCache(max_entries=2)
+    keys = [ResultCache.key("tree", ["pytest", str(i)], None) for i in range(3)]
+    cache.put(tmp_path, keys[0], {"code": 0})
+    cache.put(tmp_path, keys[1], {"code": 0})
+    path = tmp_path / ".mcp" / "cache" / "test-results.json"
+    before = path.stat()
+    for _ in range(3):
+        assert cache.get(tmp_path, keys[0]) is not None
+    after = path.stat()
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    # the in-memory order still decides what the next put evicts
+    cache.put(tmp_path, keys[2], {"code": 0})
+    assert ResultCache().get(tmp_path, keys[1]) is None
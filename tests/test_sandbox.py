@@ -0,0 +1,103 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from server.process import capture, run_cmd
+from server.sandbox import command_limits, resolve_limits
+from server.warm_pool import WarmPool
+
+
+def run(cmd, limits=None):
+    async def main():
+        with command_limits(limits):
+            return await run_cmd(cmd, Path("."))
+
+    return asyncio.run(main())
+
+
+def test_resolve_limits_takes_the_tightest_value(monkeypatch):
+    monkeypatch.setenv("MCP_LIMIT_MEMORY_MB", "1024")
+    limits = resolve_limits({"memory_mb": 2048, "cpu_seconds": 60}, {"cpuSeconds": 30, "wallSeconds": None})
+    assert limits == {"memoryMb": 1024.0, "cpuSeconds": 30.0}
+    with pytest.raises(ValueError):
+        resolve_limits(None, {"rssMb": 1})
+    with pytest.raises(ValueError):
+        resolve_limits(None, {"cpuSeconds": 0})
+
+
+def test_memory_limit_kills_the_whole_tree():
+    # the parent stays small; its child grows past the limit
+    child = "import time; x = bytearray(200 * 1024 * 1024); time.sleep(30)"
+    parent = f"import subprocess, sys; subprocess.run([sys.executable, '-c', {child!r}])"
+    started = time.monotonic()
+    result = run([sys.executable, "-c", parent], {"memoryMb": 64})
+    assert time.monotonic() - started < 15
+    assert result["limitHit"] == "memory"
+    assert result["groupPeak"]["rssKb"] > 64 * 1024
+    assert result["groupPeak"]["processes"] >= 2
+    assert result["code"] != 0
+    assert "memory limit of 64 MB exceeded" in result["output"]
+
+
+def test_cpu_limit_counts_cpu_time_not_wall_time():
+    result = run([sys.executable, "-c", "while True: pass"], {"cpuSeconds": 1})
+    assert result["limitHit"] == "cpu"
+    assert result["groupPeak"]["cpuMs"] >= 1000
+
+
+def test_wall_limit_and_leftover_children():
+    assert run(["sleep", "5"], {"wallSeconds": 0.5})["limitHit"] == "wall"
+    # a background child holding stdout no longer keeps the command running
+    started = time.monotonic()
+    result = run(["sh", "-c", "sleep 30 & echo done"])
+    assert result["code"] == 0 and result["output"] == "done\n"
+    assert time.monotonic() - started < 5
+    assert "limitHit" not in result
+
+
+def gone(pid):
+    try:
+        return Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0] == "Z"
+    except OSError:
+        return True
+
+
+def test_helper_commands_are_limited_too(tmp_path):
+    async def main():
+        with command_limits({"wallSeconds": 0.5}):
+            return await capture(["sh", "-c", "sleep 30 & echo $! > child; wait"], tmp_path)
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="timed out"):
+        asyncio.run(main())
+    assert time.monotonic() - started < 5
+    # the orphan is reaped by init a moment after the kill
+    child = int((tmp_path / "child").read_text())
+    deadline = time.monotonic() + 5
+    while not gone(child) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert gone(child)
+
+
+def test_warm_runs_are_held_to_the_limits(tmp_path, monkeypatch):
+    (tmp_path / "test_big.py").write_text(
+        "import os, time\n\ndef test_big():\n    x = bytearray(200 * 1024 * 1024)\n    if not os.environ.get('QUICK'):\n        time.sleep(30)\n"
+    )
+    pool = WarmPool(size=1)
+
+    async def main():
+        with command_limits({"memoryMb": 128}):
+            big = await pool.run(tmp_path, ["-q", "test_big.py"])
+        monkeypatch.setenv("QUICK", "1")
+        again = await pool.run(tmp_path, ["-q", "test_big.py"])
+        await pool.shutdown()
+        return big, again
+
+    big, again = asyncio.run(main())
+    assert big["limitHit"] == "memory" and big["code"] == -1
+    assert "memory limit of 128 MB exceeded" in big["output"]
+    # the killed worker is replaced; without limits the same test passes
+    assert again["code"] == 0 and not again["workerReused"]
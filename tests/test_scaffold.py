@@ -0,0 +1,26 @@
+import os
+
+from server.main import mark_checklist_item, scaffold_from_checklist
+
+CHECKLIST_YAML = "tasks:\n  - {id: bootstrap-deps, title: Install}\n  - {id: run-tests, title: Run tests}\n"
+
+
+def test_scaffold_writes_only_changed_files(tmp_path):
+    (tmp_path / ".mcp").mkdir()
+    (tmp_path / ".mcp" / "checklist.yaml").write_text(CHECKLIST_YAML)
+    first = scaffold_from_checklist(tmp_path)
+    assert len(first["created"]) == 5 and not first["updated"]
+    master = tmp_path / "src" / "master.py"
+    mtime = os.stat(master).st_mtime_ns
+
+    mark_checklist_item(tmp_path, "run-tests", True)
+    second = scaffold_from_checklist(tmp_path)
+    assert not second["created"] and not second["updated"]
+    assert os.stat(master).st_mtime_ns == mtime
+    assert "- [x] Run tests (run-tests)" in (tmp_path / "CHECKLIST.md").read_text()
+
+    (tmp_path / ".mcp" / "checklist.yaml").write_text(CHECKLIST_YAML + "  - {id: deploy}\n")
+    third = scaffold_from_checklist(tmp_path, dry_run=True)
+    assert third["files"][str(tmp_path / "src" / "tasks" / "deploy.py")] == "created"
+    assert third["files"][str(master)] == "updated"
+    assert not (tmp_path / "src" / "tasks" / "deploy.py").exists()
@@ -0,0 +1,18 @@
+from server.reports import junit_key
+from server.sharding import balance
+
+
+def test_balance_spreads_cost_evenly():
+    units = {"a": 4.0, "b": 3.0, "c": 2.0, "d": 2.0, "e": 1.0}
+    buckets = balance(units, 2)
+    loads = sorted(sum(units[u] for u in b) for b in buckets)
+    assert loads == [6.0, 6.0]
+
+
+def test_balance_drops_empty_shards():
+    assert balance({"a": 1.0}, 4) == [["a"]]
+
+
+def test_junit_key_matches_pytest_classname():
+    assert junit_key("tests/test_m.py::TestC::test_x[1]") == "tests.test_m.TestC::test_x[1]"
+    assert junit_key("test_top.py::test_y") == "test_top::test_y"
@@ -0,0 +1,62 @@
+import asyncio
+import sys
+
+import pytest
+
+from server.steps import FsSnapshot, StepCache, compile_when, run_checklist, split_command
+
+
+def test_compile_when(tmp_path):
+    (tmp_path / "go.mod").write_text("module x\n")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a_test.go").write_text("")
+    fs = FsSnapshot(tmp_path)
+    assert compile_when('file_exists("go.mod") and not file_exists("package.json")')(fs)
+    assert compile_when('dir_exists("pkg") and glob("**/*_test.go")')(fs)
+    assert not compile_when('glob("*.py") or False')(fs)
+    assert compile_when('file_exists("go.mod")') is compile_when('file_exists("go.mod")')
+    with pytest.raises(ValueError):
+        compile_when('__import__("os").system("true")')
+
+
+def test_split_command():
+    assert split_command('pip install -U pip && pip install -e .') == [["pip", "install", "-U", "pip"], ["pip", "install", "-e", "."]]
+    assert split_command('echo "a && b"; go test') == [["echo", "a && b"], ["go", "test"]]
+    for bad in ("echo hi | cat", "echo hi > out", "echo $(id) &&"):
+        with pytest.raises(ValueError):
+            split_command(bad)
+
+
+def test_run_checklist_caches_and_enforces_whitelist(tmp_path):
+    (tmp_path / "deps.txt").write_text("a\n")
+    python = sys.executable
+    checklist = {
+        "permissions": {"shell_whitelist": [python.rsplit("/", 1)[-1]]},
+        "tasks": [
+            {"id": "install", "steps": [{"run": f'{python} -c "print(1)"', "inputs": ["deps.txt"]}]},
+            {"id": "test", "depends_on": ["install"], "steps": [{"when": 'file_exists("deps.txt")', "run": "rm -rf build"}]},
+        ],
+    }
+    cache = StepCache(tmp_path / "steps.json")
+    first = asyncio.run(run_checklist(tmp_path, checklist, cache=cache))
+    assert [s["status"] for s in first["tasks"][0]["steps"]] == ["passed"]
+    assert first["tasks"][1]["steps"][0]["status"] == "denied"
+    second = asyncio.run(run_checklist(tmp_path, checklist, ["install"], cache=cache))
+    assert second["tasks"][0]["steps"][0]["status"] == "cached"
+    (tmp_path / "deps.txt").write_text("a\nb\n")
+    third = asyncio.run(run_checklist(tmp_path, checklist, ["install"], cache=cache))
+    assert third["tasks"][0]["steps"][0]["status"] == "passed"
+
+
+def test_when_sees_files_made_by_earlier_tasks(tmp_path):
+    python = sys.executable
+    checklist = {
+        "tasks": [
+            {"id": "probe", "steps": [{"when": 'file_exists("made")', "run": f'{python} -c "print(0)"'}]},
+            {"id": "a", "depends_on": ["probe"], "steps": [{"run": f'{python} -c "open(\'made\', \'w\')"'}]},
+            {"id": "b", "depends_on": ["a"], "steps": [{"when": 'file_exists("made")', "run": f'{python} -c "print(1)"'}]},
+        ],
+    }
+    result = asyncio.run(run_checklist(tmp_path, checklist, cache=StepCache(tmp_path / "steps.json")))
+    statuses = {task["id"]: [s["status"] for s in task["steps"]] for task in result["tasks"]}
+    assert statuses == {"probe": ["skipped"], "a": ["passed"], "b": ["passed"]}
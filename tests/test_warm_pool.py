@@ -0,0 +1,81 @@
+import asyncio
+import os
+
+from server.warm_pool import WarmPool
+
+TESTS = """
+import os
+import time
+
+from calc import value
+
+
+def test_value():
+    print(f"pid {os.getpid()} value {value()}")
+
+
+def test_hang():
+    time.sleep(60)
+"""
+
+
+def make_repo(tmp_path, value):
+    (tmp_path / "calc.py").write_text(f"def value():\n    return {value!r}\n")
+    (tmp_path / "test_calc.py").write_text(TESTS)
+
+
+def printed(result):
+    line = next(line for line in result["output"].splitlines() if line.startswith("pid "))
+    _, pid, _, value = line.split()
+    return int(pid), value
+
+
+def test_workers_are_reused_recycled_and_replaced(tmp_path):
+    make_repo(tmp_path, 1)
+    pool = WarmPool(size=1)
+    focused = ["-q", "-s", "test_calc.py::test_value"]
+
+    async def main():
+        runs = [await pool.run(tmp_path, focused), await pool.run(tmp_path, focused)]
+        stat = os.stat(tmp_path / "calc.py")
+        make_repo(tmp_path, 22)
+        os.utime(tmp_path / "calc.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        runs.append(await pool.run(tmp_path, focused))
+        runs.append(await pool.run(tmp_path, ["-q", "test_calc.py::test_hang"], timeout=3))
+        runs.append(await pool.run(tmp_path, focused))
+        await pool.shutdown()
+        return runs
+
+    first, second, edited, hung, after = asyncio.run(main())
+    assert first["code"] == 0 and not first["workerReused"]
+    assert second["workerReused"] and printed(second) == printed(first)
+    # the edited module is only picked up by a new worker
+    assert not edited["workerReused"] and printed(edited)[1] == "22" and printed(edited)[0] != printed(first)[0]
+    assert hung["code"] == -1 and "timed out" in hung["output"]
+    assert after["code"] == 0 and not after["workerReused"] and printed(after)[0] != printed(edited)[0]
+    assert pool.recycled == 1 and pool.spawned == 3
+
+
+def test_shutdown_stops_workers_still_starting(tmp_path):
+    make_repo(tmp_path, 1)
+    pool = WarmPool(size=2)
+
+    async def main():
+        await pool.run(tmp_path, ["-q", "test_calc.py::test_value"])
+        # the run left a refill starting in the background
+        starting = set(pool._prewarming)
+        await pool.shutdown()
+        return starting
+
+    starting = asyncio.run(main())
+    assert starting and all(task.done() for task in starting)
+    assert not pool._prewarming and pool._idle == {}
+    # no worker is left running in the repo
+    assert not [pid for pid in os.listdir("/proc") if pid.isdigit() and cwd(pid) == str(tmp_path)]
+
+
+def cwd(pid):
+    try:
+        return os.readlink(f"/proc/{pid}/cwd")
+    except OSError:
+        return None
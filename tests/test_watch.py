@@ -0,0 +1,69 @@
+import asyncio
+
+from server.jobs import JobManager
+from server.watch import ChangeFeed, WatchSession, ignored
+
+
+def test_ignored_paths():
+    assert ignored("pkg/__pycache__/a.cpython-311.pyc")
+    assert ignored(".git/index")
+    assert ignored("src/.#a.py")
+    assert not ignored("src/a.py")
+
+
+def test_polling_feed_debounces_a_burst_into_one_batch(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_DISABLE_INOTIFY", "1")
+    (tmp_path / "a.py").write_text("x = 1\n")
+
+    async def main():
+        feed = ChangeFeed(tmp_path, poll_interval=0.02)
+        feed.start()
+        assert feed.mode == "poll"
+        batches = feed.batches(debounce=0.1)
+        (tmp_path / "a.py").write_text("x = 2\n")
+        await asyncio.sleep(0.05)
+        (tmp_path / "b.py").write_text("y = 1\n")
+        (tmp_path / "__pycache__").mkdir()
+        (tmp_path / "__pycache__" / "a.pyc").write_bytes(b"")
+        batch = await asyncio.wait_for(batches.__anext__(), 5)
+        feed.close()
+        return batch
+
+    assert asyncio.run(main()) == ["a.py", "b.py"]
+
+
+def test_session_runs_each_batch_and_broadcasts_the_result(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_STATE_DIR", str(tmp_path / "state"))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+
+    async def main():
+        jobs = JobManager(max_concurrent=1)
+        seen = []
+
+        def run(changed):
+            seen.append(changed)
+            return jobs.submit("watch", str(repo), lambda: asyncio.sleep(0, {"ok": True, "changed": changed}))
+
+        session = WatchSession(repo, jobs, run, debounce=0.05)
+        session.start()
+        events = []
+
+        async def subscribe():
+            async for event in session.subscribe():
+                events.append(event)
+                if event["type"] == "result":
+                    return
+
+        subscriber = asyncio.create_task(subscribe())
+        await asyncio.sleep(0.1)
+        (repo / "a.py").write_text("x = 1\n")
+        await asyncio.wait_for(subscriber, 5)
+        session.stop()
+        return seen, events, session
+
+    seen, events, session = asyncio.run(main())
+    assert seen == [["a.py"]]
+    assert [e["type"] for e in events][:2] == ["watch", "change"]
+    assert events[-1]["result"] == {"ok": True, "changed": ["a.py"]}
+    assert session.last["run"] == 1